@@ -185,6 +185,21 @@ REST_FRAMEWORK = {
 FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024   # 100MB
 FILE_UPLOAD_PERMISSIONS = 0o644
+# Uploaded files stream to FILE_UPLOAD_TEMP_DIR instead of memory and are
+# SHA-256 hashed on the way. Batch archives are then renamed into
+# content-addressed storage under UPLOAD_STORAGE_DIR (same filesystem, so
+# the move is atomic), and identical archives are stored once.
+FILE_UPLOAD_HANDLERS = ['plagiarism_check.uploads.HashingFileUploadHandler']
+UPLOAD_STORAGE_DIR = MEDIA_ROOT / 'uploads'
+FILE_UPLOAD_TEMP_DIR = UPLOAD_STORAGE_DIR / 'tmp'
+# Re-uploading an identical batch archive for the same topic and starter code
+# returns the existing batch
+BATCH_DEDUPLICATE_UPLOADS = True
+# Resumable batch uploads (plagiarism/upload-sessions/): chunk size, largest
+# archive accepted, and seconds an unfinished session is kept after its last chunk
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+UPLOAD_SESSION_MAX_SIZE = 20 * 1024 * 1024 * 1024  # 20GB
+UPLOAD_SESSION_MAX_AGE = 24 * 3600
 
 # ==================================
 # CUSTOM SETTINGS FOR YOUR APP
@@ -192,9 +207,101 @@ FILE_UPLOAD_PERMISSIONS = 0o644
 ML_MODELS_DIR = BASE_DIR / 'ml_models'
 TEMP_FILES_DIR = BASE_DIR / 'temp'
 
+# Trained plagiarism model, loaded once per process and reloaded when the
+# file changes (checked at most every MODEL_RELOAD_INTERVAL seconds)
+PLAGIARISM_MODEL_PATH = ML_MODELS_DIR / 'plagiarism_model.pkl'
+MODEL_RELOAD_INTERVAL = 5.0
+# Flag batch pairs with the model (False = weighted score above 0.7)
+USE_PLAGIARISM_MODEL = True
+
+# Worker processes for batch feature extraction (0 or 1 = run in the request process)
+FEATURE_EXTRACTION_WORKERS = min(os.cpu_count() or 1, 8)
+
+# Batch checks run in the background: `python manage.py run_batch_worker`
+# picks up queued uploads. Set to False to process inside the upload request.
+BATCH_CHECK_ASYNC = True
+BATCH_WORKER_POLL_INTERVAL = 2.0  # seconds
+BATCH_JOB_STALE_MINUTES = 15
+# Running jobs refresh their heartbeat this often, independent of progress
+BATCH_JOB_HEARTBEAT_SECONDS = 30
+
+# Batch ZIP ingestion: nesting depth (course -> section -> student), threads
+# for reading top-level nested archives, and in-memory size limit per archive
+NESTED_ZIP_MAX_DEPTH = 3
+ZIP_SECTION_WORKERS = 4
+NESTED_ZIP_MEMORY_LIMIT = 64 * 1024 * 1024  # 64MB
+
+# MinHash + LSH candidate generation for large batches. Below LSH_MIN_PROJECTS
+# every pair is scored; above it only pairs sharing an LSH bucket. More bands
+# or fewer rows per band raise recall (and the number of scored pairs).
+LSH_CANDIDATES_ENABLED = True
+LSH_MIN_PROJECTS = 300
+LSH_BANDS = 32
+LSH_ROWS = 4  # bands x rows must fit the 128 MinHash permutations
+
+# Files with equal CRC32 and size in the ZIP central directories are flagged
+# as identical. Folder-style batches are indexed before extraction and
+# CRC_DUPLICATE_CONFIRM re-reads just the flagged members; batches of nested
+# ZIPs are indexed from the extraction pass and confirmed with its content
+# hashes, so no nested archive is opened twice. Files shared by more than
+# CRC_INDEX_MAX_GROUP projects are treated as boilerplate when pairing.
+CRC_DUPLICATE_CONFIRM = True
+CRC_INDEX_MAX_GROUP = 50
+CRC_REPORT_MAX_FILES = 200
+
+# Code files held by more than FILE_HASH_MAX_POSTING projects are counted per
+# scored pair instead of being expanded into all their pairs. The batch report
+# lists the SHARED_FILE_GROUPS groups of students sharing the most files.
+FILE_HASH_MAX_POSTING = 100
+SHARED_FILE_GROUPS = 100
+
+# Winnowed k-gram fingerprints (see kgram_index.py): pairs sharing at least
+# FINGERPRINT_MIN_SHARED fingerprints are always scored and get matched line
+# ranges; fingerprints held by more than FINGERPRINT_MAX_POSTING projects of
+# a batch are treated as common idioms.
+FINGERPRINT_MIN_SHARED = 3
+FINGERPRINT_MAX_POSTING = 20
+MATCHED_REGIONS = 10
+
+# Snippet search over the fingerprints of every stored submission. Snippet
+# k-grams stored for more than SNIPPET_MAX_POSTING submissions are skipped;
+# submissions covering less than SNIPPET_MIN_COVERAGE of the snippet are not listed.
+SNIPPET_MAX_CHARS = 20000
+SNIPPET_MAX_POSTING = 500
+SNIPPET_MIN_COVERAGE = 0.2
+SNIPPET_RESULTS = 50
+
+# Every finished batch is also compared with the same faculty member's
+# earlier batches of its topic through the persistent corpus index (see
+# corpus.py); untitled batches are not. Each submission is scored against at
+# most CORPUS_CANDIDATES earlier ones; LSH buckets and fingerprints held by
+# more than CORPUS_MAX_POSTING of them are skipped.
+CORPUS_COMPARISON_ENABLED = True
+CORPUS_CANDIDATES = 20
+CORPUS_MAX_POSTING = 200
+
+# Rows per INSERT when saving submissions and results. Set
+# RESULT_STORAGE_THRESHOLD (e.g. 0.3) to store only pairs scoring at least that.
+BULK_CREATE_BATCH_SIZE = 500
+RESULT_STORAGE_THRESHOLD = None
+
+# Student project analyses are cached by a digest of the uploaded files
+# (paths + content hashes). Entries expire after ANALYSIS_CACHE_MAX_AGE
+# seconds; beyond ANALYSIS_CACHE_MAX_ENTRIES the least recently used go.
+ANALYSIS_CACHE_ENABLED = True
+ANALYSIS_CACHE_MAX_ENTRIES = 5000
+ANALYSIS_CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Per-file analysis results are shared by every upload with the same file
+# content. Results unused for FILE_ANALYSIS_MAX_AGE seconds expire; beyond
+# FILE_ANALYSIS_MAX_ENTRIES the least recently used go.
+FILE_ANALYSIS_MAX_ENTRIES = 200000
+FILE_ANALYSIS_MAX_AGE = 90 * 24 * 3600
+
 os.makedirs(ML_MODELS_DIR, exist_ok=True)
 os.makedirs(TEMP_FILES_DIR, exist_ok=True)
 os.makedirs(MEDIA_ROOT, exist_ok=True)
+os.makedirs(FILE_UPLOAD_TEMP_DIR, exist_ok=True)
 
 
 # settings.py
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import BatchUpload, ProjectSubmission, PlagiarismResult
+from .models import (
+    BatchUpload, FingerprintPosting, HistoricalMatch, MinHashBucket, ProjectSubmission, PlagiarismResult,
+    StarterCode, StudentSummary, UploadSession
+)
 
 @admin.register(BatchUpload)
 class BatchUploadAdmin(admin.ModelAdmin):
@@ -22,10 +25,10 @@ class ProjectSubmissionAdmin(admin.ModelAdmin):
 
 @admin.register(PlagiarismResult)
 class PlagiarismResultAdmin(admin.ModelAdmin):
-    list_display = ['project1_student_id', 'project2_student_id', 'similarity_score', 'is_plagiarized', 'batch', 'created_at']
-    list_filter = ['is_plagiarized', 'batch', 'created_at']
+    list_display = ['project1_student_id', 'project2_student_id', 'similarity_score', 'is_plagiarized', 'faculty_label', 'batch', 'created_at']
+    list_filter = ['is_plagiarized', 'faculty_label', 'batch', 'created_at']
     search_fields = ['project1__student_id', 'project2__student_id', 'batch__batch_name']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'labeled_at']
     ordering = ['-similarity_score']
     
     def project1_student_id(self, obj):
@@ -34,4 +37,49 @@ class PlagiarismResultAdmin(admin.ModelAdmin):
     
     def project2_student_id(self, obj):
         return obj.project2.student_id
-    project2_student_id.short_description = 'Student 2'
\ No newline at end of file
+    project2_student_id.short_description = 'Student 2'
+
+@admin.register(StudentSummary)
+class StudentSummaryAdmin(admin.ModelAdmin):
+    list_display = ['student_id', 'batch', 'max_similarity', 'similar_to', 'plagiarism_count']
+    list_filter = ['batch']
+    search_fields = ['student_id', 'similar_to', 'batch__batch_name']
+    ordering = ['-max_similarity']
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'faculty', 'status', 'total_size', 'batch', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['file_name', 'batch_name', 'faculty__username']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['-updated_at']
+
+@admin.register(FingerprintPosting)
+class FingerprintPostingAdmin(admin.ModelAdmin):
+    list_display = ['fingerprint', 'submission', 'file_index', 'start_line', 'end_line']
+    search_fields = ['submission__student_id', 'submission__batch__batch_name']
+    raw_id_fields = ['submission']
+
+@admin.register(MinHashBucket)
+class MinHashBucketAdmin(admin.ModelAdmin):
+    list_display = ['bucket', 'submission']
+    search_fields = ['submission__student_id', 'submission__batch__topic']
+    raw_id_fields = ['submission']
+
+@admin.register(HistoricalMatch)
+class HistoricalMatchAdmin(admin.ModelAdmin):
+    list_display = ['submission', 'matched_submission', 'similarity_score', 'is_plagiarized', 'batch', 'created_at']
+    list_filter = ['is_plagiarized', 'batch__topic']
+    search_fields = ['submission__student_id', 'matched_submission__student_id', 'batch__batch_name']
+    raw_id_fields = ['submission', 'matched_submission']
+    readonly_fields = ['created_at']
+    ordering = ['-similarity_score']
+
+@admin.register(StarterCode)
+class StarterCodeAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'topic', 'faculty', 'uploaded_at']
+    list_filter = ['topic', 'faculty']
+    search_fields = ['file_name', 'topic', 'faculty__username']
+    readonly_fields = ['uploaded_at', 'archive_sha256', 'summary']
+    exclude = ['profile']
+    ordering = ['-uploaded_at']
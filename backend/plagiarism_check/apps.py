@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PlagiarismCheckConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'plagiarism_check'
+
+    def ready(self):
+        # Load the plagiarism model once per process; requests reuse it
+        from .model_registry import model_registry
+        model_registry.load()
@@ -0,0 +1,188 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from .utils import SIMILARITY_WEIGHTS, EXACT_MATCH_THRESHOLD
+from .sketch import FeatureSketch
+from .hash_index import FileHashIndex
+
+
+def _incidence_matrix(arrays, values=None):
+    """Build a sparse (project x item) matrix from per-project sorted unique arrays"""
+    lengths = [len(array) for array in arrays]
+    indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    n = len(arrays)
+
+    if indptr[-1] == 0:
+        return csr_matrix((n, 1))
+
+    vocabulary, columns = np.unique(np.concatenate([np.asarray(a) for a in arrays]), return_inverse=True)
+    if values is None:
+        data = np.ones(len(columns), dtype=np.float64)
+    else:
+        data = np.concatenate([np.asarray(v, dtype=np.float64) for v in values])
+    return csr_matrix((data, columns, indptr), shape=(n, len(vocabulary)))
+
+
+def jaccard_matrix(arrays):
+    """All-pairs Jaccard similarity of the item sets, as a dense (n x n) array"""
+    incidence = _incidence_matrix(arrays)
+    intersection = (incidence @ incidence.T).toarray()
+    sizes = np.asarray(incidence.sum(axis=1)).ravel()
+    union = sizes[:, None] + sizes[None, :] - intersection
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(union > 0, intersection / union, 0.0)
+
+
+def _row_products(matrix, first, second, chunk_size=50000):
+    """Row-wise dot products matrix[first[k]] . matrix[second[k]] for selected pairs"""
+    products = np.zeros(len(first))
+    for start in range(0, len(first), chunk_size):
+        end = start + chunk_size
+        chunk = matrix[first[start:end]].multiply(matrix[second[start:end]])
+        products[start:end] = np.asarray(chunk.sum(axis=1)).ravel()
+    return products
+
+
+def jaccard_pairs(arrays, first, second):
+    """Jaccard similarity of the item sets for selected pairs only"""
+    incidence = _incidence_matrix(arrays)
+    intersection = _row_products(incidence, first, second)
+    sizes = np.asarray(incidence.sum(axis=1)).ravel()
+    union = sizes[first] + sizes[second] - intersection
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(union > 0, intersection / union, 0.0)
+
+
+def _tfidf_rows(sketches):
+    """Batch-wide TF-IDF matrix and a mask of projects that have tokens"""
+    has_tokens = np.array([len(sketch.token_ids) > 0 for sketch in sketches])
+    if has_tokens.sum() < 2:
+        return None, has_tokens
+
+    # Interned token counts form the document-term matrix directly
+    counts = _incidence_matrix(
+        [sketch.token_ids for sketch in sketches],
+        [sketch.token_counts for sketch in sketches]
+    )
+    return TfidfTransformer().fit_transform(counts), has_tokens
+
+
+def tfidf_cosine_matrix(sketches):
+    """Fit TF-IDF once over the whole batch and return all-pairs cosine scores"""
+    n = len(sketches)
+    tfidf_matrix, has_tokens = _tfidf_rows(sketches)
+    if tfidf_matrix is None:
+        return np.zeros((n, n))
+
+    # Rows are L2-normalised, so one sparse product gives every cosine score
+    similarity = (tfidf_matrix @ tfidf_matrix.T).toarray()
+
+    # Keep the pairwise behaviour: a project without tokens scores 0 against everything
+    similarity[~has_tokens, :] = 0
+    similarity[:, ~has_tokens] = 0
+    return np.clip(similarity, 0.0, 1.0)
+
+
+def tfidf_cosine_pairs(sketches, first, second):
+    """Batch-wide TF-IDF cosine scores for selected pairs only"""
+    tfidf_matrix, has_tokens = _tfidf_rows(sketches)
+    if tfidf_matrix is None:
+        return np.zeros(len(first))
+
+    similarity = _row_products(tfidf_matrix, first, second)
+    similarity[~(has_tokens[first] & has_tokens[second])] = 0
+    return np.clip(similarity, 0.0, 1.0)
+
+
+def _length_similarity(lengths1, lengths2):
+    longest = np.maximum(lengths1, lengths2)
+    difference = np.abs(lengths1 - lengths2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(longest > 0, 1 - difference / longest, 0.0)
+
+
+def length_similarity_matrix(line_counts):
+    """All-pairs structure similarity from total line counts"""
+    lengths = np.asarray(line_counts, dtype=np.float64)
+    return _length_similarity(lengths[:, None], lengths[None, :])
+
+
+def calculate_batch_similarity(sketches, pairs=None, hash_index=None):
+    """Calculate similarity features for every pair of projects in a batch at once.
+
+    ``sketches`` are FeatureSketch objects (raw feature dicts are converted).
+    Returns a dict mapping ``(i, j)`` (indexes into ``sketches``, ``i < j``)
+    to the same ``similarity_features`` dict produced by
+    ``calculate_similarity_features_enhanced``.
+
+    ``pairs`` optionally limits scoring to ``(first, second)`` index arrays,
+    e.g. the LSH candidates from ``select_candidate_pairs``. TF-IDF is still
+    fitted over the whole batch, so scores match the all-pairs mode.
+
+    Hash similarity comes from ``hash_index`` (a FileHashIndex of the same
+    sketches), built here when not given.
+    """
+    sketches = [FeatureSketch.coerce(sketch) for sketch in sketches]
+    n = len(sketches)
+    if n < 2:
+        return {}
+
+    line_counts = np.array([s.scalars['total_lines'] for s in sketches], dtype=np.float64)
+    if hash_index is None:
+        hash_index = FileHashIndex([s.file_hashes for s in sketches])
+
+    if pairs is None:
+        print(f"🧮 Computing batch similarity for {n} projects ({n * (n - 1) // 2} pairs)...")
+        rows, cols = np.triu_indices(n, k=1)
+        hash_sim = hash_index.jaccard(rows, cols)
+        function_sim = jaccard_matrix([s.function_names for s in sketches])[rows, cols]
+        import_sim = jaccard_matrix([s.imports for s in sketches])[rows, cols]
+        variable_sim = jaccard_matrix([s.variable_names for s in sketches])[rows, cols]
+        keyword_sim = jaccard_matrix([s.keywords for s in sketches])[rows, cols]
+        tfidf_sim = tfidf_cosine_matrix(sketches)[rows, cols]
+    else:
+        rows, cols = (np.asarray(index, dtype=np.int64) for index in pairs)
+        print(f"🧮 Computing batch similarity for {n} projects ({len(rows)} candidate pairs)...")
+        hash_sim = hash_index.jaccard(rows, cols)
+        function_sim = jaccard_pairs([s.function_names for s in sketches], rows, cols)
+        import_sim = jaccard_pairs([s.imports for s in sketches], rows, cols)
+        variable_sim = jaccard_pairs([s.variable_names for s in sketches], rows, cols)
+        keyword_sim = jaccard_pairs([s.keywords for s in sketches], rows, cols)
+        tfidf_sim = tfidf_cosine_pairs(sketches, rows, cols)
+
+    length_sim = _length_similarity(line_counts[rows], line_counts[cols])
+
+    weights = SIMILARITY_WEIGHTS
+    overall = (
+        hash_sim * weights['hash'] +
+        tfidf_sim * weights['tfidf'] +
+        function_sim * weights['function'] +
+        import_sim * weights['import'] +
+        variable_sim * weights['variable'] +
+        length_sim * weights['length']
+    )
+
+    # 🔥 Force 100% similarity for exact file matches
+    overall = np.where(hash_sim >= EXACT_MATCH_THRESHOLD, 1.0, overall)
+
+    results = {}
+    for k, (i, j) in enumerate(zip(rows.tolist(), cols.tolist())):
+        results[(i, j)] = {
+            'hash_similarity': float(hash_sim[k]),
+            'tfidf_similarity': float(tfidf_sim[k]),
+            'import_similarity': float(import_sim[k]),
+            'function_similarity': float(function_sim[k]),
+            'variable_similarity': float(variable_sim[k]),
+            'length_similarity': float(length_sim[k]),
+            'keyword_similarity': float(keyword_sim[k]),
+            'overall_similarity': float(overall[k]),
+            'structure_difference': float(1 - length_sim[k])
+        }
+
+    exact_matches = int((hash_sim >= EXACT_MATCH_THRESHOLD).sum())
+    print(f"  ✅ Batch similarity done: {len(results)} pairs, {exact_matches} exact matches")
+    return results
@@ -0,0 +1,140 @@
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .fingerprint import ProjectFingerprints
+from .kgram_index import DEFAULT_FINGERPRINT_MIN_SHARED
+from .lsh import lsh_band_keys, lsh_layout
+from .models import FingerprintPosting, MinHashBucket, ProjectSubmission
+from .sketch import MINHASH_PERMUTATIONS, FeatureSketch
+from .snippet_search import lookup_postings, signed_hashes
+
+
+# Earlier submissions scored against each new submission (most shared
+# buckets and fingerprints first), so the work per batch stays linear
+DEFAULT_CORPUS_CANDIDATES = 20
+
+# Buckets or fingerprints held by more earlier submissions than this are
+# common to the topic and are not looked up
+DEFAULT_CORPUS_MAX_POSTING = 200
+
+_INDEX_BATCH_SIZE = 5000
+
+
+def sketch_band_keys(sketch):
+    """LSH band keys of one sketch (none when it has no MinHash signature)"""
+    sketch = FeatureSketch.coerce(sketch)
+    if len(sketch.minhash) != MINHASH_PERMUTATIONS:
+        return np.empty(0, dtype=np.int64)
+    bands, rows = lsh_layout()
+    return lsh_band_keys(sketch.minhash[None, :], bands, rows)[0]
+
+
+def index_submission_buckets(submissions):
+    """Add the LSH band keys of saved submissions to the corpus index; returns the count"""
+    buckets = [
+        MinHashBucket(submission_id=submission.pk, bucket=key)
+        for submission in submissions if submission.sketch
+        for key in sketch_band_keys(submission.sketch).tolist()
+    ]
+    MinHashBucket.objects.bulk_create(buckets, batch_size=_INDEX_BATCH_SIZE)
+    return len(buckets)
+
+
+class TopicCorpus:
+    """Every stored submission of one faculty member's topic, searched through the persistent indexes.
+
+    Each completed batch adds the LSH band keys of its submissions
+    (MinHashBucket) and their winnowed fingerprints (FingerprintPosting);
+    sketches stay on ProjectSubmission. Candidates for a new batch come from
+    the postings of its own keys only, so the cost grows with the new
+    submissions and their matches rather than with the whole history.
+    """
+
+    def __init__(self, faculty, topic, exclude_batch=None):
+        self.faculty = faculty
+        self.topic = topic
+        self.exclude_batch = exclude_batch
+
+    def _postings(self, model):
+        postings = model.objects.filter(submission__batch__faculty=self.faculty, submission__batch__topic=self.topic)
+        if self.exclude_batch is not None:
+            postings = postings.exclude(submission__batch=self.exclude_batch)
+        return postings
+
+    def _shared(self, model, key_field, keys_per_project):
+        """``[{submission id: shared keys}]`` for each project's key array"""
+        max_posting = getattr(settings, 'CORPUS_MAX_POSTING', DEFAULT_CORPUS_MAX_POSTING)
+        shared = [defaultdict(int) for _ in keys_per_project]
+        keys_per_project = [np.unique(keys).tolist() for keys in keys_per_project]
+        lookup = sorted({key for keys in keys_per_project for key in keys})
+        if not lookup:
+            return shared
+
+        rows, _ = lookup_postings(
+            self._postings(model), lookup, (key_field, 'submission_id'), max_posting, key_field=key_field
+        )
+        holders = defaultdict(set)
+        for key, submission_id in rows:
+            holders[key].add(submission_id)
+        for counts, keys in zip(shared, keys_per_project):
+            for key in keys:
+                for submission_id in holders.get(key, ()):
+                    counts[submission_id] += 1
+        return shared
+
+    def candidate_pairs(self, sketches, fingerprints):
+        """``(project index, submission id)`` pairs worth scoring, in project order.
+
+        A stored submission is a candidate when it shares an LSH bucket or at
+        least FINGERPRINT_MIN_SHARED fingerprints with the project; at most
+        CORPUS_CANDIDATES are kept per project.
+        """
+        limit = getattr(settings, 'CORPUS_CANDIDATES', DEFAULT_CORPUS_CANDIDATES)
+        min_shared = getattr(settings, 'FINGERPRINT_MIN_SHARED', DEFAULT_FINGERPRINT_MIN_SHARED)
+
+        shared_buckets = self._shared(MinHashBucket, 'bucket', [sketch_band_keys(sketch) for sketch in sketches])
+        shared_fingerprints = self._shared(
+            FingerprintPosting, 'fingerprint',
+            [signed_hashes(ProjectFingerprints.coerce(value).hashes) for value in fingerprints]
+        )
+
+        pairs = []
+        for index, (buckets, kgrams) in enumerate(zip(shared_buckets, shared_fingerprints)):
+            found = set(buckets) | {submission_id for submission_id, shared in kgrams.items() if shared >= min_shared}
+            ranked = sorted((-buckets.get(submission_id, 0), -kgrams.get(submission_id, 0), submission_id)
+                            for submission_id in found)
+            pairs.extend((index, submission_id) for _, _, submission_id in ranked[:limit])
+        return pairs
+
+    def load(self, submission_ids):
+        """Stored submissions (with their batch) by id"""
+        return ProjectSubmission.objects.select_related('batch').in_bulk(submission_ids)
+
+
+def historical_match_report(batch):
+    """JSON rows of the batch's matches against earlier batches, highest similarity first"""
+    matches = batch.historical_matches.order_by('-similarity_score', 'id').values(
+        'id', 'similarity_score', 'is_plagiarized', 'confidence',
+        'submission__student_id', 'matched_submission__student_id',
+        'matched_submission__batch_id', 'matched_submission__batch__batch_name',
+        'matched_submission__batch__uploaded_at',
+        'comparison_details__fingerprint_similarity', 'comparison_details__matched_regions'
+    )
+    return [
+        {
+            'id': match['id'],
+            'student_id': match['submission__student_id'],
+            'matched_student_id': match['matched_submission__student_id'],
+            'matched_batch_id': match['matched_submission__batch_id'],
+            'matched_batch_name': match['matched_submission__batch__batch_name'],
+            'matched_batch_uploaded_at': match['matched_submission__batch__uploaded_at'],
+            'similarity_percentage': round(match['similarity_score'] * 100, 2),
+            'plagiarized_status': 'Yes' if match['is_plagiarized'] else 'No',
+            'confidence': match['confidence'],
+            'fingerprint_similarity': match['comparison_details__fingerprint_similarity'],
+            'matched_regions': match['comparison_details__matched_regions'] or []
+        }
+        for match in matches
+    ]
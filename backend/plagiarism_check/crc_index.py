@@ -0,0 +1,214 @@
+import hashlib
+import time
+import zipfile
+from collections import defaultdict
+from contextlib import ExitStack
+from itertools import combinations
+
+from django.conf import settings
+
+from .utils import EXACT_MATCH_THRESHOLD, is_code_file
+from .zip_ingest import BatchArchiveReader, list_members, open_nested_zip
+
+
+# Files held by more projects than this (shared boilerplate) are reported
+# but not expanded into pairs, which would be quadratic in the holders
+DEFAULT_CRC_INDEX_MAX_GROUP = 50
+
+# Duplicate files listed in the stored report (the counts cover all of them)
+DEFAULT_CRC_REPORT_MAX_FILES = 200
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def split_source(source):
+    """Split a project ``source`` (``batch.zip!section.zip!student.zip`` or
+    ``batch.zip!folder/``) into the archive path, nested archive members and
+    the folder prefix of the project inside the innermost archive"""
+    zip_path, *chain = source.split('!')
+    prefix = ''
+    if chain and not chain[-1].lower().endswith('.zip'):
+        prefix = chain.pop()
+    return zip_path, chain, prefix
+
+
+def hash_project_members(project, paths):
+    """SHA-256 of the raw bytes of some members of one project, read from its archive"""
+    zip_path, chain, prefix = split_source(project['source'])
+    hashes = {}
+    with ExitStack() as stack:
+        archive = stack.enter_context(zipfile.ZipFile(zip_path))
+        for member in chain:
+            archive = stack.enter_context(open_nested_zip(archive, archive.getinfo(member)))
+        for path in paths:
+            digest = hashlib.sha256()
+            with archive.open(prefix + path) as f:
+                for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            hashes[path] = digest.hexdigest()
+    return hashes
+
+
+class CrcDuplicateIndex:
+    """Inverted index from (CRC32, size) of code files to the projects holding them.
+
+    Built from per-project manifests taken from the ZIP central directories.
+    Every key held by several projects is a duplicate file. ``confirm``
+    splits any group whose content digests differ (a CRC collision). Empty
+    files and ``ignored_keys`` (e.g. unmodified starter code) are ignored.
+    """
+
+    def __init__(self, projects, ignored_keys=frozenset()):
+        self.projects = projects
+        self.project_keys = []
+        postings = defaultdict(dict)
+        for index, project in enumerate(projects):
+            keys = set()
+            for entry in project['manifest']:
+                key = (entry['crc'], entry['size'])
+                if entry['size'] and is_code_file(entry['path']) and key not in ignored_keys:
+                    postings[key].setdefault(index, []).append(entry['path'])
+                    keys.add(key)
+            self.project_keys.append(keys)
+
+        # (key, {project index: [paths]}) for every file shared by two or more projects
+        self.groups = [(key, holders) for key, holders in postings.items() if len(holders) > 1]
+        self.confirmed = False
+
+    def _read_digests(self):
+        """SHA-256 of every member in a duplicate group, re-read from the archives"""
+        needed = defaultdict(set)
+        for _, holders in self.groups:
+            for index, paths in holders.items():
+                needed[index].update(paths)
+
+        digests = {}
+        for index, paths in needed.items():
+            try:
+                for path, digest in hash_project_members(self.projects[index], paths).items():
+                    digests[(index, path)] = digest
+            except (KeyError, OSError, RuntimeError, zipfile.BadZipFile) as e:
+                print(f"  ⚠️ Could not confirm duplicates of {self.projects[index]['name']}: {e}")
+        return digests
+
+    def confirm(self, digests=None):
+        """Verify shared files by content digest; files without a digest are dropped.
+
+        ``digests`` maps ``(project index, path)`` to a digest computed
+        elsewhere (e.g. the content MD5s of feature extraction). Without it
+        the shared members are re-read from the archives and hashed, which
+        decompresses every nested archive holding one.
+        """
+        if digests is None:
+            digests = self._read_digests()
+
+        confirmed = []
+        for key, holders in self.groups:
+            by_digest = defaultdict(dict)
+            for index, paths in holders.items():
+                for path in paths:
+                    digest = digests.get((index, path))
+                    if digest is not None:
+                        by_digest[digest].setdefault(index, []).append(path)
+            confirmed.extend((key, split) for split in by_digest.values() if len(split) > 1)
+
+        self.groups = confirmed
+        self.confirmed = True
+
+    def shared_file_counts(self):
+        """{(i, j): number of distinct shared files} for project index pairs, i < j"""
+        max_group = getattr(settings, 'CRC_INDEX_MAX_GROUP', DEFAULT_CRC_INDEX_MAX_GROUP)
+        counts = defaultdict(int)
+        for _, holders in self.groups:
+            if len(holders) <= max_group:
+                for pair in combinations(sorted(holders), 2):
+                    counts[pair] += 1
+        return dict(counts)
+
+    def exact_copy_pairs(self, threshold=EXACT_MATCH_THRESHOLD):
+        """Pairs whose shared files make up at least ``threshold`` of their combined code files"""
+        pairs = []
+        for (i, j), shared in self.shared_file_counts().items():
+            union = len(self.project_keys[i]) + len(self.project_keys[j]) - shared
+            if union and shared / union >= threshold:
+                pairs.append((i, j))
+        return pairs
+
+    def identical_submissions(self):
+        """Groups of project indexes whose code files are all identical"""
+        shared_by = defaultdict(set)
+        for group_id, (_, holders) in enumerate(self.groups):
+            for index in holders:
+                shared_by[index].add(group_id)
+
+        by_content = defaultdict(list)
+        for index, group_ids in shared_by.items():
+            # Every code file of the project must be one of the shared ones
+            if len(group_ids) == len(self.project_keys[index]):
+                by_content[frozenset(group_ids)].append(index)
+        return sorted(sorted(indexes) for indexes in by_content.values() if len(indexes) > 1)
+
+    def report(self):
+        """JSON summary: duplicate files (most widely shared first) and identical submissions"""
+        max_files = getattr(settings, 'CRC_REPORT_MAX_FILES', DEFAULT_CRC_REPORT_MAX_FILES)
+        names = [project['name'] for project in self.projects]
+        groups = sorted(self.groups, key=lambda group: (-len(group[1]), group[0]))
+        return {
+            'confirmed': self.confirmed,
+            'duplicate_file_count': len(groups),
+            'duplicate_files': [
+                {
+                    'crc32': f'{crc:08x}',
+                    'size': size,
+                    'projects': {names[index]: paths for index, paths in sorted(holders.items())}
+                }
+                for (crc, size), holders in groups[:max_files]
+            ],
+            'identical_submissions': [
+                [names[index] for index in indexes] for indexes in self.identical_submissions()
+            ]
+        }
+
+
+def index_duplicates(projects, ignored_keys=frozenset(), digests=None):
+    """Build (and, with CRC_DUPLICATE_CONFIRM, confirm) the CRC index of some projects.
+
+    ``projects`` are reader project dicts (only ``name``, ``source`` and
+    ``manifest`` are used); ``digests`` is passed on to ``confirm``.
+    """
+    started = time.monotonic()
+    index = CrcDuplicateIndex(projects, ignored_keys)
+    if getattr(settings, 'CRC_DUPLICATE_CONFIRM', True):
+        index.confirm(digests)
+
+    print(f"🧾 CRC index: {len(index.projects)} projects, {len(index.groups)} duplicate files, "
+          f"{len(index.identical_submissions())} identical submission groups "
+          f"({time.monotonic() - started:.2f}s)")
+    return index
+
+
+def index_central_directory(zip_path, ignored_keys=frozenset()):
+    """CRC index of a folder-style batch from its central directory alone, or None.
+
+    Nothing is decompressed except, with CRC_DUPLICATE_CONFIRM, the members
+    of duplicate groups. Batches holding nested ZIPs give None: their
+    central directories can only be reached by decompressing them, so the
+    pipeline indexes them from the extraction pass instead. Raises
+    ``zipfile.BadZipFile`` for invalid archives.
+    """
+    with zipfile.ZipFile(zip_path) as zip_ref:
+        if any(info.filename.lower().endswith('.zip') for info in list_members(zip_ref)):
+            return None
+    return find_exact_duplicates(zip_path, ignored_keys)
+
+
+def find_exact_duplicates(zip_path, ignored_keys=frozenset()):
+    """CRC index of a batch archive, read on its own.
+
+    Project members are not read, but every nested archive is decompressed
+    to reach its central directory, and confirming re-reads the shared
+    members. For batches with nested ZIPs the pipeline avoids both by
+    indexing the manifests of its extraction pass (see ``index_duplicates``).
+    Raises ``zipfile.BadZipFile`` for invalid archives.
+    """
+    return index_duplicates(list(BatchArchiveReader(zip_path, manifest_only=True)), ignored_keys)
@@ -0,0 +1,112 @@
+import os
+import gzip
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from .utils import extract_code_features_from_files, new_feature_dict
+from .sketch import FeatureSketch
+from .fingerprint import ProjectFingerprints
+
+
+def _feature_workers():
+    workers = getattr(settings, 'FEATURE_EXTRACTION_WORKERS', None)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(int(workers), 0)
+
+
+def build_submission_data(features):
+    """Compact per-submission data: scalar summary, binary sketch, gzipped source,
+    k-gram fingerprints and the paths of each code-file hash"""
+    sketch = FeatureSketch.from_features(features)
+    return {
+        'summary': sketch.summary(),
+        'sketch': sketch.to_bytes(),
+        'content': gzip.compress(features['text_content'].encode('utf-8')),
+        'fingerprints': ProjectFingerprints.from_files(features.get('fingerprints', [])).to_bytes(),
+        'file_paths': features.get('file_paths', {})
+    }
+
+
+# Starter profile of the batch being extracted, set once per worker process
+_worker_starter = None
+
+
+def _init_worker(starter):
+    global _worker_starter
+    _worker_starter = starter
+
+
+def _extract_in_worker(files):
+    return extract_features_safely(files, _worker_starter)
+
+
+def extract_features_safely(files, starter=None):
+    """Run feature extraction for one project, returning (submission_data, error).
+
+    With a ``starter`` (StarterProfile) the starter code is removed first.
+    """
+    try:
+        if starter is None:
+            return build_submission_data(extract_code_features_from_files(files)), None
+        features = extract_code_features_from_files(starter.filter_files(files))
+        return build_submission_data(starter.subtract(features)), None
+    except Exception as e:
+        return build_submission_data(new_feature_dict()), f"{type(e).__name__}: {e}"
+
+
+def extract_features_parallel(projects, max_workers=None, starter=None):
+    """Extract features for many projects across a process pool.
+
+    ``projects`` is any iterable of project dicts with a ``files`` list (as
+    produced by ``BatchArchiveReader``). Yields ``(project, data, error)`` in
+    the same order as the input, where ``data`` comes from
+    ``build_submission_data``. Workers only send back the compact sketch, not
+    the full feature dict. A failing project yields empty data and an error
+    message instead of aborting the batch. Only a bounded window
+    of projects is in flight, so the input can be a lazy stream.
+
+    With ``max_workers`` (or ``FEATURE_EXTRACTION_WORKERS``) set to 0 or 1
+    extraction runs in the calling process. A ``starter`` profile is sent
+    to each worker once, not with every project.
+    """
+    workers = _feature_workers() if max_workers is None else max_workers
+
+    if workers <= 1:
+        for project in projects:
+            data, error = extract_features_safely(project['files'], starter)
+            yield project, data, error
+        return
+
+    print(f"⚙️ Extracting features with {workers} worker processes")
+
+    # spawn keeps workers independent of the (threaded) server process state
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(starter,)) as executor:
+        pending = deque()
+        project_iter = iter(projects)
+
+        def submit_next():
+            project = next(project_iter, None)
+            if project is not None:
+                pending.append((project, executor.submit(_extract_in_worker, project['files'])))
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        while pending:
+            project, future = pending.popleft()
+            try:
+                data, error = future.result()
+            except Exception as e:
+                # Worker crashed (e.g. killed or out of memory)
+                data, error = build_submission_data(new_feature_dict()), f"{type(e).__name__}: {e}"
+            submit_next()
+
+            if error:
+                print(f"  ⚠️ Feature extraction failed for {project['name']}: {error}")
+            yield project, data, error
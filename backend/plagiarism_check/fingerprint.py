@@ -0,0 +1,227 @@
+import hashlib
+import re
+import struct
+import zlib
+
+import numpy as np
+
+
+# Binary layout: MAGIC | version (u8) | zlib(paths, arrays)
+FINGERPRINT_MAGIC = b'ZFP'
+FINGERPRINT_VERSION = 1
+
+# Noise threshold (tokens per k-gram) and winnowing window: any run of at
+# least KGRAM_SIZE + WINNOW_WINDOW - 1 matching normalized tokens (a few
+# lines of code) is guaranteed to share a fingerprint. Changing them
+# invalidates stored fingerprints, so bump FINGERPRINT_VERSION with them.
+KGRAM_SIZE = 25
+WINNOW_WINDOW = 20
+
+# Array sections in on-disk order: (name, numpy dtype)
+ARRAY_FIELDS = (
+    ('hashes', '<u8'),       # winnowed k-gram hashes, in file and position order
+    ('files', '<u4'),        # index into ``paths``
+    ('start_lines', '<u4'),  # first line of the k-gram (1-based)
+    ('end_lines', '<u4'),    # last line of the k-gram
+)
+
+# Kept as-is; every other identifier becomes 'V', so renaming does not hide a copy
+KEYWORDS = frozenset({
+    # Python
+    'False', 'None', 'True', 'and', 'as', 'assert', 'async', 'await', 'break', 'class', 'continue',
+    'def', 'del', 'elif', 'else', 'except', 'finally', 'for', 'from', 'global', 'if', 'import', 'in',
+    'is', 'lambda', 'nonlocal', 'not', 'or', 'pass', 'raise', 'return', 'try', 'while', 'with', 'yield',
+    # JavaScript / TypeScript / Java / C-family
+    'case', 'catch', 'const', 'default', 'delete', 'do', 'export', 'extends', 'false', 'function',
+    'instanceof', 'let', 'new', 'null', 'of', 'private', 'protected', 'public', 'static', 'super',
+    'switch', 'this', 'throw', 'true', 'typeof', 'undefined', 'var', 'void', 'interface', 'implements',
+    'struct', 'int', 'float', 'double', 'char', 'long', 'bool', 'boolean', 'string', 'goto', 'sizeof',
+})
+
+_STRING = r'''"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`'''
+_TOKEN_BODY = rf'''
+    (?P<string>{_STRING})
+  | (?P<number>\b\d[\w.]*)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<space>\s+)
+  | (?P<op>.)
+'''
+# '#' starts a comment in Python only (it is an id selector in CSS, a directive in C)
+_HASH_COMMENT_TOKENS = re.compile(rf'(?P<comment>\#[^\n]*)|{_TOKEN_BODY}', re.VERBOSE | re.DOTALL)
+_SLASH_COMMENT_TOKENS = re.compile(r'(?P<comment>//[^\n]*|/\*[\s\S]*?\*/|<!--[\s\S]*?-->)|' + _TOKEN_BODY, re.VERBOSE | re.DOTALL)
+
+_MIX_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_token_ids = {}
+
+
+def _token_id(token):
+    """Stable 64-bit id for a normalized token (the vocabulary stays small)"""
+    token_id = _token_ids.get(token)
+    if token_id is None:
+        digest = hashlib.blake2b(token.encode('utf-8', errors='ignore'), digest_size=8).digest()
+        token_id = _token_ids[token] = int.from_bytes(digest, 'little')
+    return token_id
+
+
+def normalize_tokens(content, file_ext=''):
+    """Normalized tokens of a source file with their line spans.
+
+    Comments and whitespace are dropped, identifiers that are not keywords
+    become ``V``, string literals ``S`` and numbers ``N``. Returns
+    ``(tokens, start_lines, end_lines)``.
+    """
+    pattern = _HASH_COMMENT_TOKENS if file_ext == '.py' else _SLASH_COMMENT_TOKENS
+    tokens, start_lines, end_lines = [], [], []
+    line = 1
+    for match in pattern.finditer(content):
+        kind = match.lastgroup
+        text = match.group()
+        newlines = text.count('\n')
+        if kind == 'name':
+            tokens.append(text if text in KEYWORDS else 'V')
+        elif kind == 'string':
+            tokens.append('S')
+        elif kind == 'number':
+            tokens.append('N')
+        elif kind == 'op':
+            tokens.append(text)
+        if kind not in ('space', 'comment'):
+            start_lines.append(line)
+            end_lines.append(line + newlines)
+        line += newlines
+    return tokens, start_lines, end_lines
+
+
+def kgram_hashes(token_ids, size=KGRAM_SIZE):
+    """64-bit hash of every ``size``-token window of a token id array"""
+    if len(token_ids) < size:
+        return np.empty(0, dtype=np.uint64)
+
+    windows = np.lib.stride_tricks.sliding_window_view(token_ids, size)
+    combined = np.zeros(len(windows), dtype=np.uint64)
+    multiplier = np.uint64(1099511628211)
+    with np.errstate(over='ignore'):
+        for column in range(size):
+            combined = combined * multiplier + windows[:, column]
+        # Final mix so nearby windows do not produce ordered hashes
+        combined ^= combined >> np.uint64(31)
+        combined *= _MIX_MULTIPLIER
+        combined ^= combined >> np.uint64(29)
+    return combined
+
+
+def winnow(hashes, window=WINNOW_WINDOW):
+    """Positions selected by robust winnowing: the rightmost minimum of every window"""
+    if len(hashes) == 0:
+        return np.empty(0, dtype=np.int64)
+    if len(hashes) <= window:
+        return np.array([len(hashes) - 1 - int(np.argmin(hashes[::-1]))], dtype=np.int64)
+
+    windows = np.lib.stride_tricks.sliding_window_view(hashes, window)
+    rightmost = window - 1 - np.argmin(windows[:, ::-1], axis=1)
+    return np.unique(np.arange(len(windows)) + rightmost)
+
+
+def source_kgrams(content, file_ext=''):
+    """Every k-gram of one file: ``(hashes, start_lines, end_lines)`` arrays"""
+    tokens, start_lines, end_lines = normalize_tokens(content, file_ext)
+    token_ids = np.array([_token_id(token) for token in tokens], dtype=np.uint64)
+    hashes = kgram_hashes(token_ids)
+
+    start_lines = np.asarray(start_lines, dtype=np.uint32)[:len(hashes)]
+    end_lines = np.asarray(end_lines, dtype=np.uint32)[KGRAM_SIZE - 1:]
+    return hashes, start_lines, end_lines
+
+
+def fingerprint_source(content, file_ext=''):
+    """Winnowed fingerprints of one file: ``(hashes, start_lines, end_lines)`` arrays"""
+    hashes, start_lines, end_lines = source_kgrams(content, file_ext)
+    positions = winnow(hashes)
+    return hashes[positions], start_lines[positions], end_lines[positions]
+
+
+class ProjectFingerprints:
+    """Winnowed k-gram fingerprints of every code file of a submission, with positions"""
+
+    def __init__(self, paths, arrays):
+        self.paths = paths
+        self.arrays = arrays
+
+    def __getattr__(self, name):
+        arrays = self.__dict__.get('arrays', {})
+        if name in arrays:
+            return arrays[name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return len(self.arrays['hashes'])
+
+    @classmethod
+    def from_files(cls, fingerprinted_files):
+        """Build from ``(path, (hashes, start_lines, end_lines))`` pairs"""
+        paths = []
+        sections = {name: [] for name, _ in ARRAY_FIELDS}
+        for path, (hashes, start_lines, end_lines) in fingerprinted_files:
+            if not len(hashes):
+                continue
+            sections['files'].append(np.full(len(hashes), len(paths), dtype='<u4'))
+            sections['hashes'].append(hashes)
+            sections['start_lines'].append(start_lines)
+            sections['end_lines'].append(end_lines)
+            paths.append(path)
+
+        arrays = {
+            name: np.concatenate(sections[name]).astype(dtype) if sections[name] else np.empty(0, dtype=dtype)
+            for name, dtype in ARRAY_FIELDS
+        }
+        return cls(paths, arrays)
+
+    @classmethod
+    def empty(cls):
+        return cls.from_files([])
+
+    def to_bytes(self):
+        encoded_paths = [path.encode('utf-8', errors='replace') for path in self.paths]
+        body = bytearray(struct.pack('<I', len(encoded_paths)))
+        for path in encoded_paths:
+            body += struct.pack('<I', len(path)) + path
+        for name, dtype in ARRAY_FIELDS:
+            array = np.ascontiguousarray(self.arrays[name], dtype=dtype)
+            body += struct.pack('<I', len(array))
+            body += array.tobytes()
+        return FINGERPRINT_MAGIC + struct.pack('<B', FINGERPRINT_VERSION) + zlib.compress(bytes(body), 6)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:3] != FINGERPRINT_MAGIC:
+            raise ValueError('Not a fingerprint set')
+        version = data[3]
+        if version != FINGERPRINT_VERSION:
+            raise ValueError(f'Unsupported fingerprint version {version}')
+
+        body = zlib.decompress(data[4:])
+        (path_count,) = struct.unpack_from('<I', body, 0)
+        position = 4
+        paths = []
+        for _ in range(path_count):
+            (length,) = struct.unpack_from('<I', body, position)
+            position += 4
+            paths.append(body[position:position + length].decode('utf-8'))
+            position += length
+
+        arrays = {}
+        for name, dtype in ARRAY_FIELDS:
+            (length,) = struct.unpack_from('<I', body, position)
+            position += 4
+            arrays[name] = np.frombuffer(body, dtype=dtype, count=length, offset=position)
+            position += length * np.dtype(dtype).itemsize
+        return cls(paths, arrays)
+
+    @classmethod
+    def coerce(cls, value):
+        """Accept a ProjectFingerprints or its serialized bytes (None gives an empty set)"""
+        if isinstance(value, cls):
+            return value
+        if not value:
+            return cls.empty()
+        return cls.from_bytes(bytes(value))
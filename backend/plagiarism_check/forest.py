@@ -0,0 +1,142 @@
+import json
+
+import numpy as np
+
+
+# Rows evaluated per block: every tree walks the whole block at once
+# (small blocks keep the node gathers in cache)
+DEFAULT_BLOCK_SIZE = 256
+
+
+class CompiledForest:
+    """Tree ensemble flattened into NumPy arrays, evaluated without sklearn.
+
+    All trees share one node table (``feature``, ``threshold``, ``left``,
+    ``right``, ``value``); ``roots`` holds the first node of each tree. Leaves
+    point to themselves with an infinite threshold, so walking every tree
+    ``max_depth`` steps lands each row on its leaf without branching.
+    ``predict_proba`` mirrors ``RandomForestClassifier.predict_proba``
+    for a binary classifier.
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, metadata=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.metadata = metadata or {}
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def version(self):
+        return self.metadata.get('version')
+
+    def predict_positive(self, X, block_size=DEFAULT_BLOCK_SIZE):
+        """Mean positive-class probability over all trees for each row of X"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        result = np.empty(len(X))
+
+        for start in range(0, len(X), block_size):
+            block = X[start:start + block_size]
+            flat_block = block.ravel()
+            row_offsets = (np.arange(len(block)) * X.shape[1])[None, :]
+            nodes = np.repeat(self.roots[:, None], len(block), axis=1)
+
+            for _ in range(self.max_depth):
+                values = flat_block[row_offsets + self.feature[nodes]]
+                nodes = np.where(values <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+
+            result[start:start + len(block)] = self.value[nodes].mean(axis=0)
+        return result
+
+    def predict_proba(self, X):
+        positive = self.predict_positive(X)
+        return np.column_stack([1 - positive, positive])
+
+    def predict(self, X):
+        return (self.predict_positive(X) > 0.5).astype(int)
+
+    def save(self, path):
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            max_depth=np.array(self.max_depth),
+            metadata=np.array(json.dumps(self.metadata))
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data['feature'],
+                data['threshold'],
+                data['left'],
+                data['right'],
+                data['value'],
+                data['roots'],
+                int(data['max_depth']),
+                json.loads(str(data['metadata']))
+            )
+
+
+def compile_forest(model, metadata=None):
+    """Flatten a fitted binary RandomForestClassifier (or anything with
+    ``estimators_`` of decision trees) into a CompiledForest"""
+    classes = list(model.classes_)
+    positive = classes.index(1) if 1 in classes else None
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        # Leaves loop back to themselves: x <= inf always takes the left branch
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+        class_values = tree.value[:, 0, :]
+        totals = class_values.sum(axis=1)
+        if positive is None:
+            values.append(np.zeros(tree.node_count))
+        else:
+            values.append(np.divide(class_values[:, positive], totals, out=np.zeros(tree.node_count), where=totals > 0))
+
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    metadata = dict(metadata or {})
+    feature_names = getattr(model, 'feature_names_in_', None)
+    if feature_names is not None:
+        metadata.setdefault('features', [str(name) for name in feature_names])
+
+    return CompiledForest(
+        np.concatenate(features),
+        np.concatenate(thresholds),
+        np.concatenate(lefts),
+        np.concatenate(rights),
+        np.concatenate(values),
+        np.array(roots, dtype=np.int64),
+        max_depth,
+        metadata
+    )
@@ -0,0 +1,155 @@
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .utils import EXACT_MATCH_THRESHOLD
+
+
+# Posting lists longer than this (boilerplate held by much of the batch) are
+# not expanded into pairs; they are counted for each scored pair instead
+DEFAULT_FILE_HASH_MAX_POSTING = 100
+
+# Groups of students listed in the shared-files report
+DEFAULT_SHARED_FILE_GROUPS = 100
+
+_PAIR_CHUNK_SIZE = 50000
+
+
+def posting_pair_codes(owners, starts, counts, n):
+    """Codes ``i * n + j`` (i < j) of every project pair in the given posting lists.
+
+    Each posting list is ``owners[start:start + count]`` in ascending project
+    order; pairs sharing several postings appear once per posting.
+    """
+    codes = []
+    # Postings of equal length expand to their pairs in one array operation
+    for size in np.unique(counts[counts > 1]).tolist():
+        same_size = starts[counts == size]
+        holders = owners[same_size[:, None] + np.arange(size)]
+        first, second = np.triu_indices(size, k=1)
+        codes.append((holders[:, first] * n + holders[:, second]).ravel())
+    return np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+
+
+class FileHashIndex:
+    """Batch-wide inverted index from code-file MD5 to the projects holding it.
+
+    Built once from the sorted, unique ``file_hashes`` of every sketch. The
+    shared-file count of each pair comes from walking the posting lists,
+    so the work grows with the number of shared (file, holder) entries
+    instead of repeating a set intersection for every pair.
+    """
+
+    def __init__(self, file_hashes):
+        self.n = len(file_hashes)
+        self.sizes = np.array([len(hashes) for hashes in file_hashes], dtype=np.int64)
+
+        if self.sizes.sum():
+            hashes = np.concatenate([np.asarray(h, dtype='S16') for h in file_hashes])
+            owners = np.repeat(np.arange(self.n, dtype=np.int64), self.sizes)
+            # Stable sort keeps each posting list in ascending project order
+            order = np.argsort(hashes, kind='stable')
+            self.hashes, self.starts, self.counts = np.unique(hashes[order], return_index=True, return_counts=True)
+            self.owners = owners[order]
+        else:
+            self.hashes = np.empty(0, dtype='S16')
+            self.starts = self.counts = self.owners = np.empty(0, dtype=np.int64)
+
+        self._pair_codes = None
+
+    def holders(self, posting):
+        """Project indexes holding the file of one posting list"""
+        start = self.starts[posting]
+        return self.owners[start:start + self.counts[posting]]
+
+    def digest(self, posting):
+        # Slicing keeps trailing zero bytes that indexing an 'S16' array drops
+        return self.hashes[posting:posting + 1].tobytes().hex()
+
+    def _build_pairs(self):
+        max_posting = getattr(settings, 'FILE_HASH_MAX_POSTING', DEFAULT_FILE_HASH_MAX_POSTING)
+        small = (self.counts > 1) & (self.counts <= max_posting)
+        codes = posting_pair_codes(self.owners, self.starts[small], self.counts[small], self.n)
+        self._pair_codes, self._pair_shared = np.unique(codes, return_counts=True)
+
+        large = np.flatnonzero(self.counts > max_posting)
+        self._large_membership = np.zeros((self.n, len(large)), dtype=bool)
+        for column, posting in enumerate(large.tolist()):
+            self._large_membership[self.holders(posting), column] = True
+
+    def shared_counts(self, first, second):
+        """Number of identical files shared by each pair ``(first[k], second[k])``"""
+        if self._pair_codes is None:
+            self._build_pairs()
+
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        low, high = np.minimum(first, second), np.maximum(first, second)
+        query = low * self.n + high
+        shared = np.zeros(len(query), dtype=np.int64)
+
+        if len(self._pair_codes):
+            position = np.minimum(np.searchsorted(self._pair_codes, query), len(self._pair_codes) - 1)
+            found = self._pair_codes[position] == query
+            shared[found] = self._pair_shared[position[found]]
+
+        if self._large_membership.shape[1]:
+            for start in range(0, len(query), _PAIR_CHUNK_SIZE):
+                end = start + _PAIR_CHUNK_SIZE
+                both = self._large_membership[low[start:end]] & self._large_membership[high[start:end]]
+                shared[start:end] += both.sum(axis=1)
+        return shared
+
+    def jaccard(self, first, second):
+        """Jaccard similarity of the code-file hash sets for each pair"""
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        shared = self.shared_counts(first, second)
+        union = self.sizes[first] + self.sizes[second] - shared
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(union > 0, shared / union, 0.0)
+
+    def exact_copy_pairs(self, threshold=EXACT_MATCH_THRESHOLD):
+        """Pairs (i, j), i < j, with hash similarity of at least ``threshold``
+
+        Only pairs sharing a file held by at most FILE_HASH_MAX_POSTING
+        projects are found; copies of pure boilerplate are left to LSH.
+        """
+        if self._pair_codes is None:
+            self._build_pairs()
+        first, second = self._pair_codes // self.n, self._pair_codes % self.n
+        keep = self.jaccard(first, second) >= threshold
+        return list(zip(first[keep].tolist(), second[keep].tolist()))
+
+    def shared_file_groups(self, names, file_paths=None, limit=None):
+        """Groups of students holding the same identical files, most files first
+
+        ``file_paths`` optionally maps each project index to ``{md5: [paths]}``
+        so the report can name the files.
+        """
+        if limit is None:
+            limit = getattr(settings, 'SHARED_FILE_GROUPS', DEFAULT_SHARED_FILE_GROUPS)
+
+        groups = defaultdict(list)
+        for posting in np.flatnonzero(self.counts > 1).tolist():
+            groups[tuple(self.holders(posting).tolist())].append(posting)
+        ordered = sorted(groups.items(), key=lambda group: (-len(group[1]), -len(group[0]), group[0]))
+
+        report = []
+        for holders, postings in ordered[:limit]:
+            files = []
+            for posting in postings:
+                digest = self.digest(posting)
+                paths = set()
+                if file_paths is not None:
+                    for index in holders:
+                        paths.update(file_paths[index].get(digest, []))
+                files.append({'md5': digest, 'paths': sorted(paths)})
+            report.append({
+                'students': [names[index] for index in holders],
+                'file_count': len(postings),
+                'files': files
+            })
+        return report
@@ -0,0 +1,145 @@
+import numpy as np
+from django.conf import settings
+
+from .fingerprint import ProjectFingerprints
+from .hash_index import posting_pair_codes
+
+
+# Fingerprints held by more projects than this are common idioms or shared
+# boilerplate and are ignored for pairing and matched regions
+DEFAULT_FINGERPRINT_MAX_POSTING = 20
+
+# Shared fingerprints a pair needs to become a candidate and report regions
+DEFAULT_FINGERPRINT_MIN_SHARED = 3
+
+# Matched regions kept per pair (largest first)
+DEFAULT_MATCHED_REGIONS = 10
+
+# Lines between two matched fingerprints that still belong to one region
+_REGION_GAP = 2
+
+
+class FingerprintIndex:
+    """Batch inverted index from winnowed k-gram fingerprints to projects.
+
+    Candidate pairs come from walking the posting lists, each capped at
+    FINGERPRINT_MAX_POSTING holders, so the work is linear in the total
+    number of fingerprints. Unlike the whole-project similarities this finds
+    a single copied function inside an otherwise different project, and
+    ``matched_regions`` reports where it is in both submissions.
+    """
+
+    def __init__(self, fingerprints):
+        self.fingerprints = [ProjectFingerprints.coerce(value) for value in fingerprints]
+        self.n = len(self.fingerprints)
+        max_posting = getattr(settings, 'FINGERPRINT_MAX_POSTING', DEFAULT_FINGERPRINT_MAX_POSTING)
+
+        # A fingerprint repeated inside one project counts once for pairing
+        unique_hashes = [np.unique(project.hashes) for project in self.fingerprints]
+        self.sizes = np.array([len(hashes) for hashes in unique_hashes], dtype=np.int64)
+        if self.sizes.sum():
+            hashes = np.concatenate(unique_hashes)
+            owners = np.repeat(np.arange(self.n, dtype=np.int64), self.sizes)
+            order = np.argsort(hashes, kind='stable')
+            keys, starts, counts = np.unique(hashes[order], return_index=True, return_counts=True)
+            owners = owners[order]
+        else:
+            keys = np.empty(0, dtype=np.uint64)
+            starts = counts = owners = np.empty(0, dtype=np.int64)
+
+        # Fingerprints too common to point at copying
+        self.common = keys[counts > max_posting]
+        usable = counts <= max_posting
+        codes = posting_pair_codes(owners, starts[usable], counts[usable], self.n)
+        self._pair_codes, self._pair_shared = np.unique(codes, return_counts=True)
+
+    def shared_counts(self, first, second):
+        """Distinct fingerprints (excluding common ones) shared by each pair"""
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        query = np.minimum(first, second) * self.n + np.maximum(first, second)
+        shared = np.zeros(len(query), dtype=np.int64)
+        if len(self._pair_codes):
+            position = np.minimum(np.searchsorted(self._pair_codes, query), len(self._pair_codes) - 1)
+            found = self._pair_codes[position] == query
+            shared[found] = self._pair_shared[position[found]]
+        return shared
+
+    def similarity(self, first, second):
+        """Share of the smaller project's fingerprints found in the other one"""
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        smaller = np.minimum(self.sizes[first], self.sizes[second])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(smaller > 0, self.shared_counts(first, second) / smaller, 0.0)
+
+    def candidate_pairs(self, min_shared=None):
+        """Pairs (i, j), i < j, sharing at least FINGERPRINT_MIN_SHARED fingerprints"""
+        if min_shared is None:
+            min_shared = getattr(settings, 'FINGERPRINT_MIN_SHARED', DEFAULT_FINGERPRINT_MIN_SHARED)
+        codes = self._pair_codes[self._pair_shared >= min_shared]
+        return list(zip((codes // self.n).tolist(), (codes % self.n).tolist()))
+
+    def matched_regions(self, i, j, limit=None):
+        """Line ranges matching between projects ``i`` and ``j``, most fingerprints first
+
+        Each region is ``{'file_1', 'lines_1', 'file_2', 'lines_2', 'fingerprints'}``
+        with inclusive ``[first, last]`` line ranges. A fingerprint repeated in
+        project ``j`` is matched with its first occurrence.
+        """
+        if limit is None:
+            limit = getattr(settings, 'MATCHED_REGIONS', DEFAULT_MATCHED_REGIONS)
+        first, second = self.fingerprints[i], self.fingerprints[j]
+        shared = np.setdiff1d(np.intersect1d(first.hashes, second.hashes), self.common, assume_unique=True)
+        if not len(shared):
+            return []
+
+        # Matches in project order of i, paired with the first occurrence in j
+        in_first = np.flatnonzero(np.isin(first.hashes, shared))
+        order = np.argsort(second.hashes, kind='stable')
+        partner = order[np.searchsorted(second.hashes[order], first.hashes[in_first])]
+
+        regions = []
+        current = None
+        for a, b in zip(in_first.tolist(), partner.tolist()):
+            file_1, file_2 = int(first.files[a]), int(second.files[b])
+            start_1, end_1 = int(first.start_lines[a]), int(first.end_lines[a])
+            start_2, end_2 = int(second.start_lines[b]), int(second.end_lines[b])
+            if (current is not None and current['files'] == (file_1, file_2)
+                    and start_1 <= current['lines_1'][1] + _REGION_GAP
+                    and current['lines_2'][0] - _REGION_GAP <= start_2 <= current['lines_2'][1] + _REGION_GAP):
+                current['lines_1'][1] = max(current['lines_1'][1], end_1)
+                current['lines_2'][0] = min(current['lines_2'][0], start_2)
+                current['lines_2'][1] = max(current['lines_2'][1], end_2)
+                current['fingerprints'] += 1
+                continue
+            current = {'files': (file_1, file_2), 'lines_1': [start_1, end_1],
+                       'lines_2': [start_2, end_2], 'fingerprints': 1}
+            regions.append(current)
+
+        regions.sort(key=lambda region: -region['fingerprints'])
+        return [
+            {
+                'file_1': first.paths[region['files'][0]],
+                'lines_1': region['lines_1'],
+                'file_2': second.paths[region['files'][1]],
+                'lines_2': region['lines_2'],
+                'fingerprints': region['fingerprints']
+            }
+            for region in regions[:limit]
+        ]
+
+    def annotate(self, batch_similarity):
+        """Add ``fingerprint_similarity`` and ``matched_regions`` to scored pairs"""
+        if not batch_similarity:
+            return batch_similarity
+        min_shared = getattr(settings, 'FINGERPRINT_MIN_SHARED', DEFAULT_FINGERPRINT_MIN_SHARED)
+        pairs = np.array(list(batch_similarity.keys()), dtype=np.int64)
+        shared = self.shared_counts(pairs[:, 0], pairs[:, 1])
+        similarity = self.similarity(pairs[:, 0], pairs[:, 1])
+
+        for k, (i, j) in enumerate(batch_similarity):
+            metrics = batch_similarity[(i, j)]
+            metrics['fingerprint_similarity'] = float(similarity[k])
+            metrics['matched_regions'] = self.matched_regions(i, j) if shared[k] >= min_shared else []
+        return batch_similarity
@@ -0,0 +1,131 @@
+import numpy as np
+from django.conf import settings
+
+from .sketch import MINHASH_PERMUTATIONS
+
+
+# Batches smaller than this are always scored exhaustively (all pairs)
+DEFAULT_LSH_MIN_PROJECTS = 300
+
+# 32 bands x 4 rows: pairs with shingle Jaccard ~0.42 have a 50% chance of
+# becoming a candidate, pairs at 0.6 are found with ~98% probability
+DEFAULT_LSH_BANDS = 32
+DEFAULT_LSH_ROWS = 4
+
+_KEY_MULTIPLIER = np.uint64(1099511628211)
+_KEY_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def lsh_threshold(bands, rows):
+    """Approximate Jaccard similarity at which a pair has a 50% chance of being a candidate"""
+    return (1 / bands) ** (1 / rows)
+
+
+def lsh_recall(similarity, bands, rows):
+    """Probability that a pair with the given MinHash (Jaccard) similarity becomes a candidate"""
+    return 1 - (1 - similarity ** rows) ** bands
+
+
+def lsh_candidate_pairs(signatures, bands, rows):
+    """Candidate pairs from a (projects x permutations) MinHash signature matrix.
+
+    Every band of ``rows`` signature values is hashed into buckets; projects
+    that share a bucket in at least one band become a candidate pair.
+    Returns ``(first, second)`` index arrays with ``first < second``.
+    """
+    signatures = np.asarray(signatures)
+    n = len(signatures)
+    pair_codes = []
+
+    for band in range(bands):
+        band_values = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        # One opaque key per project so np.unique compares whole bands at once
+        keys = band_values.view(np.dtype((np.void, band_values.dtype.itemsize * rows))).ravel()
+        _, buckets, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        buckets = buckets.ravel()
+
+        members = np.flatnonzero(counts[buckets] > 1)
+        if len(members) == 0:
+            continue
+
+        members = members[np.argsort(buckets[members], kind='stable')]
+        for group in np.split(members, np.flatnonzero(np.diff(buckets[members])) + 1):
+            first, second = np.triu_indices(len(group), k=1)
+            pair_codes.append(group[first].astype(np.int64) * n + group[second])
+
+    if not pair_codes:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    codes = np.unique(np.concatenate(pair_codes))
+    return codes // n, codes % n
+
+
+def lsh_layout():
+    """``(bands, rows)`` from ``LSH_BANDS`` and ``LSH_ROWS``, fitted to the MinHash permutations"""
+    rows = max(int(getattr(settings, 'LSH_ROWS', DEFAULT_LSH_ROWS)), 1)
+    bands = max(int(getattr(settings, 'LSH_BANDS', DEFAULT_LSH_BANDS)), 1)
+    if bands * rows > MINHASH_PERMUTATIONS:
+        bands = MINHASH_PERMUTATIONS // rows
+        print(f"  ⚠️ LSH bands x rows exceeds {MINHASH_PERMUTATIONS} permutations, using {bands} bands")
+    return bands, rows
+
+
+def lsh_band_keys(signatures, bands, rows):
+    """Signed 64-bit bucket key of every band of a (projects x permutations) signature matrix.
+
+    Projects with equal band values get equal keys. The band number is mixed
+    in, so one key column can index all bands (e.g. MinHashBucket rows).
+    """
+    signatures = np.asarray(signatures, dtype=np.uint64)
+    keys = np.empty((len(signatures), bands), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for band in range(bands):
+            combined = np.full(len(signatures), band + 1, dtype=np.uint64)
+            for column in range(band * rows, (band + 1) * rows):
+                combined = combined * _KEY_MULTIPLIER + signatures[:, column]
+            combined ^= combined >> np.uint64(31)
+            combined *= _KEY_MIX
+            combined ^= combined >> np.uint64(29)
+            keys[:, band] = combined
+    return keys.view(np.int64)
+
+
+def select_candidate_pairs(sketches):
+    """Pick the pairs a batch should score, or None to score every pair.
+
+    Uses MinHash + LSH when ``LSH_CANDIDATES_ENABLED`` is on and the batch
+    has at least ``LSH_MIN_PROJECTS`` projects. Band layout comes from
+    ``LSH_BANDS`` and ``LSH_ROWS``. Projects without a signature (no code)
+    never become candidates.
+    """
+    n = len(sketches)
+    if not getattr(settings, 'LSH_CANDIDATES_ENABLED', True):
+        return None
+    if n < getattr(settings, 'LSH_MIN_PROJECTS', DEFAULT_LSH_MIN_PROJECTS):
+        return None
+
+    bands, rows = lsh_layout()
+    with_signature = np.array([i for i, sketch in enumerate(sketches) if len(sketch.minhash) == MINHASH_PERMUTATIONS], dtype=np.int64)
+    if len(with_signature) < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    signatures = np.stack([sketches[i].minhash for i in with_signature])
+    first, second = lsh_candidate_pairs(signatures, bands, rows)
+    first, second = with_signature[first], with_signature[second]
+
+    total_pairs = n * (n - 1) // 2
+    print(f"🔎 LSH ({bands} bands x {rows} rows, threshold ~{lsh_threshold(bands, rows):.2f}): "
+          f"{len(first)} of {total_pairs} pairs selected for scoring")
+    return first, second
+
+
+def merge_candidate_pairs(pairs, extra_pairs, n):
+    """Add ``extra_pairs`` (a list of (i, j), i < j) to ``(first, second)`` candidate arrays"""
+    if not extra_pairs:
+        return pairs
+    first, second = pairs
+    extra = np.array(extra_pairs, dtype=np.int64).reshape(-1, 2)
+    codes = np.unique(np.concatenate([first * n + second, extra[:, 0] * n + extra[:, 1]]))
+    return codes // n, codes % n
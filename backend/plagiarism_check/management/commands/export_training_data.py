@@ -0,0 +1,22 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from plagiarism_check.training import DEFAULT_TRAINING_CHUNK_SIZE, export_training_data
+
+
+class Command(BaseCommand):
+    help = 'Stream faculty-labeled plagiarism results to CSV for model training'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='CSV file to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_TRAINING_CHUNK_SIZE,
+                            help='Rows read from the database per chunk')
+
+    def handle(self, *args, **options):
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                total = export_training_data(f, options['chunk_size'])
+            self.stderr.write(self.style.SUCCESS(f"Exported {total} labeled pairs to {options['output']}"))
+        else:
+            total = export_training_data(sys.stdout, options['chunk_size'])
+            self.stderr.write(self.style.SUCCESS(f'Exported {total} labeled pairs'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from plagiarism_check.corpus import index_submission_buckets
+from plagiarism_check.models import MinHashBucket, ProjectSubmission
+
+
+class Command(BaseCommand):
+    help = 'Add submissions missing from the per-topic corpus index (rebuild it after changing LSH_BANDS/LSH_ROWS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Drop the whole index and rebuild it from every submission')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Submissions loaded from the database per chunk')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            MinHashBucket.objects.all().delete()
+
+        pending = ProjectSubmission.objects.filter(minhash_buckets__isnull=True, sketch__isnull=False).order_by('id')
+        submission_ids = list(pending.values_list('id', flat=True))
+        indexed = buckets = 0
+        chunk_size = options['chunk_size']
+
+        for start in range(0, len(submission_ids), chunk_size):
+            chunk = list(ProjectSubmission.objects.filter(id__in=submission_ids[start:start + chunk_size]).only('id', 'sketch'))
+            buckets += index_submission_buckets(chunk)
+            indexed += len(chunk)
+            self.stderr.write(f'  {indexed}/{len(submission_ids)} submissions')
+
+        self.stderr.write(self.style.SUCCESS(f'Indexed {indexed} submissions ({buckets} buckets)'))
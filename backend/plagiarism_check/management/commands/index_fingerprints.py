@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from plagiarism_check.models import FingerprintPosting, ProjectSubmission
+from plagiarism_check.snippet_search import fingerprint_stored_content, index_submission_fingerprints
+
+
+class Command(BaseCommand):
+    help = 'Add submissions missing from the snippet search index (fingerprinting older ones from stored content)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Drop the whole index and rebuild it from every submission')
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='Submissions loaded from the database per chunk')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            FingerprintPosting.objects.all().delete()
+
+        pending = ProjectSubmission.objects.filter(fingerprint_postings__isnull=True).order_by('id')
+        submission_ids = list(pending.values_list('id', flat=True))
+        indexed = postings = 0
+        chunk_size = options['chunk_size']
+
+        for start in range(0, len(submission_ids), chunk_size):
+            chunk = list(ProjectSubmission.objects.filter(id__in=submission_ids[start:start + chunk_size]))
+            for submission in chunk:
+                if not submission.fingerprints:
+                    submission.fingerprints = fingerprint_stored_content(submission)
+                    if submission.fingerprints:
+                        submission.save(update_fields=['fingerprints'])
+            postings += index_submission_fingerprints(chunk)
+            indexed += len(chunk)
+            self.stderr.write(f'  {indexed}/{len(submission_ids)} submissions')
+
+        self.stderr.write(self.style.SUCCESS(f'Indexed {indexed} submissions ({postings} fingerprints)'))
@@ -0,0 +1,47 @@
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from plagiarism_check.pipeline import claim_next_batch_job, process_batch_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued batch plagiarism checks (run one or more of these next to the web server)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process queued jobs until the queue is empty, then exit')
+        parser.add_argument('--poll-interval', type=float,
+                            default=getattr(settings, 'BATCH_WORKER_POLL_INTERVAL', 2.0),
+                            help='Seconds to wait between queue checks when idle')
+        parser.add_argument('--stale-minutes', type=float,
+                            default=getattr(settings, 'BATCH_JOB_STALE_MINUTES', 15),
+                            help='Requeue running jobs without a heartbeat for this long')
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        stale_after = timedelta(minutes=options['stale_minutes'])
+        self.stdout.write(f'Batch worker {worker_id} started')
+
+        try:
+            while True:
+                requeued = requeue_stale_jobs(stale_after)
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+
+                batch = claim_next_batch_job(worker_id)
+                if batch is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                if process_batch_job(batch, worker_id):
+                    self.stdout.write(self.style.SUCCESS(f'Batch {batch.id} completed'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'Batch {batch.id} failed'))
+        except KeyboardInterrupt:
+            self.stdout.write('Batch worker stopped')
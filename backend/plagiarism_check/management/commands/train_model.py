@@ -1,12 +1,41 @@
-from django.core.management.base import BaseCommand
-from plagiarism_check.ml_models import train_plagiarism_model
+from django.core.management.base import BaseCommand, CommandError
+from plagiarism_check.ml_models import train_plagiarism_model, export_compiled_model
+from plagiarism_check.training import (
+    DEFAULT_TRAINING_CHUNK_SIZE, DEFAULT_TREES_PER_CHUNK, train_from_labels
+)
 
 class Command(BaseCommand):
     help = 'Train the plagiarism detection model'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=['labels', 'dummy'], default='labels',
+                            help='Train on faculty-labeled results (default) or generated dummy data')
+        parser.add_argument('--fresh', action='store_true',
+                            help='Train a new model instead of adding trees to the current one')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_TRAINING_CHUNK_SIZE,
+                            help='Labeled pairs read and trained per chunk')
+        parser.add_argument('--trees-per-chunk', type=int, default=DEFAULT_TREES_PER_CHUNK,
+                            help='Trees added to the forest for each chunk')
+        parser.add_argument('--export-only', action='store_true',
+                            help='Export the existing model to NumPy arrays without retraining')
+
     def handle(self, *args, **options):
+        if options['export_only']:
+            export_compiled_model()
+            self.stdout.write(self.style.SUCCESS('Model export completed successfully!'))
+            return
+
         self.stdout.write('Starting model training...')
-        train_plagiarism_model()
+        if options['source'] == 'dummy':
+            train_plagiarism_model()
+        else:
+            metadata = train_from_labels(
+                incremental=not options['fresh'],
+                chunk_size=options['chunk_size'],
+                trees_per_chunk=options['trees_per_chunk']
+            )
+            if metadata is None:
+                raise CommandError('No new labeled results to train on; label pairs first or use --source dummy')
         self.stdout.write(
             self.style.SUCCESS('Model training completed successfully!')
         )
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:59
+
+from django.db import migrations, models
+
+
+def mark_existing_batches_done(apps, schema_editor):
+    # Batches uploaded before background jobs were processed synchronously
+    BatchUpload = apps.get_model('plagiarism_check', 'BatchUpload')
+    BatchUpload.objects.update(job_status='done', job_progress=1.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0002_alter_plagiarismresult_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchupload',
+            name='job_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='batchupload',
+            name='job_finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='batchupload',
+            name='job_heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='batchupload',
+            name='job_progress',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='batchupload',
+            name='job_stage',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='batchupload',
+            name='job_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='batchupload',
+            name='job_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='batchupload',
+            name='job_worker',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.RunPython(mark_existing_batches_done, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0003_batchupload_job_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='content_path',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='sketch',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0004_projectsubmission_sketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchupload',
+            name='result_summary',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='StudentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_id', models.CharField(max_length=100)),
+                ('project_name', models.CharField(max_length=255)),
+                ('parent_zip_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('total_files', models.IntegerField(default=0)),
+                ('code_lines', models.IntegerField(default=0)),
+                ('max_similarity', models.FloatField(default=0.0)),
+                ('similar_to', models.CharField(blank=True, max_length=100, null=True)),
+                ('plagiarism_count', models.IntegerField(default=0)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_summaries', to='plagiarism_check.batchupload')),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='plagiarism_check.projectsubmission')),
+            ],
+            options={
+                'ordering': ['submission_id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0005_student_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plagiarismresult',
+            name='confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
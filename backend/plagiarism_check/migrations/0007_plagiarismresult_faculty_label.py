@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0006_plagiarismresult_confidence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plagiarismresult',
+            name='faculty_label',
+            field=models.CharField(blank=True, choices=[('confirmed', 'Confirmed plagiarism'), ('dismissed', 'Dismissed')], db_index=True, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='plagiarismresult',
+            name='labeled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='plagiarismresult',
+            name='labeled_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='labeled_results', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
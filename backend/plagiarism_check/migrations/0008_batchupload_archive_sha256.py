@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0007_plagiarismresult_faculty_label'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchupload',
+            name='archive_sha256',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0009_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchupload',
+            name='duplicate_report',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
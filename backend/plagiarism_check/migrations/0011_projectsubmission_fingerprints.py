@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0010_batchupload_duplicate_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='fingerprints',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0011_projectsubmission_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FingerprintPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.BigIntegerField(db_index=True)),
+                ('file_index', models.PositiveIntegerField()),
+                ('start_line', models.PositiveIntegerField()),
+                ('end_line', models.PositiveIntegerField()),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint_postings', to='plagiarism_check.projectsubmission')),
+            ],
+        ),
+    ]
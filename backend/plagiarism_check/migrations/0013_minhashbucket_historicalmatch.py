@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0012_fingerprintposting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MinHashBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='minhash_buckets', to='plagiarism_check.projectsubmission')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HistoricalMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity_score', models.FloatField()),
+                ('is_plagiarized', models.BooleanField(default=False)),
+                ('confidence', models.FloatField(blank=True, null=True)),
+                ('comparison_details', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historical_matches', to='plagiarism_check.batchupload')),
+                ('matched_submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historical_matched_by', to='plagiarism_check.projectsubmission')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historical_matches', to='plagiarism_check.projectsubmission')),
+            ],
+            options={
+                'unique_together': {('submission', 'matched_submission')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plagiarism_check', '0013_minhashbucket_historicalmatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StarterCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(blank=True, db_index=True, default='', max_length=255)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_path', models.CharField(max_length=500)),
+                ('archive_sha256', models.CharField(db_index=True, max_length=64)),
+                ('profile', models.BinaryField()),
+                ('summary', models.JSONField(default=dict)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('faculty', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='starter_codes', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='batchupload',
+            name='starter_code',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='batches', to='plagiarism_check.startercode'),
+        ),
+    ]
@@ -5,6 +5,12 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 import os
+import warnings
+
+from django.conf import settings
+
+from .model_registry import ModelRegistry, model_registry, default_model_path, compiled_model_path
+from .forest import compile_forest
 
 def generate_dummy_training_data(n_samples=1000):
     np.random.seed(42)
@@ -52,8 +58,9 @@ def generate_dummy_training_data(n_samples=1000):
 
 
 # train_plagiarism_model function in ml_models.py
-def train_plagiarism_model(save_path='ml_models/plagiarism_model.pkl'):
+def train_plagiarism_model(save_path=None):
     """Train and save the plagiarism detection model"""
+    save_path = save_path or default_model_path()
     print("Generating training data...")
     data = generate_dummy_training_data()
     
@@ -85,23 +92,57 @@ def train_plagiarism_model(save_path='ml_models/plagiarism_model.pkl'):
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred))
     
-    # Save model
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    joblib.dump(model, save_path)
+    # Save model (write then rename, so running servers never load a partial file)
+    os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
+    tmp_path = f"{save_path}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, save_path)
     print(f"Model saved to {save_path}")
+    export_compiled_model(model, save_path)
     
     return model
 
 
+def export_compiled_model(model=None, model_path=None, metadata=None):
+    """Flatten a trained forest into NumPy arrays (``.npz`` next to the pickle).
 
+    The exported file is what the model registry serves: it loads without
+    sklearn and scores pairs with the vectorized evaluator in ``forest.py``.
+    """
+    model_path = model_path or default_model_path()
+    if model is None:
+        model = joblib.load(model_path)
+        if isinstance(model, dict) and 'model' in model:
+            metadata = metadata or model.get('metadata')
+            model = model['model']
+
+    compiled = compile_forest(model, metadata)
+    export_path = compiled_model_path(model_path)
+    # np.savez appends .npz to names without it
+    tmp_path = f"{os.path.splitext(export_path)[0]}.tmp.npz"
+    compiled.save(tmp_path)
+    os.replace(tmp_path, export_path)
+    print(f"Compiled model ({compiled.n_estimators} trees) exported to {export_path}")
+    return compiled
+
+
+
+
+_registries = {}
 
-def load_plagiarism_model(model_path='ml_models/plagiarism_model.pkl'):
-    """Load the trained plagiarism detection model"""
-    if not os.path.exists(model_path):
-        print("Model not found. Training new model...")
-        return train_plagiarism_model(model_path)
-    
-    return joblib.load(model_path)
+
+def load_plagiarism_model(model_path=None):
+    """Cached plagiarism model from the registry, or None if it has not been trained.
+
+    Never trains on the request path; run ``python manage.py train_model``.
+    """
+    if model_path is None or os.path.abspath(model_path) == os.path.abspath(default_model_path()):
+        return model_registry.get()
+
+    registry = _registries.get(model_path)
+    if registry is None:
+        registry = _registries.setdefault(model_path, ModelRegistry(model_path))
+    return registry.get()
 
 # def predict_plagiarism(similarity_features, model_path='ml_models/plagiarism_model.pkl'):
 #     """Predict plagiarism based on similarity features"""
@@ -124,35 +165,74 @@ def load_plagiarism_model(model_path='ml_models/plagiarism_model.pkl'):
 #         'confidence': float(probability)
 #     }
 
-def predict_plagiarism(similarity_features, model_path='ml_models/plagiarism_model.pkl'):
-    """Predict plagiarism based on similarity features"""
-    model = load_plagiarism_model(model_path)
-    
-    # Create feature array with explicit column names to avoid warnings
-    import pandas as pd
-    
-    feature_names = ['tfidf_similarity', 'hash_similarity', 'import_similarity',
-                    'structure_difference', 'keyword_similarity']
-    
-    # Create DataFrame instead of numpy array
-    features_df = pd.DataFrame([[
-        float(similarity_features.get('tfidf_similarity', 0)),
-        float(similarity_features.get('hash_similarity', 0)),
-        float(similarity_features.get('import_similarity', 0)),
-        float(similarity_features.get('structure_difference', 0)),
-        float(similarity_features.get('keyword_similarity', 0))
-    ]], columns=feature_names)
-
-    # Make predictions
-    prediction = model.predict(features_df)
-    probability = model.predict_proba(features_df)
-
-    # Extract confidence for the positive class (plagiarized)
-    confidence = float(probability[0][1]) if len(probability) > 1 else 0.5
+# Model input columns, in training order
+MODEL_FEATURES = ('tfidf_similarity', 'hash_similarity', 'import_similarity',
+                  'structure_difference', 'keyword_similarity')
+
+# Weighted-score fallback threshold when no model is available
+PLAGIARISM_THRESHOLD = 0.7
+
+
+def similarity_feature_matrix(similarity_features_list):
+    """Stack similarity feature dicts into a contiguous float32 (pairs x MODEL_FEATURES) array"""
+    matrix = np.zeros((len(similarity_features_list), len(MODEL_FEATURES)), dtype=np.float32)
+    for row, similarity_features in enumerate(similarity_features_list):
+        matrix[row] = [float(similarity_features.get(name, 0)) for name in MODEL_FEATURES]
+    return matrix
+
+
+def _positive_probability(model, features):
+    """Plagiarism probability per row from one predict_proba call"""
+    with warnings.catch_warnings():
+        # Models fitted on DataFrames warn about plain arrays; the column order is fixed
+        warnings.simplefilter('ignore', UserWarning)
+        probability = model.predict_proba(features)
+
+    classes = list(getattr(model, 'classes_', [0, 1]))
+    if 1 not in classes:
+        return np.zeros(len(features))
+    return probability[:, classes.index(1)]
+
+
+def predict_plagiarism_batch(features, overall_scores, model_path=None):
+    """Predict plagiarism for many pairs at once.
+
+    ``features`` is a (pairs x MODEL_FEATURES) matrix, e.g. from
+    ``similarity_feature_matrix``, and ``overall_scores`` the weighted overall
+    similarity per pair. Runs a single ``predict_proba`` on a contiguous
+    float32 array and returns ``(is_plagiarized, confidence)`` arrays.
+    Without a model (or with ``USE_PLAGIARISM_MODEL = False``) pairs above
+    PLAGIARISM_THRESHOLD are flagged with the overall score as confidence.
+    """
+    features = np.ascontiguousarray(features, dtype=np.float32).reshape(-1, len(MODEL_FEATURES))
+    overall_scores = np.asarray(overall_scores, dtype=np.float64)
+
+    model = None
+    if getattr(settings, 'USE_PLAGIARISM_MODEL', True):
+        model = load_plagiarism_model(model_path)
+
+    if model is None or len(features) == 0:
+        return overall_scores > PLAGIARISM_THRESHOLD, overall_scores.copy()
+
+    confidence = _positive_probability(model, features).astype(np.float64)
+    return confidence > 0.5, confidence
+
+
+def predict_plagiarism(similarity_features, model_path=None):
+    """Predict plagiarism based on similarity features.
+
+    Falls back to the weighted overall similarity (flagged above 0.7) when no
+    trained model is available.
+    """
+    is_plagiarized, confidence = predict_plagiarism_batch(
+        similarity_feature_matrix([similarity_features]),
+        [float(similarity_features.get('overall_similarity', 0))],
+        model_path
+    )
 
     return {
-        'is_plagiarized': bool(prediction),
-        'confidence': confidence
+        'is_plagiarized': bool(is_plagiarized[0]),
+        'confidence': float(confidence[0])
     }
 
 
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+
+import joblib
+from django.conf import settings
+
+from .forest import CompiledForest, compile_forest
+
+
+DEFAULT_MODEL_FILENAME = 'plagiarism_model.pkl'
+
+# Seconds between checks of the artifact on disk for hot reload
+DEFAULT_MODEL_RELOAD_INTERVAL = 5.0
+
+_MISSING = 'missing'
+
+
+def default_model_path():
+    """Model artifact path: PLAGIARISM_MODEL_PATH or <ML_MODELS_DIR>/plagiarism_model.pkl"""
+    path = getattr(settings, 'PLAGIARISM_MODEL_PATH', None)
+    if path:
+        return str(path)
+    return os.path.join(str(getattr(settings, 'ML_MODELS_DIR', 'ml_models')), DEFAULT_MODEL_FILENAME)
+
+
+def compiled_model_path(path):
+    """Path of the exported NumPy forest next to a pickled model (``.npz``)"""
+    return os.path.splitext(str(path))[0] + '.npz'
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _artifact_signature(path):
+    """Identity of the artifacts on disk; changes when either is rewritten or replaced"""
+    signatures = (_file_signature(path), _file_signature(compiled_model_path(path)))
+    if signatures == (None, None):
+        return None
+    return signatures
+
+
+class ModelRegistry:
+    """Process-wide cache of the plagiarism model.
+
+    The artifact is loaded once (normally from ``AppConfig.ready()``) and
+    shared by all threads. ``get()`` re-checks the file at most every
+    ``reload_interval`` seconds and reloads it when the file or its
+    ``version`` changed. Loading never trains a model: a missing or broken
+    artifact leaves the registry empty and ``get()`` returns None.
+    """
+
+    def __init__(self, path=None, reload_interval=None):
+        self._path = path
+        self._reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._model = None
+        self._version = None
+        self._signature = None
+        self._last_check = 0.0
+
+    @property
+    def path(self):
+        return self._path or default_model_path()
+
+    @property
+    def reload_interval(self):
+        if self._reload_interval is not None:
+            return self._reload_interval
+        return getattr(settings, 'MODEL_RELOAD_INTERVAL', DEFAULT_MODEL_RELOAD_INTERVAL)
+
+    @property
+    def version(self):
+        return self._version
+
+    def _read_artifact(self, path, signature):
+        pickle_signature, compiled_signature = signature
+        # The exported forest loads without sklearn; use it unless the pickle is newer
+        if compiled_signature and (pickle_signature is None or compiled_signature[0] >= pickle_signature[0]):
+            model = CompiledForest.load(compiled_model_path(path))
+            return model, model.version
+
+        artifact = joblib.load(path)
+        # Versioned artifacts are dicts with the estimator and its metadata
+        if isinstance(artifact, dict) and 'model' in artifact:
+            model, version = artifact['model'], artifact.get('metadata', {}).get('version')
+        else:
+            model, version = artifact, getattr(artifact, 'version', None)
+
+        # Tree ensembles are served by the vectorized NumPy evaluator
+        if hasattr(model, 'estimators_'):
+            try:
+                model = compile_forest(model, {'version': version})
+            except Exception as e:
+                print(f"⚠️ Could not compile plagiarism model, using sklearn: {e}")
+        return model, version
+
+    def load(self, force=False):
+        """Load (or reload) the artifact if it changed on disk; returns the model or None"""
+        path = self.path
+        with self._lock:
+            self._last_check = time.monotonic()
+            signature = _artifact_signature(path)
+
+            if signature is None:
+                # Report a missing artifact once, not on every check
+                if self._signature != _MISSING or force:
+                    print(f"⚠️ Plagiarism model not found at {path}; using weighted similarity score "
+                          f"(train one with `python manage.py train_model`)")
+                self._model, self._version, self._signature = None, None, _MISSING
+                return None
+
+            if not force and signature == self._signature:
+                return self._model
+
+            try:
+                model, version = self._read_artifact(path, signature)
+            except Exception as e:
+                print(f"❌ Could not load plagiarism model from {path}: {e}")
+                # Keep serving the previous model; retry when the file changes again
+                self._signature = signature
+                return self._model
+
+            action = 'Reloaded' if self._model is not None else 'Loaded'
+            print(f"🤖 {action} plagiarism model from {path}" + (f" (version {version})" if version is not None else ''))
+            self._model, self._version, self._signature = model, version, signature
+            return model
+
+    def get(self):
+        """Current model (hot-reloaded when the artifact changed) or None"""
+        if time.monotonic() - self._last_check >= self.reload_interval:
+            return self.load()
+        return self._model
+
+    def clear(self):
+        with self._lock:
+            self._model, self._version, self._signature = None, None, None
+            self._last_check = 0.0
+
+
+model_registry = ModelRegistry()
+
+
+def get_plagiarism_model():
+    """The shared plagiarism model, or None when no trained artifact is available"""
+    return model_registry.get()
@@ -1,17 +1,72 @@
+import math
+import uuid
+
 from django.db import models
 from authentication.models import CustomUser
 
+class StarterCode(models.Model):
+    """Instructor-provided base project whose code is ignored when comparing submissions (see starter_code.py)"""
+    faculty = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='starter_codes')
+    # Applies to every batch of the topic; blank means only batches it is attached to
+    topic = models.CharField(max_length=255, blank=True, default='', db_index=True)
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500)
+    archive_sha256 = models.CharField(max_length=64, db_index=True)
+    # StarterProfile computed once on upload: file hashes, k-grams, function names and imports
+    profile = models.BinaryField()
+    summary = models.JSONField(default=dict)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'plagiarism_check'
+
+    def __str__(self):
+        return f"{self.file_name} - {self.topic or 'batch only'}"
+
 class BatchUpload(models.Model):
+    JOB_QUEUED = 'queued'
+    JOB_RUNNING = 'running'
+    JOB_DONE = 'done'
+    JOB_FAILED = 'failed'
+    # Topic of uploads that did not name one; such batches have no shared history
+    DEFAULT_TOPIC = 'Unknown Topic'
+
+    JOB_STATUS_CHOICES = [
+        (JOB_QUEUED, 'Queued'),
+        (JOB_RUNNING, 'Running'),
+        (JOB_DONE, 'Done'),
+        (JOB_FAILED, 'Failed'),
+    ]
+
     faculty = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     batch_name = models.CharField(max_length=255)
     topic = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     file_path = models.CharField(max_length=500)
+    # SHA-256 of the uploaded archive; file_path is its content-addressed copy
+    archive_sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True)
     
     # Enhanced fields for nested structure
     nested_zip_structure = models.JSONField(default=dict)
     total_nested_zips = models.IntegerField(default=0)
 
+    # Background batch-check job (see run_batch_worker)
+    job_status = models.CharField(max_length=10, choices=JOB_STATUS_CHOICES, default=JOB_QUEUED, db_index=True)
+    job_stage = models.CharField(max_length=50, blank=True, default='')
+    job_progress = models.FloatField(default=0.0)
+    job_error = models.TextField(blank=True, default='')
+    job_worker = models.CharField(max_length=100, blank=True, default='')
+    job_started_at = models.DateTimeField(null=True, blank=True)
+    job_finished_at = models.DateTimeField(null=True, blank=True)
+    job_heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    # Batch totals computed when the job finishes (see StudentSummary)
+    result_summary = models.JSONField(null=True, blank=True)
+    # Identical files and submissions found from ZIP CRCs before extraction (see crc_index.py)
+    duplicate_report = models.JSONField(null=True, blank=True)
+    # Base project subtracted from every submission (attached, or the topic's latest)
+    starter_code = models.ForeignKey(StarterCode, null=True, blank=True, on_delete=models.SET_NULL, related_name='batches')
+
     class Meta:
         app_label = 'plagiarism_check'
 
@@ -23,7 +78,13 @@ class ProjectSubmission(models.Model):
     student_id = models.CharField(max_length=100)
     project_name = models.CharField(max_length=255)
     file_path = models.CharField(max_length=500)
+    # Scalar counters only; similarity scoring uses the binary sketch
     features = models.JSONField(default=dict)
+    sketch = models.BinaryField(null=True, blank=True)
+    # Winnowed k-gram fingerprints with file and line positions (see fingerprint.py)
+    fingerprints = models.BinaryField(null=True, blank=True)
+    # Concatenated source, stored gzipped outside the database row
+    content_path = models.CharField(max_length=500, blank=True, default='')
     
     # Enhanced fields for nested ZIP tracking
     parent_zip_name = models.CharField(max_length=255, null=True, blank=True)
@@ -37,17 +98,147 @@ class ProjectSubmission(models.Model):
         return f"{self.student_id} - {self.project_name}"
 
 class PlagiarismResult(models.Model):
+    LABEL_CONFIRMED = 'confirmed'
+    LABEL_DISMISSED = 'dismissed'
+    LABEL_CHOICES = [
+        (LABEL_CONFIRMED, 'Confirmed plagiarism'),
+        (LABEL_DISMISSED, 'Dismissed'),
+    ]
+
     batch = models.ForeignKey(BatchUpload, on_delete=models.CASCADE, related_name='results')
     project1 = models.ForeignKey(ProjectSubmission, on_delete=models.CASCADE, related_name='comparisons_as_project1')
     project2 = models.ForeignKey(ProjectSubmission, on_delete=models.CASCADE, related_name='comparisons_as_project2')
     similarity_score = models.FloatField()
     is_plagiarized = models.BooleanField(default=False)
+    # Model probability of plagiarism (weighted score when no model is trained)
+    confidence = models.FloatField(null=True, blank=True)
     comparison_details = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Faculty review of the pair, used as training labels (see train_model)
+    faculty_label = models.CharField(max_length=10, choices=LABEL_CHOICES, null=True, blank=True, db_index=True)
+    labeled_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='labeled_results')
+    labeled_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         app_label = 'plagiarism_check'
         unique_together = ['project1', 'project2']
 
     def __str__(self):
         return f"{self.project1.student_id} vs {self.project2.student_id} - {self.similarity_score:.2f}"
+
+
+class StudentSummary(models.Model):
+    """Per-student outcome of a batch, computed once when the job finishes"""
+    batch = models.ForeignKey(BatchUpload, on_delete=models.CASCADE, related_name='student_summaries')
+    submission = models.OneToOneField(ProjectSubmission, on_delete=models.CASCADE, related_name='summary')
+    student_id = models.CharField(max_length=100)
+    project_name = models.CharField(max_length=255)
+    parent_zip_name = models.CharField(max_length=255, null=True, blank=True)
+    total_files = models.IntegerField(default=0)
+    code_lines = models.IntegerField(default=0)
+
+    # Highest-scoring comparison involving this student
+    max_similarity = models.FloatField(default=0.0)
+    similar_to = models.CharField(max_length=100, null=True, blank=True)
+    plagiarism_count = models.IntegerField(default=0)
+
+    class Meta:
+        app_label = 'plagiarism_check'
+        ordering = ['submission_id']
+
+    def __str__(self):
+        return f"{self.student_id} - {self.max_similarity:.2f}"
+
+
+
+class UploadSession(models.Model):
+    """Resumable chunked upload of a batch archive (see uploads.py)"""
+    STATUS_OPEN = 'open'
+    STATUS_FINALIZING = 'finalizing'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_FINALIZING, 'Finalizing'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    faculty = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='upload_sessions')
+    batch_name = models.CharField(max_length=255)
+    topic = models.CharField(max_length=255)
+    file_name = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    # Optional SHA-256 of the whole archive, checked when the chunks are assembled
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    batch = models.ForeignKey(BatchUpload, null=True, blank=True, on_delete=models.SET_NULL, related_name='upload_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        app_label = 'plagiarism_check'
+
+    @property
+    def total_chunks(self):
+        return math.ceil(self.total_size / self.chunk_size)
+
+    def chunk_length(self, index):
+        """Size in bytes of chunk ``index`` (the last one may be shorter)"""
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+
+class FingerprintPosting(models.Model):
+    """One winnowed k-gram fingerprint of a submission: the snippet search index"""
+    # Unsigned 64-bit fingerprint stored as its signed two's-complement value
+    fingerprint = models.BigIntegerField(db_index=True)
+    submission = models.ForeignKey(ProjectSubmission, on_delete=models.CASCADE, related_name='fingerprint_postings')
+    # Index into the paths of ProjectSubmission.fingerprints
+    file_index = models.PositiveIntegerField()
+    start_line = models.PositiveIntegerField()
+    end_line = models.PositiveIntegerField()
+
+    class Meta:
+        app_label = 'plagiarism_check'
+
+    def __str__(self):
+        return f"{self.fingerprint & 0xFFFFFFFFFFFFFFFF:016x} in {self.submission_id}"
+
+
+class MinHashBucket(models.Model):
+    """One LSH band key of a submission's MinHash signature: the per-topic corpus index.
+
+    Keys depend on LSH_BANDS and LSH_ROWS; rebuild them with
+    ``index_corpus --rebuild`` after changing either.
+    """
+    bucket = models.BigIntegerField(db_index=True)
+    submission = models.ForeignKey(ProjectSubmission, on_delete=models.CASCADE, related_name='minhash_buckets')
+
+    class Meta:
+        app_label = 'plagiarism_check'
+
+    def __str__(self):
+        return f"{self.bucket & 0xFFFFFFFFFFFFFFFF:016x} in {self.submission_id}"
+
+
+class HistoricalMatch(models.Model):
+    """A submission of a batch scored against one from an earlier batch of the same topic"""
+    batch = models.ForeignKey(BatchUpload, on_delete=models.CASCADE, related_name='historical_matches')
+    submission = models.ForeignKey(ProjectSubmission, on_delete=models.CASCADE, related_name='historical_matches')
+    matched_submission = models.ForeignKey(ProjectSubmission, on_delete=models.CASCADE, related_name='historical_matched_by')
+    similarity_score = models.FloatField()
+    is_plagiarized = models.BooleanField(default=False)
+    confidence = models.FloatField(null=True, blank=True)
+    comparison_details = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'plagiarism_check'
+        unique_together = ['submission', 'matched_submission']
+
+    def __str__(self):
+        return f"{self.submission.student_id} vs {self.matched_submission.student_id} (history) - {self.similarity_score:.2f}"
@@ -0,0 +1,564 @@
+import hashlib
+import os
+import threading
+import time
+import zipfile
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import BatchUpload, HistoricalMatch, ProjectSubmission, PlagiarismResult, StudentSummary
+from .zip_ingest import BatchArchiveReader
+from .feature_pool import extract_features_parallel
+from .batch_similarity import calculate_batch_similarity
+from .lsh import merge_candidate_pairs, select_candidate_pairs
+from .crc_index import index_central_directory, index_duplicates
+from .hash_index import FileHashIndex
+from .snippet_search import index_submission_fingerprints
+from .corpus import TopicCorpus, historical_match_report, index_submission_buckets
+from .starter_code import starter_code_for
+from .starter_profile import StarterProfile
+from .kgram_index import FingerprintIndex
+from .ml_models import predict_plagiarism_batch, similarity_feature_matrix
+from .utils import EXACT_MATCH_THRESHOLD
+from .sketch import FeatureSketch
+
+
+class BatchCheckError(Exception):
+    """Batch cannot be processed (bad archive, no projects); message is shown to the user"""
+
+
+# Share of the overall progress bar covered by each pipeline stage
+STAGE_WEIGHTS = [
+    ('extracting', 0.65),
+    ('scoring', 0.15),
+    ('saving', 0.15),
+    ('history', 0.05),
+]
+
+
+class JobProgress:
+    """Report stage/percentage of a batch job to its BatchUpload row.
+
+    Writes are throttled to one UPDATE per ``min_interval`` seconds so
+    progress reporting never dominates the job on SQLite.
+    """
+
+    def __init__(self, batch, min_interval=1.0):
+        self.batch_id = batch.id
+        self.min_interval = min_interval
+        self._last_write = 0.0
+        self._stage_start = {}
+        start = 0.0
+        for stage, weight in STAGE_WEIGHTS:
+            self._stage_start[stage] = (start, weight)
+            start += weight
+
+    def update(self, stage, fraction=0.0, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_write < self.min_interval:
+            return
+
+        start, weight = self._stage_start[stage]
+        progress = start + weight * min(max(fraction, 0.0), 1.0)
+        BatchUpload.objects.filter(pk=self.batch_id).update(
+            job_stage=stage,
+            job_progress=round(progress, 4),
+            job_heartbeat_at=timezone.now()
+        )
+        self._last_write = now
+
+
+class JobHeartbeat:
+    """Keep ``job_heartbeat_at`` of a running job fresh from a background thread.
+
+    Progress is only reported between units of work, and scoring or saving
+    a large batch can take longer than BATCH_JOB_STALE_MINUTES without a
+    progress update. Used as a context manager around the job, the
+    heartbeat is written every BATCH_JOB_HEARTBEAT_SECONDS regardless, so
+    ``requeue_stale_jobs`` only picks up jobs whose worker is gone.
+    """
+
+    def __init__(self, batch, worker_id='', interval=None):
+        self.batch_id = batch.id
+        self.worker_id = worker_id
+        self.interval = interval or getattr(settings, 'BATCH_JOB_HEARTBEAT_SECONDS', 30)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'batch-{batch.id}-heartbeat', daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    BatchUpload.objects.filter(
+                        pk=self.batch_id, job_status=BatchUpload.JOB_RUNNING, job_worker=self.worker_id
+                    ).update(job_heartbeat_at=timezone.now())
+                except DatabaseError as e:
+                    # e.g. SQLite busy while the job writes; the next beat retries
+                    print(f"  ⚠️ Heartbeat of batch {self.batch_id} failed: {e}")
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+        return False
+
+
+def store_submission_content(batch, project_name, content):
+    """Write gzipped source for a submission under MEDIA_ROOT and return its path.
+
+    The file name keeps a readable form of the project name plus a short
+    hash of the original, so names that sanitize alike ("a b", "a_b") do
+    not overwrite each other.
+    """
+    content_dir = os.path.join(settings.MEDIA_ROOT, 'submissions', str(batch.id))
+    os.makedirs(content_dir, exist_ok=True)
+    safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in project_name)
+    name_hash = hashlib.sha1(project_name.encode('utf-8')).hexdigest()[:8]
+    content_path = os.path.join(content_dir, f"{safe_name}-{name_hash}.txt.gz")
+    with open(content_path, 'wb') as f:
+        f.write(content)
+    return content_path
+
+
+def store_batch_summary(batch):
+    """Compute per-student and batch totals from stored results and save them.
+
+    Reads submissions and results once each (two queries) and replaces the
+    batch's StudentSummary rows and ``result_summary``. ``get_batch_results``
+    serves these precomputed rows instead of scanning every result.
+    """
+    submissions = list(batch.submissions.order_by('id').values(
+        'id', 'student_id', 'project_name', 'parent_zip_name', 'features'
+    ))
+    students = {
+        submission['id']: {'max_similarity': 0.0, 'similar_to': None, 'plagiarism_count': 0}
+        for submission in submissions
+    }
+    student_ids = {submission['id']: submission['student_id'] for submission in submissions}
+
+    total_comparisons = 0
+    plagiarized_comparisons = 0
+    results = batch.results.order_by('id').values_list('project1_id', 'project2_id', 'similarity_score', 'is_plagiarized')
+    for project1_id, project2_id, similarity_score, is_plagiarized in results.iterator():
+        total_comparisons += 1
+        plagiarized_comparisons += int(is_plagiarized)
+
+        for own_id, other_id in ((project1_id, project2_id), (project2_id, project1_id)):
+            student = students[own_id]
+            if similarity_score > student['max_similarity']:
+                student['max_similarity'] = similarity_score
+                student['similar_to'] = student_ids[other_id]
+            if is_plagiarized:
+                student['plagiarism_count'] += 1
+
+    summaries = []
+    for submission in submissions:
+        features = submission['features'] or {}
+        summaries.append(StudentSummary(
+            batch=batch,
+            submission_id=submission['id'],
+            student_id=submission['student_id'],
+            project_name=submission['project_name'],
+            parent_zip_name=submission['parent_zip_name'],
+            total_files=features.get('total_files', 0),
+            code_lines=features.get('code_lines', 0),
+            **students[submission['id']]
+        ))
+
+    total_projects = len(submissions)
+    flagged_projects = sum(1 for student in students.values() if student['plagiarism_count'])
+    summary = {
+        'total_projects': total_projects,
+        'total_comparisons': total_comparisons,
+        'plagiarized_comparisons': plagiarized_comparisons,
+        'flagged_projects': flagged_projects,
+        'clean_projects': total_projects - flagged_projects,
+        'plagiarism_percentage': round((flagged_projects / total_projects * 100) if total_projects > 0 else 0, 1)
+    }
+
+    with transaction.atomic():
+        batch.student_summaries.all().delete()
+        StudentSummary.objects.bulk_create(summaries, batch_size=getattr(settings, 'BULK_CREATE_BATCH_SIZE', 500))
+        BatchUpload.objects.filter(pk=batch.pk).update(result_summary=summary)
+    batch.result_summary = summary
+    return summary
+
+
+def classify_pairs(batch_similarity):
+    """Run the plagiarism model once over every scored pair.
+
+    Returns ``(is_plagiarized, confidence)`` arrays in ``batch_similarity``
+    order. Exact file matches are always flagged.
+    """
+    metrics = list(batch_similarity.values())
+    is_plagiarized, confidence = predict_plagiarism_batch(
+        similarity_feature_matrix(metrics),
+        [m.get('overall_similarity', 0) for m in metrics]
+    )
+    exact_matches = np.array([m.get('hash_similarity', 0) >= EXACT_MATCH_THRESHOLD for m in metrics], dtype=bool)
+    return is_plagiarized | exact_matches, confidence
+
+
+def save_batch_results(batch, submissions, batch_similarity, predictions):
+    """Replace the batch's submissions and results in one transaction.
+
+    ``submissions`` are unsaved ProjectSubmission objects and
+    ``batch_similarity`` maps ``(i, j)`` indexes into them to similarity
+    metrics, with ``predictions`` from ``classify_pairs``. Rows are written with chunked ``bulk_create``
+    (``BULK_CREATE_BATCH_SIZE``). With ``RESULT_STORAGE_THRESHOLD`` set, only
+    pairs scoring at least that much are stored and reported.
+    Returns ``(report, results)`` for the API response.
+    """
+    batch_size = getattr(settings, 'BULK_CREATE_BATCH_SIZE', 500)
+    storage_threshold = getattr(settings, 'RESULT_STORAGE_THRESHOLD', None)
+
+    report = []
+    results = []
+    plagiarism_results = []
+
+    with transaction.atomic():
+        # Re-runs (e.g. a requeued job) replace the previous rows
+        batch.results.all().delete()
+        batch.submissions.all().delete()
+        batch.save(update_fields=['nested_zip_structure', 'total_nested_zips', 'duplicate_report', 'starter_code'])
+
+        ProjectSubmission.objects.bulk_create(submissions, batch_size=batch_size)
+        index_submission_fingerprints(submissions)
+        index_submission_buckets(submissions)
+
+        flags, confidences = predictions
+        for k, ((i, j), similarity_metrics) in enumerate(batch_similarity.items()):
+            obj1 = submissions[i]
+            obj2 = submissions[j]
+            similarity_score = similarity_metrics.get('overall_similarity', 0)
+            if storage_threshold is not None and similarity_score < storage_threshold:
+                continue
+
+            # Model decision (or weighted score > 0.7 without a trained model)
+            is_plagiarized = bool(flags[k])
+            confidence = float(confidences[k])
+
+            plagiarism_results.append(PlagiarismResult(
+                batch=batch,
+                project1=obj1,
+                project2=obj2,
+                similarity_score=similarity_score,
+                is_plagiarized=is_plagiarized,
+                confidence=confidence,
+                comparison_details=similarity_metrics
+            ))
+
+            # Add to report for frontend
+            report.append({
+                'student_id_1': obj1.student_id,
+                'student_id_2': obj2.student_id,
+                'similarity_percentage': round(similarity_score * 100, 2),
+                'plagiarized_status': 'Yes' if is_plagiarized else 'No'
+            })
+
+            # Add to results for detailed analysis
+            results.append({
+                'project1_id': obj1.id,
+                'project2_id': obj2.id,
+                'similarity_score': similarity_score,
+                'is_plagiarized': is_plagiarized,
+                'confidence': confidence,
+                'features': similarity_metrics
+            })
+
+        PlagiarismResult.objects.bulk_create(plagiarism_results, batch_size=batch_size)
+        store_batch_summary(batch)
+
+    skipped = len(batch_similarity) - len(plagiarism_results)
+    if skipped:
+        print(f"  💾 Stored {len(plagiarism_results)} results ({skipped} pairs below {storage_threshold:.2f} not stored)")
+    return report, results
+
+
+def compare_with_history(batch, submissions, sketches, fingerprints):
+    """Score a saved batch against the faculty member's earlier submissions of the same topic.
+
+    ``submissions`` are the batch's saved ProjectSubmission rows with their
+    ``sketches`` and ``fingerprints`` in the same order. Candidates come from
+    the topic corpus (see corpus.py) and are scored and classified like
+    in-batch pairs; the batch's HistoricalMatch rows are replaced, keeping
+    pairs that pass ``RESULT_STORAGE_THRESHOLD``. Returns the match report.
+    Batches without a topic (blank or the default) have no history.
+    """
+    if not getattr(settings, 'CORPUS_COMPARISON_ENABLED', True):
+        return []
+    if not batch.topic.strip() or batch.topic == BatchUpload.DEFAULT_TOPIC:
+        return []
+    started = time.monotonic()
+    storage_threshold = getattr(settings, 'RESULT_STORAGE_THRESHOLD', None)
+
+    corpus = TopicCorpus(batch.faculty_id, batch.topic, exclude_batch=batch)
+    candidates = corpus.candidate_pairs(sketches, fingerprints)
+    history = corpus.load(sorted({submission_id for _, submission_id in candidates}))
+    candidates = [(index, submission_id) for index, submission_id in candidates if submission_id in history]
+
+    matches = []
+    if candidates:
+        # Earlier submissions are appended after the batch's own projects
+        history_ids = sorted({submission_id for _, submission_id in candidates})
+        positions = {submission_id: len(submissions) + k for k, submission_id in enumerate(history_ids)}
+        first = np.array([index for index, _ in candidates], dtype=np.int64)
+        second = np.array([positions[submission_id] for _, submission_id in candidates], dtype=np.int64)
+
+        batch_similarity = calculate_batch_similarity(
+            list(sketches) + [FeatureSketch.coerce(history[submission_id].sketch) for submission_id in history_ids],
+            pairs=(first, second)
+        )
+        FingerprintIndex(
+            list(fingerprints) + [history[submission_id].fingerprints for submission_id in history_ids]
+        ).annotate(batch_similarity)
+        flags, confidences = classify_pairs(batch_similarity)
+
+        for k, ((i, j), similarity_metrics) in enumerate(batch_similarity.items()):
+            similarity_score = similarity_metrics.get('overall_similarity', 0)
+            if storage_threshold is not None and similarity_score < storage_threshold:
+                continue
+            matches.append(HistoricalMatch(
+                batch=batch,
+                submission=submissions[i],
+                matched_submission=history[history_ids[j - len(submissions)]],
+                similarity_score=similarity_score,
+                is_plagiarized=bool(flags[k]),
+                confidence=float(confidences[k]),
+                comparison_details=similarity_metrics
+            ))
+
+    with transaction.atomic():
+        batch.historical_matches.all().delete()
+        HistoricalMatch.objects.bulk_create(matches, batch_size=getattr(settings, 'BULK_CREATE_BATCH_SIZE', 500))
+
+    print(f"📚 History ({batch.topic}): {len(candidates)} candidate pairs with "
+          f"{len(history)} earlier submissions, {len(matches)} stored ({time.monotonic() - started:.2f}s)")
+    return historical_match_report(batch)
+
+
+def run_batch_check(batch, progress=None):
+    """Run the full plagiarism pipeline for an uploaded batch.
+
+    Reads projects from ``batch.file_path``, stores ProjectSubmission,
+    PlagiarismResult and HistoricalMatch rows and returns the report data
+    for the API response.
+    Raises BatchCheckError for archives without usable projects.
+    """
+    progress = progress or JobProgress(batch)
+    zip_path = batch.file_path
+
+    # Stream projects straight out of the archive (no temp directory)
+    nested_structure = {}
+    file_manifests = {}
+    project_features = []
+    crc_projects = []
+
+    # Instructor starter code (fingerprinted on upload) is removed from every
+    # submission before candidate generation and scoring
+    batch.starter_code = starter_code_for(batch)
+    starter = StarterProfile.from_bytes(batch.starter_code.profile) if batch.starter_code else None
+    if starter is not None:
+        print(f"📐 Excluding starter code {batch.starter_code.file_name}: {starter.summary()}")
+
+    ignored_keys = starter.crc_keys if starter else frozenset()
+    try:
+        # Folder-style batches: identical files and submissions straight from
+        # the central directory, before anything is extracted (None otherwise)
+        duplicates = index_central_directory(zip_path, ignored_keys)
+
+        reader = BatchArchiveReader(zip_path)
+        expected_projects = max(reader.estimate_project_count(), 1)
+        progress.update('extracting', 0.0, force=True)
+
+        # Features are extracted in worker processes, results come back in archive order
+        for project, data, error in extract_features_parallel(reader, starter=starter):
+            project_name = project['name']
+            zip_info = project['nested_info']
+            if error:
+                zip_info['extraction_error'] = error
+
+            # Project submission with nested info, saved in bulk below
+            submission = ProjectSubmission(
+                batch=batch,
+                student_id=project_name,
+                project_name=project_name,
+                file_path=project['source'],
+                features=data['summary'],
+                sketch=data['sketch'],
+                fingerprints=data['fingerprints'],
+                content_path=store_submission_content(batch, project_name, data['content']),
+                parent_zip_name=zip_info.get('parent', 'root'),
+                extraction_level=zip_info.get('level', 0),
+                original_zip_path=zip_info.get('original_zip_path', '')
+            )
+
+            nested_structure[project_name] = zip_info
+            file_manifests[project_name] = project['manifest']
+            crc_projects.append({'name': project_name, 'source': project['source'], 'manifest': project['manifest']})
+            project_features.append({
+                'submission': submission,
+                'sketch': FeatureSketch.from_bytes(data['sketch']),
+                'file_paths': data.get('file_paths', {}),
+                'fingerprints': data['fingerprints'],
+                'nested_info': zip_info
+            })
+            progress.update('extracting', len(project_features) / expected_projects)
+    except zipfile.BadZipFile:
+        raise BatchCheckError('Uploaded file is not a valid ZIP file.')
+
+    if not project_features:
+        raise BatchCheckError('No valid projects found in the ZIP file.')
+
+    if duplicates is None:
+        # Nested student ZIPs: index the manifests the extraction pass already
+        # read, confirming shared files with its content digests
+        digests = {
+            (k, path): digest
+            for k, project in enumerate(project_features)
+            for digest, paths in project['file_paths'].items()
+            for path in paths
+        }
+        duplicates = index_duplicates(crc_projects, ignored_keys, digests)
+    batch.duplicate_report = duplicates.report()
+
+    # Update batch with nested structure info (projects plus section archives)
+    nested_structure.update(reader.sections)
+    batch.nested_zip_structure = nested_structure
+    batch.total_nested_zips = len([p for p in nested_structure.values() if p['type'] in ('nested_zip', 'section')])
+
+    print(f"Generating plagiarism report for {len(project_features)} projects...")
+    progress.update('scoring', 0.0, force=True)
+
+    # One inverted index of code-file hashes serves hash similarity, the
+    # exact-copy pairs and the report of files shared by groups of students
+    sketches = [project['sketch'] for project in project_features]
+    hash_index = FileHashIndex([sketch.file_hashes for sketch in sketches])
+    batch.duplicate_report['shared_file_groups'] = hash_index.shared_file_groups(
+        [project['submission'].student_id for project in project_features],
+        [project['file_paths'] for project in project_features]
+    )
+
+    # Winnowed k-gram fingerprints find local matches (e.g. one copied function)
+    kgram_index = FingerprintIndex([project['fingerprints'] for project in project_features])
+
+    # Large batches only score LSH candidate pairs, small ones score every pair.
+    # Pairs the CRC or hash index found to be (nearly) exact copies, and pairs
+    # sharing fingerprints, are always scored.
+    candidate_pairs = select_candidate_pairs(sketches)
+    if candidate_pairs is not None:
+        positions = {project['submission'].student_id: k for k, project in enumerate(project_features)}
+        required_pairs = hash_index.exact_copy_pairs() + kgram_index.candidate_pairs()
+        for i, j in duplicates.exact_copy_pairs():
+            first = positions.get(duplicates.projects[i]['name'])
+            second = positions.get(duplicates.projects[j]['name'])
+            if first is not None and second is not None:
+                required_pairs.append((min(first, second), max(first, second)))
+        candidate_pairs = merge_candidate_pairs(candidate_pairs, required_pairs, len(sketches))
+    batch_similarity = calculate_batch_similarity(sketches, pairs=candidate_pairs, hash_index=hash_index)
+    kgram_index.annotate(batch_similarity)
+    predictions = classify_pairs(batch_similarity)
+
+    progress.update('saving', 0.0, force=True)
+    submissions = [project['submission'] for project in project_features]
+    report, results = save_batch_results(batch, submissions, batch_similarity, predictions)
+
+    # Earlier batches of the topic, through the persistent corpus index
+    progress.update('history', 0.0, force=True)
+    historical_matches = compare_with_history(
+        batch, submissions, sketches, [project['fingerprints'] for project in project_features]
+    )
+
+    print(f"Plagiarism detection complete. Generated report for {len(project_features)} students.")
+
+    return {
+        'total_projects': len(project_features),
+        'nested_structure': nested_structure,
+        'total_nested_zips': batch.total_nested_zips,
+        'file_manifests': file_manifests,
+        'exact_duplicates': batch.duplicate_report,
+        'historical_matches': historical_matches,
+        'plagiarism_report': report,
+        'detailed_comparisons': results
+    }
+
+
+def requeue_stale_jobs(stale_after):
+    """Put running jobs whose worker stopped sending heartbeats back in the queue"""
+    cutoff = timezone.now() - stale_after
+    return BatchUpload.objects.filter(
+        job_status=BatchUpload.JOB_RUNNING,
+        job_heartbeat_at__lt=cutoff
+    ).update(job_status=BatchUpload.JOB_QUEUED, job_stage='requeued', job_worker='')
+
+
+def claim_next_batch_job(worker_id):
+    """Claim the oldest queued batch job for this worker, or return None.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports it.
+    SQLite ignores row locks, so the claim is also a conditional UPDATE:
+    only one worker can move a row from queued to running.
+    """
+    with transaction.atomic():
+        batch = (
+            BatchUpload.objects.select_for_update(skip_locked=True)
+            .filter(job_status=BatchUpload.JOB_QUEUED)
+            .order_by('uploaded_at', 'id')
+            .first()
+        )
+        if batch is None:
+            return None
+
+        now = timezone.now()
+        claimed = BatchUpload.objects.filter(pk=batch.pk, job_status=BatchUpload.JOB_QUEUED).update(
+            job_status=BatchUpload.JOB_RUNNING,
+            job_worker=worker_id,
+            job_stage='starting',
+            job_progress=0.0,
+            job_error='',
+            job_started_at=now,
+            job_finished_at=None,
+            job_heartbeat_at=now
+        )
+
+    if not claimed:
+        return None
+    batch.refresh_from_db()
+    return batch
+
+
+def process_batch_job(batch, worker_id=''):
+    """Run a claimed batch job and record done/failed on the BatchUpload row"""
+    print(f"🚀 [{worker_id}] Processing batch {batch.id} ({batch.batch_name})")
+    try:
+        with JobHeartbeat(batch, worker_id):
+            run_batch_check(batch, JobProgress(batch))
+    except Exception as e:
+        message = str(e) if isinstance(e, BatchCheckError) else f'Processing failed: {e}'
+        print(f"❌ Batch {batch.id} failed: {message}")
+        BatchUpload.objects.filter(pk=batch.pk).update(
+            job_status=BatchUpload.JOB_FAILED,
+            job_error=message,
+            job_finished_at=timezone.now(),
+            job_heartbeat_at=timezone.now()
+        )
+        return False
+
+    BatchUpload.objects.filter(pk=batch.pk).update(
+        job_status=BatchUpload.JOB_DONE,
+        job_stage='done',
+        job_progress=1.0,
+        job_error='',
+        job_finished_at=timezone.now(),
+        job_heartbeat_at=timezone.now()
+    )
+    print(f"✅ Batch {batch.id} done")
+    return True
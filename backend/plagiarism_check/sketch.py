@@ -0,0 +1,216 @@
+import hashlib
+import struct
+import zlib
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfTransformer
+
+
+# Binary layout: MAGIC | version (u8) | scalar counters | zlib(arrays)
+SKETCH_MAGIC = b'ZSK'
+SKETCH_VERSION = 1
+
+# Counters kept as plain numbers (also stored in ProjectSubmission.features)
+SCALAR_FIELDS = (
+    'total_files', 'python_files', 'js_files', 'html_files', 'css_files',
+    'total_lines', 'code_lines', 'comment_lines', 'blank_lines',
+    'functions_count', 'classes_count', 'code_files',
+)
+
+# Array sections in on-disk order: (name, numpy dtype)
+ARRAY_FIELDS = (
+    ('token_ids', '<u8'),        # interned TF-IDF tokens (sorted, unique)
+    ('token_counts', '<u4'),     # term frequency per token id
+    ('minhash', '<u4'),          # MinHash signature over token shingles + file hashes
+    ('file_hashes', 'S16'),      # MD5 digests of code files (sorted, unique)
+    ('function_names', '<u8'),   # hashed name sets (sorted, unique)
+    ('imports', '<u8'),
+    ('variable_names', '<u8'),
+    ('keywords', '<u8'),
+)
+
+MINHASH_PERMUTATIONS = 128
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1729)
+# Fixed permutations so signatures stay comparable across processes and releases
+_PERM_A = _rng.randint(1, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def intern_token(token):
+    """Stable 64-bit id for a token, name or import (same in every process)"""
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8', errors='ignore'), digest_size=8).digest(), 'little')
+
+
+def _hashed_set(values):
+    return np.array(sorted({intern_token(value) for value in values}), dtype='<u8')
+
+
+def _shingle_hashes(token_ids, size=SHINGLE_SIZE):
+    """32-bit hashes of every ``size``-token window of a token id sequence"""
+    if len(token_ids) == 0:
+        return np.empty(0, dtype=np.uint64)
+    if len(token_ids) < size:
+        size = len(token_ids)
+
+    windows = np.lib.stride_tricks.sliding_window_view(token_ids, size)
+    # Polynomial combine with wrapping uint64 arithmetic
+    combined = np.zeros(len(windows), dtype=np.uint64)
+    multiplier = np.uint64(1099511628211)
+    with np.errstate(over='ignore'):
+        for column in range(size):
+            combined = combined * multiplier + windows[:, column]
+    return (combined >> np.uint64(32)) ^ (combined & _MAX_HASH)
+
+
+def token_shingle_hashes(tokens, size=SHINGLE_SIZE):
+    """Shingle hashes of a token list as used for MinHash; window ``i`` starts at token ``i``"""
+    return _shingle_hashes(np.array([intern_token(token) for token in tokens], dtype=np.uint64), size)
+
+
+def minhash_signature(values, chunk_size=8192):
+    """MinHash signature (uint32 x MINHASH_PERMUTATIONS) of a set of 32-bit hashes"""
+    signature = np.full(MINHASH_PERMUTATIONS, _MAX_HASH, dtype=np.uint64)
+    values = np.unique(np.asarray(values, dtype=np.uint64))
+
+    with np.errstate(over='ignore'):
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size, None]
+            permuted = ((chunk * _PERM_A + _PERM_B) % _MERSENNE_PRIME) & _MAX_HASH
+            signature = np.minimum(signature, permuted.min(axis=0))
+
+    return signature.astype('<u4')
+
+
+class FeatureSketch:
+    """Compact, versioned summary of a submission used for all scoring.
+
+    Holds interned token-count vectors, a MinHash signature, hashed sets and
+    scalar counters instead of the raw source, tokens and AST dumps.
+    """
+
+    def __init__(self, scalars, arrays):
+        self.scalars = scalars
+        self.arrays = arrays
+
+    def __getattr__(self, name):
+        arrays = self.__dict__.get('arrays', {})
+        if name in arrays:
+            return arrays[name]
+        raise AttributeError(name)
+
+    @classmethod
+    def from_features(cls, features):
+        """Build a sketch from an extract_code_features_enhanced dict"""
+        scalars = {field: int(features.get(field, 0)) for field in SCALAR_FIELDS}
+        scalars['code_files'] = len(features.get('file_hashes', []))
+
+        tokens = features.get('code_tokens', [])
+        token_cache = {token: intern_token(token) for token in set(tokens)}
+        sequence = np.array([token_cache[token] for token in tokens], dtype=np.uint64)
+
+        # TF-IDF uses sklearn's default token pattern (two or more characters)
+        counts = Counter(token for token in tokens if len(token) >= 2)
+        id_counts = sorted((token_cache[token], count) for token, count in counts.items())
+        token_ids = np.array([token_id for token_id, _ in id_counts], dtype='<u8')
+        token_counts = np.array([count for _, count in id_counts], dtype='<u4')
+
+        file_digests = sorted({bytes.fromhex(h) for h in features.get('file_hashes', [])})
+        file_hashes = np.array(file_digests, dtype='S16')
+        file_hash_values = np.array([int.from_bytes(d[:4], 'little') for d in file_digests], dtype=np.uint64)
+
+        shingles = np.concatenate([_shingle_hashes(sequence), file_hash_values])
+        minhash = minhash_signature(shingles) if len(shingles) else np.zeros(0, dtype='<u4')
+
+        arrays = {
+            'token_ids': token_ids,
+            'token_counts': token_counts,
+            'minhash': minhash,
+            'file_hashes': file_hashes,
+            'function_names': _hashed_set(features.get('function_names', [])),
+            'imports': _hashed_set(features.get('imports', [])),
+            'variable_names': _hashed_set(features.get('variable_names', [])),
+            'keywords': _hashed_set(features.get('keywords', [])),
+        }
+        return cls(scalars, arrays)
+
+    @classmethod
+    def coerce(cls, value):
+        """Accept a FeatureSketch, its serialized bytes or a raw feature dict"""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return cls.from_bytes(bytes(value))
+        return cls.from_features(value)
+
+    def to_bytes(self):
+        header = SKETCH_MAGIC + struct.pack('<B', SKETCH_VERSION)
+        header += struct.pack(f'<{len(SCALAR_FIELDS)}Q', *(self.scalars[field] for field in SCALAR_FIELDS))
+
+        body = bytearray()
+        for name, dtype in ARRAY_FIELDS:
+            array = np.ascontiguousarray(self.arrays[name], dtype=dtype)
+            body += struct.pack('<I', len(array))
+            body += array.tobytes()
+        return header + zlib.compress(bytes(body), 6)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:3] != SKETCH_MAGIC:
+            raise ValueError('Not a feature sketch')
+        version = data[3]
+        if version != SKETCH_VERSION:
+            raise ValueError(f'Unsupported feature sketch version {version}')
+
+        offset = 4
+        scalar_format = f'<{len(SCALAR_FIELDS)}Q'
+        scalars = dict(zip(SCALAR_FIELDS, struct.unpack_from(scalar_format, data, offset)))
+        offset += struct.calcsize(scalar_format)
+
+        body = zlib.decompress(data[offset:])
+        arrays = {}
+        position = 0
+        for name, dtype in ARRAY_FIELDS:
+            (length,) = struct.unpack_from('<I', body, position)
+            position += 4
+            item_size = np.dtype(dtype).itemsize
+            arrays[name] = np.frombuffer(body, dtype=dtype, count=length, offset=position)
+            position += length * item_size
+        return cls(scalars, arrays)
+
+    def summary(self):
+        """Scalar counters for ProjectSubmission.features"""
+        return dict(self.scalars)
+
+
+def jaccard_sorted(set1, set2):
+    """Jaccard similarity of two sorted unique arrays"""
+    if len(set1) == 0 and len(set2) == 0:
+        return 0.0
+    intersection = len(np.intersect1d(set1, set2, assume_unique=True))
+    union = len(set1) + len(set2) - intersection
+    return intersection / union if union else 0.0
+
+
+def tfidf_cosine(sketch1, sketch2, max_features=1000):
+    """TF-IDF cosine of two sketches, matching a two-document TfidfVectorizer fit"""
+    if len(sketch1.token_ids) == 0 or len(sketch2.token_ids) == 0:
+        return 0.0
+
+    vocabulary, inverse = np.unique(np.concatenate([sketch1.token_ids, sketch2.token_ids]), return_inverse=True)
+    counts = np.zeros((2, len(vocabulary)))
+    counts[0, inverse[:len(sketch1.token_ids)]] = sketch1.token_counts
+    counts[1, inverse[len(sketch1.token_ids):]] = sketch2.token_counts
+
+    if len(vocabulary) > max_features:
+        # Keep the most frequent terms, like TfidfVectorizer(max_features=...)
+        keep = np.argsort(-counts.sum(axis=0), kind='stable')[:max_features]
+        counts = counts[:, keep]
+
+    tfidf = TfidfTransformer().fit_transform(csr_matrix(counts))
+    return float(min((tfidf[0] @ tfidf[1].T).toarray()[0][0], 1.0))
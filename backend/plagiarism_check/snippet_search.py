@@ -0,0 +1,220 @@
+import gzip
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+
+from .fingerprint import KGRAM_SIZE, WINNOW_WINDOW, ProjectFingerprints, fingerprint_source, source_kgrams
+from .models import FingerprintPosting, ProjectSubmission
+
+
+DEFAULT_SNIPPET_MAX_CHARS = 20000
+
+# Fingerprints stored for more submissions than this are common idioms and
+# are not looked up (they would only add noise and rows to read)
+DEFAULT_SNIPPET_MAX_POSTING = 500
+
+# Share of the snippet a submission must cover to be listed
+DEFAULT_SNIPPET_MIN_COVERAGE = 0.2
+
+DEFAULT_SNIPPET_RESULTS = 50
+
+# Fingerprints per IN (...) lookup (SQLite caps the number of query parameters)
+_LOOKUP_BATCH_SIZE = 500
+
+# Posting rows per INSERT batch while indexing
+_INDEX_BATCH_SIZE = 5000
+
+# Lines between two matched fingerprints that still belong to one region
+_REGION_GAP = 2
+
+# Name of the single file of submissions fingerprinted from their stored content
+COMBINED_SOURCE_PATH = '(combined source)'
+
+
+class SnippetSearchError(Exception):
+    """The snippet cannot be searched; the message is shown to the client"""
+
+
+def signed_hashes(hashes):
+    """uint64 fingerprints as the signed values stored in BigIntegerField"""
+    return np.asarray(hashes, dtype=np.uint64).view(np.int64)
+
+
+def lookup_postings(postings, keys, fields, max_posting, key_field='fingerprint'):
+    """Posting rows whose ``key_field`` is one of ``keys``, read in chunks.
+
+    Keys held by more than ``max_posting`` submissions are skipped. Returns
+    ``(rows, common)``: ``values_list(*fields)`` tuples and the number of
+    skipped keys.
+    """
+    rows = []
+    common = 0
+    for start in range(0, len(keys), _LOOKUP_BATCH_SIZE):
+        chunk = keys[start:start + _LOOKUP_BATCH_SIZE]
+        holders = postings.filter(**{f'{key_field}__in': chunk}).values(key_field).annotate(
+            holders=Count('submission', distinct=True)
+        )
+        frequent = {row[key_field] for row in holders if row['holders'] > max_posting}
+        common += len(frequent)
+        usable = [key for key in chunk if key not in frequent]
+        if usable:
+            rows.extend(postings.filter(**{f'{key_field}__in': usable}).values_list(*fields))
+    return rows, common
+
+
+def _posting_rows(fingerprints):
+    """(fingerprint, file_index, start_line, end_line) for every stored fingerprint"""
+    fingerprints = ProjectFingerprints.coerce(fingerprints)
+    return zip(
+        signed_hashes(fingerprints.hashes).tolist(),
+        fingerprints.files.tolist(),
+        fingerprints.start_lines.tolist(),
+        fingerprints.end_lines.tolist()
+    )
+
+
+def index_submission_fingerprints(submissions):
+    """Add the fingerprints of saved submissions to the snippet search index
+
+    ``submissions`` are ProjectSubmission objects with primary keys and a
+    ``fingerprints`` blob. Rows are inserted in chunks; returns the count.
+    """
+    pending = []
+    total = 0
+    for submission in submissions:
+        if not submission.fingerprints:
+            continue
+        for fingerprint, file_index, start_line, end_line in _posting_rows(submission.fingerprints):
+            pending.append(FingerprintPosting(
+                submission_id=submission.pk,
+                fingerprint=fingerprint,
+                file_index=file_index,
+                start_line=start_line,
+                end_line=end_line
+            ))
+        if len(pending) >= _INDEX_BATCH_SIZE:
+            FingerprintPosting.objects.bulk_create(pending, batch_size=_INDEX_BATCH_SIZE)
+            total += len(pending)
+            pending = []
+
+    FingerprintPosting.objects.bulk_create(pending, batch_size=_INDEX_BATCH_SIZE)
+    return total + len(pending)
+
+
+def fingerprint_stored_content(submission):
+    """Fingerprints for a submission saved before fingerprints were recorded
+
+    Only the concatenated source is stored for those, so every match is
+    reported in one combined file. Returns None when there is no content.
+    """
+    if not submission.content_path:
+        return None
+    try:
+        with gzip.open(submission.content_path, 'rt', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+    except OSError:
+        return None
+    return ProjectFingerprints.from_files([(COMBINED_SOURCE_PATH, fingerprint_source(content))]).to_bytes()
+
+
+def _merge_regions(rows):
+    """Merge (file_index, start_line, end_line) rows into per-file line ranges"""
+    regions = []
+    for file_index, start_line, end_line in sorted(rows):
+        last = regions[-1] if regions else None
+        if last and last[0] == file_index and start_line <= last[2] + _REGION_GAP:
+            last[2] = max(last[2], end_line)
+        else:
+            regions.append([file_index, start_line, end_line])
+    return regions
+
+
+def search_snippet(snippet, faculty, file_ext='', topic=None, limit=None):
+    """Submissions of ``faculty``'s batches containing ``snippet``, best coverage first.
+
+    The snippet is normalized like submissions and every one of its
+    k-grams is looked up, so a submission containing the whole snippet
+    matches each winnowed fingerprint it stored for that code. ``coverage``
+    is the share of the snippet's winnowing windows holding a matched
+    k-gram; winnowing picks one fingerprint in every window, so it is 1.0
+    when the whole snippet is contained.
+    """
+    max_chars = getattr(settings, 'SNIPPET_MAX_CHARS', DEFAULT_SNIPPET_MAX_CHARS)
+    max_posting = getattr(settings, 'SNIPPET_MAX_POSTING', DEFAULT_SNIPPET_MAX_POSTING)
+    min_coverage = getattr(settings, 'SNIPPET_MIN_COVERAGE', DEFAULT_SNIPPET_MIN_COVERAGE)
+    if limit is None:
+        limit = getattr(settings, 'SNIPPET_RESULTS', DEFAULT_SNIPPET_RESULTS)
+
+    if len(snippet) > max_chars:
+        raise SnippetSearchError(f"Snippet is longer than {max_chars} characters")
+
+    started = time.monotonic()
+    hashes, snippet_starts, snippet_ends = source_kgrams(snippet, file_ext)
+    if not len(hashes):
+        raise SnippetSearchError(f"Snippet is too short: it needs at least {KGRAM_SIZE} code tokens")
+    window = min(WINNOW_WINDOW, len(hashes))
+
+    postings = FingerprintPosting.objects.filter(submission__batch__faculty=faculty)
+    if topic:
+        postings = postings.filter(submission__batch__topic=topic)
+
+    lookup = np.unique(signed_hashes(hashes)).tolist()
+    rows, common = lookup_postings(
+        postings, lookup, ('submission_id', 'fingerprint', 'file_index', 'start_line', 'end_line'), max_posting
+    )
+    matches = defaultdict(list)
+    for submission_id, fingerprint, file_index, start_line, end_line in rows:
+        matches[submission_id].append((fingerprint, file_index, start_line, end_line))
+
+    snippet_hashes = signed_hashes(hashes)
+    ranked = []
+    for submission_id, rows in matches.items():
+        matched = np.isin(snippet_hashes, np.array([row[0] for row in rows], dtype=np.int64))
+        coverage = float(np.lib.stride_tricks.sliding_window_view(matched, window).any(axis=1).mean())
+        if coverage >= min_coverage:
+            ranked.append((coverage, len(rows), submission_id, matched))
+    ranked.sort(key=lambda match: (-match[0], -match[1], match[2]))
+    ranked = ranked[:limit]
+
+    submissions = ProjectSubmission.objects.select_related('batch').in_bulk(
+        [submission_id for _, _, submission_id, _ in ranked]
+    )
+    results = []
+    for coverage, fingerprint_count, submission_id, matched in ranked:
+        submission = submissions[submission_id]
+        try:
+            paths = ProjectFingerprints.coerce(submission.fingerprints).paths
+        except ValueError:
+            paths = []
+        positions = np.flatnonzero(matched)
+        results.append({
+            'submission_id': submission_id,
+            'student_id': submission.student_id,
+            'project_name': submission.project_name,
+            'batch_id': submission.batch_id,
+            'batch_name': submission.batch.batch_name,
+            'topic': submission.batch.topic,
+            'coverage': round(coverage, 3),
+            'matched_fingerprints': fingerprint_count,
+            'snippet_lines': [int(snippet_starts[positions].min()), int(snippet_ends[positions].max())],
+            'regions': [
+                {
+                    'file': paths[file_index] if file_index < len(paths) else None,
+                    'lines': [start_line, end_line]
+                }
+                for file_index, start_line, end_line in _merge_regions([row[1:] for row in matches[submission_id]])
+            ]
+        })
+
+    elapsed = time.monotonic() - started
+    print(f"🔎 Snippet search: {len(lookup)} k-grams ({common} common), "
+          f"{len(matches)} submissions hit, {len(results)} listed ({elapsed * 1000:.0f} ms)")
+    return {
+        'kgrams': len(lookup),
+        'common_kgrams': common,
+        'search_ms': round(elapsed * 1000, 1),
+        'matches': results
+    }
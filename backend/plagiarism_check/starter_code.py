@@ -0,0 +1,64 @@
+import zipfile
+
+from django.utils import timezone
+
+from .models import StarterCode
+from .starter_profile import StarterProfile
+from .uploads import store_upload
+
+
+class StarterCodeError(Exception):
+    """Starter code cannot be stored; the message is shown to the client"""
+
+
+def store_starter_code(faculty, uploaded_file, topic=''):
+    """Store a starter archive and fingerprint it, or return the row already made for it.
+
+    With a ``topic`` the starter code applies to every later batch of that
+    topic; without one it is only used by batches it is attached to.
+    Uploading an archive again makes its row the latest one for the topic.
+    Raises StarterCodeError for archives without code.
+    """
+    zip_path, archive_sha256 = store_upload(uploaded_file, 'starter')
+    existing = StarterCode.objects.filter(faculty=faculty, topic=topic, archive_sha256=archive_sha256).first()
+    if existing is not None:
+        existing.uploaded_at = timezone.now()
+        existing.save(update_fields=['uploaded_at'])
+        return existing
+
+    try:
+        profile = StarterProfile.from_archive(zip_path)
+    except zipfile.BadZipFile:
+        raise StarterCodeError('Starter code is not a valid ZIP file.')
+    if not profile.file_hashes:
+        raise StarterCodeError('No code files found in the starter code ZIP.')
+
+    print(f"📐 Starter code {uploaded_file.name} ({topic or 'batch only'}): {profile.summary()}")
+    return StarterCode.objects.create(
+        faculty=faculty,
+        topic=topic,
+        file_name=uploaded_file.name,
+        file_path=zip_path,
+        archive_sha256=archive_sha256,
+        profile=profile.to_bytes(),
+        summary=profile.summary()
+    )
+
+
+def resolve_starter_code(faculty, topic, starter_code=None):
+    """``starter_code`` if given, else the faculty member's latest starter code for ``topic`` (or None)"""
+    if starter_code is not None:
+        return starter_code
+    return (
+        StarterCode.objects.filter(faculty=faculty, topic=topic)
+        .exclude(topic='')
+        .order_by('-uploaded_at', '-id')
+        .first()
+    )
+
+
+def starter_code_for(batch):
+    """Starter code attached to the batch, else the faculty member's latest for its topic"""
+    if batch.starter_code_id:
+        return batch.starter_code
+    return resolve_starter_code(batch.faculty_id, batch.topic)
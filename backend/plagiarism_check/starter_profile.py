@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import struct
+import zipfile
+import zlib
+
+import numpy as np
+
+from .fingerprint import source_kgrams
+from .sketch import SHINGLE_SIZE, token_shingle_hashes
+from .utils import extract_code_features_from_files, is_code_file
+from .zip_ingest import find_project_root, list_members, read_project_files
+
+
+# Binary layout: MAGIC | version (u8) | zlib(names JSON length (u32), names JSON,
+# k-gram count (u32), k-gram hashes, token shingle hashes). Version 1 had no
+# shingles (and no k-gram count) and is still read.
+STARTER_MAGIC = b'ZST'
+STARTER_VERSION = 2
+
+
+class StarterProfile:
+    """What a base project provides, removed from every submission before scoring.
+
+    Built once from the starter archive: MD5s and (CRC32, size) keys of its
+    code files, every normalized k-gram (not just the winnowed ones, so a
+    submission's own winnowing picks cannot slip through), the token
+    shingles behind TF-IDF and MinHash, and its function names and imports.
+    ``filter_files`` runs before feature extraction and ``subtract`` after
+    it, so candidate generation, scoring and the stored fingerprints all
+    see only the students' own code.
+    """
+
+    def __init__(self, file_hashes, kgrams, function_names, imports, crc_keys=(), shingles=()):
+        self.file_hashes = frozenset(file_hashes)
+        self.crc_keys = frozenset(tuple(key) for key in crc_keys)
+        self.kgrams = np.unique(np.asarray(kgrams, dtype=np.uint64))
+        self.shingles = np.unique(np.asarray(shingles, dtype=np.uint64))
+        self.function_names = frozenset(function_names)
+        self.imports = frozenset(imports)
+
+    @classmethod
+    def from_files(cls, files, crc_keys=()):
+        """Build from ``(path, content)`` pairs; files without content are ignored"""
+        code = [(path, content) for path, content in files if content is not None]
+        features = extract_code_features_from_files(code)
+        kgrams = [source_kgrams(content, os.path.splitext(path)[1].lower())[0] for path, content in code]
+        return cls(
+            features['file_hashes'],
+            np.concatenate(kgrams) if kgrams else np.empty(0, dtype=np.uint64),
+            features['function_names'],
+            features['imports'],
+            crc_keys,
+            token_shingle_hashes(features['code_tokens'])
+        )
+
+    @classmethod
+    def from_archive(cls, zip_path):
+        """Build from a project ZIP (nested archives are ignored).
+
+        Raises ``zipfile.BadZipFile`` for invalid archives.
+        """
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            members = [info for info in list_members(zip_ref) if not info.filename.lower().endswith('.zip')]
+            prefix, _, _ = find_project_root(members)
+            crc_keys = [(info.CRC, info.file_size) for info in members if info.file_size and is_code_file(info.filename)]
+            return cls.from_files(read_project_files(zip_ref, members, prefix), crc_keys)
+
+    def filter_files(self, files):
+        """Drop the content of code files identical to a starter file (they are still counted)"""
+        for path, content in files:
+            if content is not None and hashlib.md5(content.encode()).hexdigest() in self.file_hashes:
+                yield path, None
+            else:
+                yield path, content
+
+    def subtract(self, features):
+        """Remove starter function names, imports, k-grams and tokens from an extracted feature dict.
+
+        Tokens are dropped where they fall inside a shingle the starter code
+        also has, i.e. in unchanged runs of starter files the students
+        edited, so they reach neither the TF-IDF counts nor the MinHash.
+        """
+        features['code_tokens'] = self._own_tokens(features.get('code_tokens', []))
+        features['function_names'] = [name for name in features['function_names'] if name not in self.function_names]
+        features['imports'] = [name for name in features['imports'] if name not in self.imports]
+        fingerprints = []
+        for path, arrays in features.get('fingerprints', []):
+            keep = ~np.isin(arrays[0], self.kgrams)
+            fingerprints.append((path, tuple(array[keep] for array in arrays)))
+        features['fingerprints'] = fingerprints
+        return features
+
+    def _own_tokens(self, tokens):
+        if not len(self.shingles) or not tokens:
+            return tokens
+        starter_windows = np.flatnonzero(np.isin(token_shingle_hashes(tokens), self.shingles))
+        covered = np.zeros(len(tokens), dtype=bool)
+        for offset in range(min(SHINGLE_SIZE, len(tokens))):
+            covered[starter_windows + offset] = True
+        return [token for token, is_starter in zip(tokens, covered.tolist()) if not is_starter]
+
+    def summary(self):
+        return {
+            'code_files': len(self.file_hashes),
+            'kgrams': len(self.kgrams),
+            'shingles': len(self.shingles),
+            'function_names': len(self.function_names),
+            'imports': len(self.imports)
+        }
+
+    def to_bytes(self):
+        names = json.dumps({
+            'file_hashes': sorted(self.file_hashes),
+            'crc_keys': sorted(self.crc_keys),
+            'function_names': sorted(self.function_names),
+            'imports': sorted(self.imports)
+        }).encode('utf-8')
+        body = (
+            struct.pack('<I', len(names)) + names
+            + struct.pack('<I', len(self.kgrams)) + self.kgrams.astype('<u8').tobytes()
+            + self.shingles.astype('<u8').tobytes()
+        )
+        return STARTER_MAGIC + struct.pack('<B', STARTER_VERSION) + zlib.compress(body, 6)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        if data[:3] != STARTER_MAGIC:
+            raise ValueError('Not a starter code profile')
+        version = data[3]
+        if version not in (1, STARTER_VERSION):
+            raise ValueError(f'Unsupported starter code profile version {version}')
+
+        body = zlib.decompress(data[4:])
+        (length,) = struct.unpack_from('<I', body, 0)
+        names = json.loads(body[4:4 + length].decode('utf-8'))
+        offset = 4 + length
+        if version == 1:
+            kgrams, shingles = np.frombuffer(body, dtype='<u8', offset=offset), ()
+        else:
+            (count,) = struct.unpack_from('<I', body, offset)
+            kgrams = np.frombuffer(body, dtype='<u8', count=count, offset=offset + 4)
+            shingles = np.frombuffer(body, dtype='<u8', offset=offset + 4 + 8 * count)
+        return cls(
+            names['file_hashes'], kgrams, names['function_names'], names['imports'], names['crc_keys'], shingles
+        )
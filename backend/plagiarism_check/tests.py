@@ -1,3 +1,916 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from sklearn.ensemble import RandomForestClassifier
+
+from .corpus import TopicCorpus, index_submission_buckets
+from . import crc_index
+from .crc_index import CrcDuplicateIndex, find_exact_duplicates, index_central_directory, split_source
+from .feature_pool import build_submission_data, extract_features_safely
+from .fingerprint import ProjectFingerprints, fingerprint_source, normalize_tokens
+from .forest import CompiledForest, compile_forest
+from .hash_index import FileHashIndex
+from .batch_similarity import calculate_batch_similarity
+from .kgram_index import FingerprintIndex
+from .lsh import lsh_candidate_pairs
+from .sketch import MINHASH_PERMUTATIONS, FeatureSketch, minhash_signature
+from .utils import (
+    calculate_similarity_features_enhanced, extract_code_features_enhanced, extract_code_features_from_files
+)
+from .snippet_search import SnippetSearchError, index_submission_fingerprints, search_snippet
+from .starter_code import starter_code_for, store_starter_code
+from .views import finalize_upload_session, start_batch_check
+from .starter_profile import StarterProfile
+from .zip_ingest import BatchArchiveReader, is_container_archive, iter_batch_projects
+from .models import BatchUpload, FingerprintPosting, MinHashBucket, ProjectSubmission, UploadSession
+from .pipeline import JobHeartbeat, claim_next_batch_job, compare_with_history, requeue_stale_jobs, store_submission_content
+from .uploads import (
+    HashingFileUploadHandler, UploadSessionError, assemble_chunks, received_chunks, store_upload, write_chunk
+)
+
+
+class CompiledForestTests(SimpleTestCase):
+    """The NumPy forest evaluator must reproduce sklearn's predictions"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.RandomState(7)
+        X = rng.random_sample((600, 5)).astype(np.float32)
+        X[:, 3] *= 8  # structure_difference is not bounded by 1
+        y = ((X[:, 0] * 0.5 + X[:, 1] * 0.3 + rng.normal(0, 0.1, len(X))) > 0.45).astype(int)
+
+        cls.X_train, cls.X_test = X[:400], X[400:]
+        cls.model = RandomForestClassifier(
+            n_estimators=25, max_depth=10, min_samples_split=5, min_samples_leaf=2, random_state=42
+        ).fit(cls.X_train, y[:400])
+
+    def test_matches_sklearn_probabilities(self):
+        compiled = compile_forest(self.model)
+        np.testing.assert_allclose(compiled.predict_proba(self.X_test), self.model.predict_proba(self.X_test), atol=1e-12)
+        np.testing.assert_array_equal(compiled.predict(self.X_test), self.model.predict(self.X_test))
+
+    def test_block_size_does_not_change_results(self):
+        compiled = compile_forest(self.model)
+        np.testing.assert_allclose(
+            compiled.predict_positive(self.X_test, block_size=7),
+            compiled.predict_positive(self.X_test)
+        )
+
+    def test_save_and_load_round_trip(self):
+        compiled = compile_forest(self.model, {'version': 3})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'model.npz')
+            compiled.save(path)
+            loaded = CompiledForest.load(path)
+
+        self.assertEqual(loaded.version, 3)
+        self.assertEqual(loaded.n_estimators, 25)
+        np.testing.assert_array_equal(loaded.predict_positive(self.X_test), compiled.predict_positive(self.X_test))
+
+
+class HoldoutMetricsTests(SimpleTestCase):
+    """Evaluation metrics stored in versioned model artifacts"""
+
+    def test_metrics_on_holdout(self):
+        from .training import _evaluate
+
+        X = np.array([[0.9, 0.5, 0.8, 0.1, 0.9]] * 20 + [[0.1, 0.0, 0.2, 5.0, 0.1]] * 20, dtype=np.float32)
+        y = np.array([1] * 20 + [0] * 20, dtype=np.int8)
+        model = RandomForestClassifier(n_estimators=5, random_state=42).fit(X, y)
+
+        metrics = _evaluate(model, X, y)
+        self.assertEqual(metrics['holdout_samples'], 40)
+        self.assertEqual(metrics['accuracy'], 1.0)
+        self.assertEqual(metrics['f1'], 1.0)
+
+    def test_empty_holdout(self):
+        from .training import _evaluate
+
+        self.assertEqual(_evaluate(None, np.empty((0, 5)), np.empty(0)), {'holdout_samples': 0})
+
+
+class UploadStorageTests(SimpleTestCase):
+    """Uploads are hashed while streamed to disk and stored once per content"""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.storage_dir = os.path.join(tmp_dir.name, 'uploads')
+        os.makedirs(os.path.join(self.storage_dir, 'tmp'))
+        settings_override = override_settings(
+            UPLOAD_STORAGE_DIR=self.storage_dir, FILE_UPLOAD_TEMP_DIR=os.path.join(self.storage_dir, 'tmp')
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def stream(self, name, chunks):
+        handler = HashingFileUploadHandler()
+        handler.new_file('zip_file', name, 'application/zip', None)
+        offset = 0
+        for chunk in chunks:
+            handler.receive_data_chunk(chunk, offset)
+            offset += len(chunk)
+        return handler.file_complete(offset)
+
+    def test_streamed_upload_is_hashed_and_linked(self):
+        uploaded = self.stream('Batch A.ZIP', [b'PK' * 1000, b'rest'])
+        expected = hashlib.sha256(b'PK' * 1000 + b'rest').hexdigest()
+        self.assertEqual(uploaded.sha256, expected)
+
+        path, sha256 = store_upload(uploaded)
+        # Django's temporary file stays in place until the upload is closed
+        self.assertTrue(os.path.exists(uploaded.temporary_file_path()))
+        uploaded.close()
+        self.assertEqual(sha256, expected)
+        self.assertEqual(path, os.path.join(self.storage_dir, 'batches', expected[:2], expected + '.zip'))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'PK' * 1000 + b'rest')
+        self.assertEqual(os.listdir(os.path.join(self.storage_dir, 'tmp')), [])
+
+    def test_identical_content_is_stored_once(self):
+        streamed = self.stream('a.zip', [b'same bytes'])
+        first, _ = store_upload(streamed)
+        streamed.close()
+        second, _ = store_upload(SimpleUploadedFile('b.zip', b'same bytes'))
+        other, _ = store_upload(SimpleUploadedFile('a.zip', b'other bytes'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        stored = [name for _, _, files in os.walk(os.path.join(self.storage_dir, 'batches')) for name in files]
+        self.assertEqual(len(stored), 2)
+
+    def test_chunked_session_assembles_in_any_order(self):
+        data = os.urandom(2500)
+        session = UploadSession(file_name='big.zip', total_size=len(data), chunk_size=1000)
+        chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+
+        for index in (2, 0):
+            write_chunk(session, index, io.BytesIO(chunks[index]), hashlib.sha256(chunks[index]).hexdigest())
+        self.assertEqual(received_chunks(session), [0, 2])
+        with self.assertRaises(UploadSessionError):
+            assemble_chunks(session)
+
+        write_chunk(session, 1, io.BytesIO(chunks[1]), hashlib.sha256(chunks[1]).hexdigest())
+        path, sha256 = assemble_chunks(session)
+        self.assertEqual(sha256, hashlib.sha256(data).hexdigest())
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(received_chunks(session), [])
+
+    def test_chunk_with_bad_checksum_or_size_is_rejected(self):
+        session = UploadSession(file_name='big.zip', total_size=10, chunk_size=4)
+
+        with self.assertRaises(UploadSessionError):
+            write_chunk(session, 0, io.BytesIO(b'abcd'), hashlib.sha256(b'abce').hexdigest())
+        with self.assertRaises(UploadSessionError):
+            write_chunk(session, 2, io.BytesIO(b'ijk'), hashlib.sha256(b'ijk').hexdigest())
+        with self.assertRaises(UploadSessionError):
+            write_chunk(session, 3, io.BytesIO(b'ij'), hashlib.sha256(b'ij').hexdigest())
+        self.assertEqual(received_chunks(session), [])
+
+
+class CrcDuplicateIndexTests(SimpleTestCase):
+    """Identical files are found from central-directory CRCs, without extraction"""
+
+    def setUp(self):
+        handle, self.zip_path = tempfile.mkstemp(suffix='.zip')
+        os.close(handle)
+        self.addCleanup(os.remove, self.zip_path)
+
+        def student_zip(files):
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w') as zip_ref:
+                for name, content in files.items():
+                    zip_ref.writestr(name, content)
+            return buffer.getvalue()
+
+        shared = {'app.py': 'print("hello")\n', 'util.py': 'def add(a, b):\n    return a + b\n'}
+        with zipfile.ZipFile(self.zip_path, 'w') as zip_ref:
+            zip_ref.writestr('alice.zip', student_zip(shared))
+            zip_ref.writestr('bob.zip', student_zip({**shared, 'notes.txt': 'not code'}))
+            zip_ref.writestr('carol/app.py', shared['app.py'])
+            zip_ref.writestr('carol/main.py', 'import sys\n')
+
+    @override_settings(CRC_DUPLICATE_CONFIRM=True)
+    def test_identical_and_shared_files(self):
+        index = find_exact_duplicates(self.zip_path)
+        names = [project['name'] for project in index.projects]
+        report = index.report()
+
+        self.assertTrue(report['confirmed'])
+        self.assertEqual(report['duplicate_file_count'], 2)
+        self.assertEqual(report['identical_submissions'], [['alice', 'bob']])
+        self.assertEqual(sorted(report['duplicate_files'][0]['projects']), ['alice', 'bob', 'carol'])
+        self.assertEqual(
+            [(names[i], names[j]) for i, j in index.exact_copy_pairs()], [('alice', 'bob')]
+        )
+        self.assertTrue(all(project['files'] == [] for project in index.projects))
+
+    def test_crc_collisions_are_split_on_confirm(self):
+        projects = [
+            {'name': name, 'source': f'{self.zip_path}!{name}.zip',
+             'manifest': [{'path': 'app.py', 'size': 15, 'crc': 1}]}
+            for name in ('alice', 'bob')
+        ]
+        projects[1]['source'] = f'{self.zip_path}!carol/'
+        projects[1]['manifest'][0]['path'] = 'main.py'
+        index = CrcDuplicateIndex(projects)
+        self.assertEqual(len(index.groups), 1)
+
+        index.confirm()
+        self.assertEqual(index.groups, [])
+
+    def test_confirm_with_extraction_digests(self):
+        projects = [
+            {'name': name, 'source': f'missing.zip!{name}/', 'manifest': [{'path': 'app.py', 'size': 15, 'crc': 1}]}
+            for name in ('alice', 'bob', 'carol')
+        ]
+        index = CrcDuplicateIndex(projects)
+        index.confirm({(0, 'app.py'): 'a', (1, 'app.py'): 'a', (2, 'app.py'): 'c'})
+        self.assertEqual([holders for _, holders in index.groups], [{0: ['app.py'], 1: ['app.py']}])
+
+    @override_settings(CRC_DUPLICATE_CONFIRM=True)
+    def test_folder_batches_are_indexed_before_extraction(self):
+        self.assertIsNone(index_central_directory(self.zip_path))
+
+        handle, folder_zip = tempfile.mkstemp(suffix='.zip')
+        os.close(handle)
+        self.addCleanup(os.remove, folder_zip)
+        with open(folder_zip, 'wb') as f:
+            f.write(zip_bytes({
+                'Batch/alice/app.py': 'print("hello")\n', 'Batch/alice/own.py': 'x = 1\n',
+                'Batch/bob/main.py': 'print("hello")\n', 'Batch/bob/mine.py': 'y = 2\n',
+            }))
+
+        with mock.patch('plagiarism_check.crc_index.hash_project_members',
+                        wraps=crc_index.hash_project_members) as hashed:
+            index = index_central_directory(folder_zip)
+        # Only the members of the duplicate group are decompressed
+        self.assertEqual(sorted(sorted(call.args[1]) for call in hashed.call_args_list), [['app.py'], ['main.py']])
+        self.assertEqual(index.report()['duplicate_file_count'], 1)
+
+    def test_split_source(self):
+        self.assertEqual(split_source('b.zip!s.zip!alice.zip'), ('b.zip', ['s.zip', 'alice.zip'], ''))
+        self.assertEqual(split_source('b.zip!s.zip!carol/'), ('b.zip', ['s.zip'], 'carol/'))
+
+
+def zip_bytes(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_ref:
+        for name, content in files.items():
+            zip_ref.writestr(name, content)
+    return buffer.getvalue()
+
+
+class BatchJobQueueTests(TestCase):
+    """Workers claim queued batches oldest first; stale running jobs go back in the queue"""
+
+    def setUp(self):
+        faculty = get_user_model().objects.create_user(username='faculty', password='x', role='faculty')
+        self.batches = [
+            BatchUpload.objects.create(faculty=faculty, batch_name=name, topic='Python') for name in ('first', 'second')
+        ]
+
+    def test_claims_oldest_queued_batch_once(self):
+        claimed = claim_next_batch_job('worker-1')
+        self.assertEqual(claimed, self.batches[0])
+        self.assertEqual((claimed.job_status, claimed.job_worker), (BatchUpload.JOB_RUNNING, 'worker-1'))
+        self.assertIsNotNone(claimed.job_heartbeat_at)
+
+        self.assertEqual(claim_next_batch_job('worker-2'), self.batches[1])
+        self.assertIsNone(claim_next_batch_job('worker-3'))
+
+    def test_stale_jobs_are_requeued(self):
+        claim_next_batch_job('worker-1')
+        claim_next_batch_job('worker-2')
+        BatchUpload.objects.filter(pk=self.batches[0].pk).update(
+            job_heartbeat_at=timezone.now() - timedelta(minutes=10)
+        )
+
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=5)), 1)
+        stale = BatchUpload.objects.get(pk=self.batches[0].pk)
+        self.assertEqual((stale.job_status, stale.job_stage, stale.job_worker), (BatchUpload.JOB_QUEUED, 'requeued', ''))
+        self.assertEqual(BatchUpload.objects.get(pk=self.batches[1].pk).job_status, BatchUpload.JOB_RUNNING)
+
+        self.assertEqual(claim_next_batch_job('worker-3'), self.batches[0])
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    """A running job keeps its heartbeat fresh between progress updates"""
+
+    def test_heartbeat_is_written_while_the_job_runs(self):
+        faculty = get_user_model().objects.create_user(username='faculty', password='x', role='faculty')
+        BatchUpload.objects.create(faculty=faculty, batch_name='Fall', topic='Python')
+        batch = claim_next_batch_job('worker-1')
+        stale = timezone.now() - timedelta(minutes=10)
+        BatchUpload.objects.filter(pk=batch.pk).update(job_heartbeat_at=stale)
+
+        with JobHeartbeat(batch, 'worker-1', interval=0.05):
+            time.sleep(0.3)
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=5)), 0)
+
+        BatchUpload.objects.filter(pk=batch.pk).update(job_heartbeat_at=stale)
+        time.sleep(0.1)
+        self.assertEqual(BatchUpload.objects.get(pk=batch.pk).job_heartbeat_at, stale)
+
+
+class SubmissionContentTests(SimpleTestCase):
+    """Each submission's source gets its own file, whatever its name"""
+
+    def test_names_that_sanitize_alike_do_not_collide(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            batch = BatchUpload(id=7)
+            paths = [store_submission_content(batch, name, name.encode()) for name in ('a b', 'a_b', 'a?b')]
+            self.assertEqual(len(set(paths)), 3)
+            for name, path in zip(('a b', 'a_b', 'a?b'), paths):
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), name.encode())
+
+
+class BatchArchiveReaderTests(SimpleTestCase):
+    """Projects are streamed out of the batch ZIP; nested archives are sections only when they hold no code"""
+
+    def batch_zip(self, files):
+        handle, zip_path = tempfile.mkstemp(suffix='.zip')
+        os.close(handle)
+        self.addCleanup(os.remove, zip_path)
+        with open(zip_path, 'wb') as f:
+            f.write(zip_bytes(files))
+        return zip_path
+
+    def read_batch(self, files):
+        reader = BatchArchiveReader(self.batch_zip(files), manifest_only=True)
+        return reader, sorted(project['name'] for project in reader)
+
+    def test_folders_stream_like_extracted_directories(self):
+        files = {
+            'Batch/alice/app.py': 'import os\r\nprint(os.sep)\r\n',
+            'Batch/alice/README.md': 'notes',
+            'Batch/bob/main.js': 'let x = 1;\n',
+        }
+        zip_path = self.batch_zip(files)
+        projects = {project['name']: project for project in iter_batch_projects(zip_path)}
+
+        self.assertEqual(sorted(projects), ['alice', 'bob'])
+        self.assertEqual(sorted(projects['alice']['files'], key=lambda item: item[0]),
+                         [('README.md', None), ('app.py', 'import os\nprint(os.sep)\n')])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with zipfile.ZipFile(zip_path) as zip_ref:
+                zip_ref.extractall(tmp_dir)
+            extracted = extract_code_features_enhanced(os.path.join(tmp_dir, 'Batch', 'alice'))
+        streamed = extract_code_features_from_files(projects['alice']['files'])
+        self.assertEqual(streamed['file_hashes'], extracted['file_hashes'])
+        self.assertEqual(streamed['code_lines'], extracted['code_lines'])
+
+    def test_student_archive_with_data_zip_is_a_project(self):
+        student = {'alice/backend/app.py': 'print("hi")\n', 'alice/data.zip': zip_bytes({'rows.csv': '1,2\n'})}
+        with zipfile.ZipFile(io.BytesIO(zip_bytes(student))) as zip_ref:
+            self.assertFalse(is_container_archive(zip_ref.infolist()))
+
+        reader, names = self.read_batch({'alice.zip': zip_bytes(student)})
+        self.assertEqual(names, ['alice'])
+        self.assertEqual(reader.sections, {})
+
+    def test_archive_of_archives_is_a_section(self):
+        section = zip_bytes({'alice.zip': zip_bytes({'app.py': 'x = 1\n'}), 'readme.txt': 'Section A'})
+        with zipfile.ZipFile(io.BytesIO(section)) as zip_ref:
+            self.assertTrue(is_container_archive(zip_ref.infolist()))
+        with zipfile.ZipFile(io.BytesIO(zip_bytes({'app.py': 'x = 1\n'}))) as zip_ref:
+            self.assertFalse(is_container_archive(zip_ref.infolist()))
+
+    def test_sections_are_read_recursively(self):
+        section = zip_bytes({
+            'alice.zip': zip_bytes({'alice/app.py': 'x = 1\n'}),
+            'late/bob.zip': zip_bytes({'main.js': 'let y = 2;\n'}),
+            'inner.zip': zip_bytes({'carol.zip': zip_bytes({'app.py': 'z = 3\n'})}),
+        })
+        reader, names = self.read_batch({'course/A.zip': section, 'dave/main.py': 'print(4)\n'})
+
+        self.assertEqual(names, ['alice', 'bob', 'carol', 'dave'])
+        self.assertEqual(sorted(reader.sections), ['course/A.zip', 'course/A.zip!inner.zip'])
+        self.assertEqual(reader.sections['course/A.zip']['projects'], 3)
+        self.assertEqual(reader.sections['course/A.zip!inner.zip']['level'], 2)
+
+    def test_sections_stop_at_max_depth(self):
+        section = zip_bytes({'alice.zip': zip_bytes({'app.py': 'x = 1\n'})})
+        reader = BatchArchiveReader(self.batch_zip({'A.zip': section}), max_depth=1, manifest_only=True)
+        self.assertEqual([project['name'] for project in reader], ['A'])
+        self.assertEqual(reader.sections, {})
+
+
+class FeatureSketchTests(SimpleTestCase):
+    """Sketches survive serialization; other layouts are rejected"""
+
+    def setUp(self):
+        self.sketch = FeatureSketch.from_features({
+            'total_files': 2, 'python_files': 1, 'code_lines': 40,
+            'code_tokens': ['def', 'parse', 'path', 'return', 'results', 'for', 'line', 'in', 'handle'] * 3,
+            'file_hashes': [hashlib.md5(b'a').hexdigest(), hashlib.md5(b'b').hexdigest()],
+            'function_names': ['parse'], 'imports': ['csv'], 'variable_names': ['results'], 'keywords': ['def'],
+        })
+
+    def test_round_trip(self):
+        restored = FeatureSketch.from_bytes(self.sketch.to_bytes())
+        self.assertEqual(restored.scalars, self.sketch.scalars)
+        self.assertEqual(restored.scalars['code_files'], 2)
+        self.assertEqual(len(restored.minhash), MINHASH_PERMUTATIONS)
+        for name, array in self.sketch.arrays.items():
+            np.testing.assert_array_equal(restored.arrays[name], array)
+
+    def test_unknown_version_and_magic_are_rejected(self):
+        data = bytearray(self.sketch.to_bytes())
+        data[3] += 1
+        with self.assertRaisesRegex(ValueError, 'version'):
+            FeatureSketch.from_bytes(bytes(data))
+        with self.assertRaisesRegex(ValueError, 'Not a feature sketch'):
+            FeatureSketch.from_bytes(b'XYZ' + bytes(data[3:]))
+
+
+class LshCandidateTests(SimpleTestCase):
+    """LSH candidates match a brute-force band comparison and keep near-copies"""
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.sets = []
+        for _ in range(10):
+            base = rng.randint(0, 1 << 32, size=300, dtype=np.uint64)
+            for _ in range(4):
+                variant = base.copy()
+                replaced = rng.choice(len(variant), size=15, replace=False)
+                variant[replaced] = rng.randint(0, 1 << 32, size=15, dtype=np.uint64)
+                self.sets.append(variant)
+        self.signatures = np.stack([minhash_signature(values) for values in self.sets])
+        first, second = lsh_candidate_pairs(self.signatures, 32, 4)
+        self.candidates = set(zip(first.tolist(), second.tolist()))
+
+    def test_matches_brute_force_bands(self):
+        n = len(self.signatures)
+        expected = {
+            (i, j) for i in range(n) for j in range(i + 1, n)
+            if any(np.array_equal(self.signatures[i, band * 4:(band + 1) * 4],
+                                  self.signatures[j, band * 4:(band + 1) * 4]) for band in range(32))
+        }
+        self.assertEqual(self.candidates, expected)
+
+    def test_recall_of_similar_pairs(self):
+        n = len(self.sets)
+        similar = set()
+        for i in range(n):
+            for j in range(i + 1, n):
+                first, second = set(self.sets[i].tolist()), set(self.sets[j].tolist())
+                if len(first & second) / len(first | second) >= 0.7:
+                    similar.add((i, j))
+
+        self.assertEqual(len(similar), 10 * 6)
+        self.assertLessEqual(similar, self.candidates)
+        self.assertLess(len(self.candidates), n * (n - 1) // 4)
+
+
+class BatchSimilarityTests(SimpleTestCase):
+    """Batch scoring returns the same similarity_features dicts as scoring each pair on its own"""
+
+    def setUp(self):
+        renamed = COPIED_FUNCTION.replace('results', 'grades')
+        projects = [
+            {'app.py': 'import csv\n' + COPIED_FUNCTION, 'util.py': 'def add(a, b):\n    return a + b\n'},
+            {'main.py': 'import csv\nimport os\n' + renamed, 'util.py': 'def add(a, b):\n    return a + b\n'},
+            {'index.js': 'const express = require("express");\nfunction area(w, h) {\n  return w * h;\n}\n'},
+        ]
+        self.sketches = [
+            FeatureSketch.from_features(extract_code_features_from_files(list(files.items()))) for files in projects
+        ]
+
+    def assert_same_features(self, batch, pairwise, skip=()):
+        self.assertEqual(set(batch), set(pairwise))
+        for key, value in pairwise.items():
+            if key not in skip:
+                self.assertAlmostEqual(batch[key], value, places=6, msg=key)
+
+    def test_each_pair_matches_pairwise_scoring(self):
+        for i, j in [(0, 1), (0, 2), (1, 2)]:
+            pairwise = calculate_similarity_features_enhanced(self.sketches[i], self.sketches[j])
+            batch = calculate_batch_similarity([self.sketches[i], self.sketches[j]])
+            self.assertEqual(list(batch), [(0, 1)])
+            self.assert_same_features(batch[(0, 1)], pairwise)
+
+    def test_larger_batches_only_change_tfidf_weights(self):
+        # TF-IDF is fitted once over the whole batch, so IDF (and with it the
+        # cosine and overall scores) reflects all projects, not just the pair
+        batch = calculate_batch_similarity(self.sketches)
+        candidates = calculate_batch_similarity(self.sketches, pairs=(np.array([0, 1]), np.array([1, 2])))
+        self.assertEqual(sorted(batch), [(0, 1), (0, 2), (1, 2)])
+        for (i, j), features in batch.items():
+            pairwise = calculate_similarity_features_enhanced(self.sketches[i], self.sketches[j])
+            self.assert_same_features(features, pairwise, skip=('tfidf_similarity', 'overall_similarity'))
+            if (i, j) in candidates:
+                self.assert_same_features(candidates[(i, j)], features)
+
+
+class FileHashIndexTests(SimpleTestCase):
+    """Posting-list counts must match set intersections of the file hashes"""
+
+    def setUp(self):
+        digests = [hashlib.md5(str(i).encode()).digest() for i in range(8)]
+        self.sets = [digests[:4], digests[:4], digests[2:6], digests[6:], []]
+        self.file_hashes = [np.array(sorted(hashes), dtype='S16') for hashes in self.sets]
+
+    def brute_force(self, rows, cols):
+        expected = []
+        for i, j in zip(rows, cols):
+            first, second = set(self.sets[i]), set(self.sets[j])
+            union = len(first | second)
+            expected.append(len(first & second) / union if union else 0.0)
+        return expected
+
+    def test_jaccard_matches_set_intersection(self):
+        rows, cols = np.triu_indices(len(self.sets), k=1)
+        for max_posting in (100, 2):
+            with override_settings(FILE_HASH_MAX_POSTING=max_posting):
+                index = FileHashIndex(self.file_hashes)
+                np.testing.assert_allclose(index.jaccard(rows, cols), self.brute_force(rows, cols))
+                self.assertEqual(index.exact_copy_pairs(), [(0, 1)])
+
+    def test_shared_file_groups(self):
+        paths = [{digest.hex(): [f'{name}/file{k}.py'] for k, digest in enumerate(hashes)}
+                 for name, hashes in zip('abcde', self.sets)]
+        groups = FileHashIndex(self.file_hashes).shared_file_groups(list('abcde'), paths)
+
+        self.assertEqual([(group['students'], group['file_count']) for group in groups],
+                         [(['a', 'b', 'c'], 2), (['a', 'b'], 2)])
+        self.assertEqual(
+            sorted(path for file in groups[0]['files'] for path in file['paths']),
+            ['a/file2.py', 'a/file3.py', 'b/file2.py', 'b/file3.py', 'c/file0.py', 'c/file1.py']
+        )
+
+
+COPIED_FUNCTION = """
+def parse_scores(path, minimum):
+    results = {}
+    with open(path) as handle:
+        for line in handle:
+            name, _, score = line.partition(',')
+            if not score.strip():
+                continue
+            value = float(score)
+            if value < minimum:
+                results.setdefault('failed', []).append(name)
+            elif value > 90:
+                results.setdefault('honours', []).append((name, value))
+            else:
+                results.setdefault('passed', []).append(name)
+    total = sum(len(names) for names in results.values())
+    return results, total
+"""
+
+
+class FingerprintIndexTests(SimpleTestCase):
+    """Winnowed k-grams find a renamed copy of one function inside larger projects"""
+
+    def project(self, files):
+        return ProjectFingerprints.from_files(
+            [(path, fingerprint_source(content, os.path.splitext(path)[1])) for path, content in files.items()]
+        )
+
+    def setUp(self):
+        renamed = COPIED_FUNCTION.replace('results', 'grades').replace('value', 'mark').replace('minimum', 'pass_mark')
+        self.projects = [
+            self.project({'app.py': 'import csv\n\nclass Report:\n    pass\n' + COPIED_FUNCTION}),
+            self.project({
+                'main.js': 'const express = require("express");\nconst app = express();\n'
+                           'app.get("/", (req, res) => { res.send({ ok: true, items: [1, 2, 3] }); });\n'
+                           'app.listen(3000, () => console.log("listening on port 3000"));\n',
+                'grades.py': '# helpers\n' + '\n' * 10 + renamed,
+            }),
+            self.project({'other.js': 'function area(width, height) {\n  if (width <= 0) { throw new Error("bad"); }\n'
+                                      '  return { area: width * height, perimeter: 2 * (width + height) };\n}\n'}),
+        ]
+
+    def test_normalization_ignores_names_literals_and_comments(self):
+        tokens, start_lines, _ = normalize_tokens('total = price * 2  # tax\nname = "x"\n', '.py')
+        self.assertEqual(tokens, ['V', '=', 'V', '*', 'N', 'V', '=', 'S'])
+        self.assertEqual(start_lines, [1, 1, 1, 1, 1, 2, 2, 2])
+
+    def test_round_trip(self):
+        restored = ProjectFingerprints.from_bytes(self.projects[1].to_bytes())
+        self.assertEqual(restored.paths, ['main.js', 'grades.py'])
+        for name in ('hashes', 'files', 'start_lines', 'end_lines'):
+            np.testing.assert_array_equal(restored.arrays[name], self.projects[1].arrays[name])
+
+    def test_copied_function_is_a_candidate_with_regions(self):
+        index = FingerprintIndex(self.projects)
+        self.assertEqual(index.candidate_pairs(), [(0, 1)])
+
+        regions = index.matched_regions(0, 1)
+        self.assertEqual((regions[0]['file_1'], regions[0]['file_2']), ('app.py', 'grades.py'))
+        # The function spans lines 6-22 of app.py and 13-29 of grades.py
+        self.assertGreaterEqual(regions[0]['lines_1'][0], 6)
+        self.assertLessEqual(regions[0]['lines_1'][1], 22)
+        self.assertEqual(regions[0]['lines_2'][0] - regions[0]['lines_1'][0], 7)
+
+        scored = index.annotate({(0, 1): {}, (0, 2): {}})
+        self.assertEqual(scored[(0, 2)], {'fingerprint_similarity': 0.0, 'matched_regions': []})
+        self.assertGreater(scored[(0, 1)]['fingerprint_similarity'], 0.5)
+
+
+class SnippetSearchTests(TestCase):
+    """A pasted snippet finds every stored submission of the user's batches containing it"""
+
+    def setUp(self):
+        self.faculty = get_user_model().objects.create_user(username='faculty', password='x', role='faculty')
+        colleague = get_user_model().objects.create_user(
+            username='colleague', email='colleague@example.com', password='x', role='faculty'
+        )
+        submissions = []
+        for faculty, topic, student, files in [
+            (self.faculty, 'Python 1', 'alice', {'scores.py': COPIED_FUNCTION}),
+            (self.faculty, 'Python 2', 'bob', {'main.py': 'import sys\n\n\n' + COPIED_FUNCTION.replace('results', 'out')}),
+            (self.faculty, 'Python 2', 'carol', {'main.py': 'print("hello world")\n' * 20}),
+            (colleague, 'Python 1', 'dave', {'scores.py': COPIED_FUNCTION}),
+        ]:
+            batch = BatchUpload.objects.create(faculty=faculty, batch_name=topic, topic=topic, file_path='x.zip')
+            fingerprints = ProjectFingerprints.from_files(
+                [(path, fingerprint_source(content, '.py')) for path, content in files.items()]
+            )
+            submissions.append(ProjectSubmission.objects.create(
+                batch=batch, student_id=student, project_name=student, file_path='x.zip',
+                fingerprints=fingerprints.to_bytes()
+            ))
+        index_submission_fingerprints(submissions)
+
+    def test_finds_submissions_with_line_ranges(self):
+        snippet = '\n'.join(COPIED_FUNCTION.split('\n')[4:14])
+        found = search_snippet(snippet, self.faculty, file_ext='.py')
+
+        self.assertEqual([match['student_id'] for match in found['matches']], ['alice', 'bob'])
+        alice, bob = found['matches']
+        self.assertEqual(alice['coverage'], 1.0)
+        self.assertEqual(alice['regions'][0]['file'], 'scores.py')
+        self.assertGreaterEqual(alice['regions'][0]['lines'][0], 5)
+        self.assertLessEqual(alice['regions'][0]['lines'][1], 14)
+        self.assertEqual(bob['regions'][0]['lines'][0] - alice['regions'][0]['lines'][0], 3)
+
+        only_second = search_snippet(snippet, self.faculty, file_ext='.py', topic='Python 2')
+        self.assertEqual([match['student_id'] for match in only_second['matches']], ['bob'])
+
+    def test_other_faculty_submissions_are_not_returned(self):
+        snippet = '\n'.join(COPIED_FUNCTION.split('\n')[4:14])
+        colleague = get_user_model().objects.get(username='colleague')
+        found = search_snippet(snippet, colleague, file_ext='.py')
+        self.assertEqual([match['student_id'] for match in found['matches']], ['dave'])
+
+    def test_short_snippet_is_rejected(self):
+        with self.assertRaises(SnippetSearchError):
+            search_snippet('x = 1', self.faculty)
+
+    def test_postings_follow_their_submission(self):
+        self.assertTrue(FingerprintPosting.objects.exists())
+        ProjectSubmission.objects.all().delete()
+        self.assertFalse(FingerprintPosting.objects.exists())
+
+
+class TopicCorpusTests(TestCase):
+    """A new batch is compared with earlier batches of its topic through the stored indexes"""
+
+    def setUp(self):
+        self.faculty = get_user_model().objects.create_user(username='faculty', password='x', role='faculty')
+        unrelated = 'function area(width, height) {\n  if (width <= 0) { throw new Error("bad"); }\n' \
+                    '  return { area: width * height, perimeter: 2 * (width + height) };\n}\n'
+        self.store('Fall', 'Python', {'alice': {'scores.py': COPIED_FUNCTION}, 'dave': {'area.js': unrelated}},
+                   index=True)
+        self.store('Java', 'Java', {'erin': {'scores.py': COPIED_FUNCTION}}, index=True)
+        # Same topic name, different faculty member: never part of this corpus
+        self.colleague = get_user_model().objects.create_user(
+            username='colleague', email='colleague@example.com', password='x', role='faculty'
+        )
+        self.store('Fall', 'Python', {'gina': {'scores.py': COPIED_FUNCTION}}, index=True, faculty=self.colleague)
+        self.batch, self.submissions, self.data = self.store('Spring', 'Python', {
+            'bob': {'main.py': 'import sys\n\n' + COPIED_FUNCTION.replace('results', 'out')},
+            'frank': {'hello.py': 'print("hello world")\n'},
+        })
+
+    def store(self, name, topic, projects, index=False, faculty=None):
+        batch = BatchUpload.objects.create(
+            faculty=faculty or self.faculty, batch_name=name, topic=topic, file_path='x.zip'
+        )
+        submissions, data = [], []
+        for student, files in projects.items():
+            submission_data = build_submission_data(extract_code_features_from_files(files.items()))
+            data.append(submission_data)
+            submissions.append(ProjectSubmission.objects.create(
+                batch=batch, student_id=student, project_name=student, file_path='x.zip',
+                sketch=submission_data['sketch'], fingerprints=submission_data['fingerprints']
+            ))
+        if index:
+            index_submission_fingerprints(submissions)
+            index_submission_buckets(submissions)
+        return batch, submissions, data
+
+    def features(self):
+        return [FeatureSketch.from_bytes(data['sketch']) for data in self.data], [data['fingerprints'] for data in self.data]
+
+    def test_candidates_come_from_the_same_topic_only(self):
+        alice = ProjectSubmission.objects.get(student_id='alice')
+        pairs = TopicCorpus(self.faculty, 'Python', exclude_batch=self.batch).candidate_pairs(
+            [FeatureSketch.from_bytes(data['sketch']) for data in self.data],
+            [data['fingerprints'] for data in self.data]
+        )
+        self.assertEqual(pairs, [(0, alice.id)])
+        self.assertEqual(MinHashBucket.objects.filter(submission=alice).count(), 32)
+
+    def test_matches_are_scored_and_stored(self):
+        report = compare_with_history(
+            self.batch, self.submissions,
+            [FeatureSketch.from_bytes(data['sketch']) for data in self.data],
+            [data['fingerprints'] for data in self.data]
+        )
+        self.assertEqual([(match['student_id'], match['matched_student_id']) for match in report], [('bob', 'alice')])
+        self.assertEqual(report[0]['matched_batch_name'], 'Fall')
+        self.assertGreater(report[0]['fingerprint_similarity'], 0.5)
+        self.assertEqual(report[0]['matched_regions'][0]['file_2'], 'scores.py')
+        self.assertEqual(self.batch.historical_matches.count(), 1)
+
+    def test_other_faculty_batches_are_not_compared(self):
+        self.batch.faculty = self.colleague
+        self.batch.save()
+        report = compare_with_history(self.batch, self.submissions, *self.features())
+        self.assertEqual([(match['student_id'], match['matched_student_id']) for match in report], [('bob', 'gina')])
+
+    def test_untitled_batches_have_no_history(self):
+        for topic in (BatchUpload.DEFAULT_TOPIC, ''):
+            self.store('Old', topic, {'hank': {'scores.py': COPIED_FUNCTION}}, index=True)
+            self.batch.topic = topic
+            self.assertEqual(compare_with_history(self.batch, self.submissions, *self.features()), [])
+
+
+class StarterProfileTests(SimpleTestCase):
+    """Starter code shared by every submission does not make them similar"""
+
+    HELPERS = 'import os\n\ndef data_path(name):\n    return os.path.join(os.path.dirname(__file__), "data", name)\n'
+
+    def setUp(self):
+        skeleton = 'import csv\n' + COPIED_FUNCTION
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            zip_path = os.path.join(tmp_dir, 'starter.zip')
+            with zipfile.ZipFile(zip_path, 'w') as archive:
+                archive.writestr('starter/app.py', skeleton)
+                archive.writestr('starter/helpers.py', self.HELPERS)
+                archive.writestr('starter/README.md', 'Fill in main()')
+            self.starter = StarterProfile.from_archive(zip_path)
+
+        self.projects = [
+            {'helpers.py': self.HELPERS, 'app.py': skeleton + '\ndef main():\n    print(sorted(parse_scores("a.csv", 50)))\n'},
+            {'helpers.py': self.HELPERS, 'app.py': skeleton + '\nclass Grades:\n    def mean(self, values):\n'
+                                                              '        return sum(values) / max(len(values), 1)\n'},
+        ]
+
+    def extract(self, starter):
+        data = [extract_features_safely(list(files.items()), starter)[0] for files in self.projects]
+        sketches = [FeatureSketch.from_bytes(item['sketch']) for item in data]
+        return data, sketches
+
+    def test_profile_round_trip(self):
+        restored = StarterProfile.from_bytes(self.starter.to_bytes())
+        self.assertEqual(restored.file_hashes, self.starter.file_hashes)
+        self.assertEqual(restored.crc_keys, self.starter.crc_keys)
+        self.assertEqual(len(restored.crc_keys), 2)
+        self.assertEqual(restored.function_names, {'parse_scores', 'data_path'})
+        self.assertEqual(restored.imports, {'csv', 'os'})
+        np.testing.assert_array_equal(restored.kgrams, self.starter.kgrams)
+        np.testing.assert_array_equal(restored.shingles, self.starter.shingles)
+        self.assertGreater(len(restored.shingles), 0)
+
+    def test_version_1_profile_is_still_read(self):
+        names = json.dumps({
+            'file_hashes': sorted(self.starter.file_hashes), 'crc_keys': sorted(self.starter.crc_keys),
+            'function_names': sorted(self.starter.function_names), 'imports': sorted(self.starter.imports)
+        }).encode('utf-8')
+        body = struct.pack('<I', len(names)) + names + self.starter.kgrams.astype('<u8').tobytes()
+        restored = StarterProfile.from_bytes(b'ZST\x01' + zlib.compress(body))
+        np.testing.assert_array_equal(restored.kgrams, self.starter.kgrams)
+        self.assertEqual(len(restored.shingles), 0)
+
+    def test_starter_code_is_subtracted(self):
+        data, sketches = self.extract(None)
+        self.assertEqual(FingerprintIndex([item['fingerprints'] for item in data]).candidate_pairs(), [(0, 1)])
+        self.assertGreater(calculate_batch_similarity(sketches)[(0, 1)]['hash_similarity'], 0)
+
+        data, sketches = self.extract(self.starter)
+        self.assertEqual(FingerprintIndex([item['fingerprints'] for item in data]).candidate_pairs(), [])
+        self.assertEqual([len(sketch.file_hashes) for sketch in sketches], [1, 1])
+        metrics = calculate_batch_similarity(sketches)[(0, 1)]
+        self.assertEqual(metrics['hash_similarity'], 0)
+        self.assertEqual(metrics['function_similarity'], 0)
+        self.assertEqual(metrics['import_similarity'], 0)
+        # Unchanged starter runs in the edited app.py feed neither TF-IDF nor MinHash
+        self.assertLess(metrics['tfidf_similarity'], 0.2)
+        self.assertLess(np.mean(sketches[0].minhash == sketches[1].minhash), 0.1)
+
+    def test_starter_files_are_not_duplicates(self):
+        projects = [
+            {'name': name, 'source': f'{name}.zip', 'manifest': [
+                {'path': 'helpers.py', 'size': len(self.HELPERS), 'crc': zlib.crc32(self.HELPERS.encode())},
+                {'path': 'app.py', 'size': 10 + k, 'crc': k},
+            ]}
+            for k, name in enumerate(['alice', 'bob'])
+        ]
+        self.assertEqual(len(CrcDuplicateIndex(projects).groups), 1)
+        self.assertEqual(CrcDuplicateIndex(projects, self.starter.crc_keys).groups, [])
+
+
+class StarterCodeStorageTests(TestCase):
+    """The latest upload of a topic's starter code is the one applied to its batches"""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(UPLOAD_STORAGE_DIR=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.faculty = get_user_model().objects.create_user(username='faculty', password='x', role='faculty')
+
+    def upload(self, content):
+        archive = SimpleUploadedFile('starter.zip', zip_bytes({'starter/app.py': content}))
+        return store_starter_code(self.faculty, archive, topic='Python')
+
+    def test_reuploaded_starter_becomes_active_again(self):
+        batch = BatchUpload.objects.create(faculty=self.faculty, batch_name='Fall', topic='Python')
+        first = self.upload(COPIED_FUNCTION)
+        second = self.upload('def main():\n    return 1\n')
+        self.assertEqual(starter_code_for(batch), second)
+
+        self.assertEqual(self.upload(COPIED_FUNCTION), first)
+        self.assertEqual(starter_code_for(batch), first)
+
+
+class BatchDeduplicationTests(TestCase):
+    """Re-uploading an archive returns the earlier batch only when it would be checked the same way"""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(UPLOAD_STORAGE_DIR=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.faculty = get_user_model().objects.create_user(username='faculty', password='x', role='faculty')
+
+    def upload(self, topic='Python'):
+        return start_batch_check(self.faculty, 'Fall', topic, '/tmp/batch.zip', 'a' * 64).data
+
+    def test_same_archive_is_not_checked_twice(self):
+        first = self.upload()
+        second = self.upload()
+        self.assertTrue(second['duplicate'])
+        self.assertEqual(second['batch_id'], first['batch_id'])
+
+    def test_new_topic_starter_code_starts_a_new_check(self):
+        first = self.upload()
+        starter = store_starter_code(
+            self.faculty, SimpleUploadedFile('starter.zip', zip_bytes({'app.py': COPIED_FUNCTION})), topic='Python'
+        )
+
+        second = self.upload()
+        self.assertNotIn('duplicate', second)
+        self.assertNotEqual(second['batch_id'], first['batch_id'])
+        self.assertEqual(BatchUpload.objects.get(pk=second['batch_id']).starter_code, starter)
+        self.assertTrue(self.upload()['duplicate'])
+
+    def test_same_archive_under_another_topic_gets_its_own_batch(self):
+        first = self.upload()
+        second = self.upload(topic='Java')
+        self.assertNotIn('duplicate', second)
+        self.assertEqual(BatchUpload.objects.get(pk=second['batch_id']).topic, 'Java')
+        self.assertNotEqual(second['batch_id'], first['batch_id'])
+
+
+class FinalizeUploadSessionTests(TestCase):
+    """Finalizing validates the request before any chunk is assembled"""
+
+    def test_unknown_starter_code_is_rejected(self):
+        faculty = get_user_model().objects.create_user(username='faculty', password='x', role='faculty')
+        session = UploadSession.objects.create(
+            faculty=faculty, batch_name='Fall', topic='Python', file_name='big.zip', total_size=10, chunk_size=4
+        )
+        request = APIRequestFactory().post('/finalize/', {'starter_code_id': 999}, format='json')
+        force_authenticate(request, user=faculty)
+
+        response = finalize_upload_session(request, session_id=session.id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Starter code not found')
+        session.refresh_from_db()
+        self.assertEqual((session.status, session.batch_id), (UploadSession.STATUS_OPEN, None))
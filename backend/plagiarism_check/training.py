@@ -0,0 +1,218 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import joblib
+import numpy as np
+from django.utils import timezone
+from sklearn.ensemble import RandomForestClassifier
+
+from .forest import compile_forest
+from .ml_models import MODEL_FEATURES, export_compiled_model
+from .model_registry import default_model_path
+from .models import PlagiarismResult
+
+
+# Every fifth labeled pair (by id) is held out for evaluation
+HOLDOUT_MODULUS = 5
+MAX_HOLDOUT_ROWS = 100000
+
+DEFAULT_TRAINING_CHUNK_SIZE = 50000
+DEFAULT_TREES_PER_CHUNK = 20
+
+FOREST_PARAMS = {
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+}
+
+
+def labeled_results(since=None, until=None):
+    """Results that faculty confirmed (label 1) or dismissed (label 0), optionally labeled in (since, until]"""
+    results = PlagiarismResult.objects.filter(faculty_label__isnull=False)
+    if since is not None:
+        results = results.filter(labeled_at__gt=since)
+    if until is not None:
+        results = results.filter(labeled_at__lte=until)
+    return results.order_by('id')
+
+
+def iter_labeled_pairs(chunk_size=DEFAULT_TRAINING_CHUNK_SIZE, since=None, until=None):
+    """Stream labeled pairs as ``(ids, X, y)`` chunks.
+
+    ``X`` is a float32 (rows x MODEL_FEATURES) array taken from
+    ``comparison_details`` and ``y`` is 1 for confirmed, 0 for dismissed
+    pairs. Rows are read with a server-side iterator, so memory is bounded
+    by ``chunk_size`` whatever the table size.
+    """
+    rows = labeled_results(since, until).values_list('id', 'comparison_details', 'faculty_label')
+
+    ids, features, labels = [], [], []
+    for result_id, details, label in rows.iterator(chunk_size=min(chunk_size, 2000)):
+        details = details or {}
+        ids.append(result_id)
+        features.append([float(details.get(name, 0)) for name in MODEL_FEATURES])
+        labels.append(1 if label == PlagiarismResult.LABEL_CONFIRMED else 0)
+
+        if len(ids) >= chunk_size:
+            yield np.array(ids), np.array(features, dtype=np.float32), np.array(labels, dtype=np.int8)
+            ids, features, labels = [], [], []
+
+    if ids:
+        yield np.array(ids), np.array(features, dtype=np.float32), np.array(labels, dtype=np.int8)
+
+
+def export_training_data(output_file, chunk_size=DEFAULT_TRAINING_CHUNK_SIZE):
+    """Write labeled pairs as CSV (id, features..., is_plagiarized); returns the row count"""
+    output_file.write(','.join(['id', *MODEL_FEATURES, 'is_plagiarized']) + '\n')
+    total = 0
+    for ids, X, y in iter_labeled_pairs(chunk_size):
+        for result_id, features, label in zip(ids, X, y):
+            output_file.write(f"{result_id}," + ','.join(f"{value:.6g}" for value in features) + f",{label}\n")
+        total += len(ids)
+    return total
+
+
+def _load_artifact(model_path):
+    """Existing (model, metadata) for incremental training, or (None, {})"""
+    if not os.path.exists(model_path):
+        return None, {}
+    artifact = joblib.load(model_path)
+    if isinstance(artifact, dict) and 'model' in artifact:
+        return artifact['model'], artifact.get('metadata', {})
+    return artifact, {}
+
+
+def _evaluate(model, X, y):
+    """Accuracy, precision, recall and F1 of the forest on the holdout set"""
+    if len(y) == 0:
+        return {'holdout_samples': 0}
+
+    predicted = compile_forest(model).predict(X)
+    true_positive = int(((predicted == 1) & (y == 1)).sum())
+    false_positive = int(((predicted == 1) & (y == 0)).sum())
+    false_negative = int(((predicted == 0) & (y == 1)).sum())
+
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 0.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        'holdout_samples': int(len(y)),
+        'accuracy': round(float((predicted == y).mean()), 4),
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1': round(f1, 4)
+    }
+
+
+def save_versioned_model(model, metadata, model_path):
+    """Write ``{'model', 'metadata'}`` atomically, plus a JSON sidecar and the NumPy export"""
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    tmp_path = f"{model_path}.tmp"
+    joblib.dump({'model': model, 'metadata': metadata}, tmp_path)
+    os.replace(tmp_path, model_path)
+
+    metadata_path = os.path.splitext(model_path)[0] + '.json'
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(model_path) or '.', delete=False, suffix='.tmp') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(f.name, metadata_path)
+
+    export_compiled_model(model, model_path, metadata)
+    print(f"Model version {metadata['version']} saved to {model_path}")
+
+
+def train_from_labels(model_path=None, incremental=True, chunk_size=DEFAULT_TRAINING_CHUNK_SIZE,
+                      trees_per_chunk=DEFAULT_TREES_PER_CHUNK):
+    """Train the plagiarism model on faculty-labeled pairs, one chunk at a time.
+
+    Each chunk of ``chunk_size`` labeled pairs adds ``trees_per_chunk`` trees
+    to the forest (``warm_start``), so hundreds of thousands of pairs never
+    sit in memory at once. With ``incremental=True`` new trees are appended
+    to the current versioned model, trained on labels added since that
+    version. Pairs with ``id % HOLDOUT_MODULUS == 0``
+    are held out for the evaluation metrics stored in the artifact metadata.
+    Returns the metadata, or None when there are no labeled pairs.
+    """
+    model_path = model_path or default_model_path()
+    model, previous = _load_artifact(model_path) if incremental else (None, {})
+
+    if model is not None and (
+        not isinstance(model, RandomForestClassifier)
+        or previous.get('features') != list(MODEL_FEATURES)
+    ):
+        print("⚠️ Existing model has no matching feature schema; training a new one")
+        model, previous = None, {}
+
+    # Incremental runs only learn from labels given after the previous version
+    since = datetime.fromisoformat(previous['labels_until']) if previous.get('labels_until') else None
+    until = timezone.now()
+
+    holdout_X, holdout_y = [], []
+    holdout_rows = 0
+    pending_X, pending_y = [], []
+    trained_samples = 0
+    label_counts = {0: 0, 1: 0}
+
+    def fit_pending():
+        nonlocal model, trained_samples
+        X = np.concatenate(pending_X)
+        y = np.concatenate(pending_y)
+        if model is None:
+            model = RandomForestClassifier(
+                n_estimators=trees_per_chunk, warm_start=True, random_state=42, **FOREST_PARAMS
+            )
+        else:
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + trees_per_chunk)
+        model.fit(X, y)
+        trained_samples += len(y)
+        print(f"  🌲 Trained {trees_per_chunk} trees on {len(y)} pairs ({model.n_estimators} trees total)")
+        pending_X.clear()
+        pending_y.clear()
+
+    for ids, X, y in iter_labeled_pairs(chunk_size, since, until):
+        for label in (0, 1):
+            label_counts[label] += int((y == label).sum())
+
+        holdout = ids % HOLDOUT_MODULUS == 0
+        if holdout_rows < MAX_HOLDOUT_ROWS:
+            holdout_X.append(X[holdout][:MAX_HOLDOUT_ROWS - holdout_rows])
+            holdout_y.append(y[holdout][:MAX_HOLDOUT_ROWS - holdout_rows])
+            holdout_rows += len(holdout_y[-1])
+
+        pending_X.append(X[~holdout])
+        pending_y.append(y[~holdout])
+        # A chunk needs both classes so new trees share the forest's classes
+        pending = np.concatenate(pending_y)
+        if len(pending) >= chunk_size and len(np.unique(pending)) == 2:
+            fit_pending()
+
+    if pending_y and len(np.unique(np.concatenate(pending_y))) == 2:
+        fit_pending()
+    elif pending_y and len(np.concatenate(pending_y)):
+        print("⚠️ Last training chunk only has one label; skipped")
+
+    if trained_samples == 0:
+        print("No new labeled pairs with both confirmed and dismissed labels; nothing to train")
+        return None
+
+    X_test = np.concatenate(holdout_X) if holdout_X else np.empty((0, len(MODEL_FEATURES)), dtype=np.float32)
+    y_test = np.concatenate(holdout_y) if holdout_y else np.empty(0, dtype=np.int8)
+
+    metadata = {
+        'version': int(previous.get('version', 0)) + 1,
+        'previous_version': previous.get('version'),
+        'trained_at': timezone.now().isoformat(),
+        'labels_until': until.isoformat(),
+        'source': 'faculty_labels',
+        'incremental': bool(previous),
+        'features': list(MODEL_FEATURES),
+        'feature_dtype': 'float32',
+        'n_estimators': int(model.n_estimators),
+        'training_samples': int(previous.get('training_samples', 0)) + trained_samples,
+        'label_counts': {'dismissed': label_counts[0], 'confirmed': label_counts[1]},
+        'metrics': _evaluate(model, X_test, y_test)
+    }
+    print(f"Model metrics: {metadata['metrics']}")
+    save_versioned_model(model, metadata, model_path)
+    return metadata
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils import timezone
+
+from .models import UploadSession
+
+
+DEFAULT_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+DEFAULT_UPLOAD_SESSION_MAX_SIZE = 20 * 1024 * 1024 * 1024  # 20GB
+DEFAULT_UPLOAD_SESSION_MAX_AGE = 24 * 3600  # seconds since the last chunk
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_STREAM_READ_SIZE = 64 * 1024
+
+
+class UploadSessionError(Exception):
+    """A rejected chunk or an incomplete session; the message is shown to the client"""
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """Streams each uploaded file to a temporary file in FILE_UPLOAD_TEMP_DIR,
+    computing its SHA-256 on the way (``uploaded_file.sha256``).
+
+    Nothing is held in memory beyond the current chunk, whatever the size
+    of the upload.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.sha256 = self.digest.hexdigest()
+        return uploaded_file
+
+
+def upload_storage_dir():
+    return str(getattr(settings, 'UPLOAD_STORAGE_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads')))
+
+
+def content_path(sha256, category, extension='.zip'):
+    """Where content with this SHA-256 is stored: ``<category>/<sha[:2]>/<sha><ext>``"""
+    return os.path.join(upload_storage_dir(), category, sha256[:2], sha256 + extension)
+
+
+def _replace_atomically(source, target):
+    """Move ``source`` to ``target`` in one rename; copies first if they are on different filesystems"""
+    try:
+        os.replace(source, target)
+    except OSError:
+        _copy_atomically(source, target)
+        os.remove(source)
+
+
+def _copy_atomically(source, target):
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(target), suffix='.part', delete=False) as staged:
+        with open(source, 'rb') as f:
+            shutil.copyfileobj(f, staged, _HASH_CHUNK_SIZE)
+    os.replace(staged.name, target)
+
+
+def _link_atomically(source, target):
+    """Hard-link ``source`` at ``target``, leaving ``source`` in place; copies if they are on different filesystems"""
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass  # a concurrent upload stored the same content first
+    except OSError:
+        _copy_atomically(source, target)
+
+
+def _store_file(source, sha256, category, extension):
+    """Move the file at ``source`` to its content-addressed path (or drop it if already stored)"""
+    path = content_path(sha256, category, extension)
+    if os.path.exists(path):
+        os.remove(source)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _replace_atomically(source, path)
+    return path
+
+
+def _upload_extension(file_name):
+    return os.path.splitext(file_name or '')[1].lower() or '.bin'
+
+
+def store_upload(uploaded_file, category='batches'):
+    """Move an uploaded file into content-addressed storage; returns (path, sha256).
+
+    Files streamed to disk by ``HashingFileUploadHandler`` are hard-linked
+    into place, so Django still owns (and deletes) its temporary file; others (in-memory uploads) are hashed while being written to a
+    staging file next to the target. A file whose content is already
+    stored is not written again, and concurrent uploads of the same
+    content replace the target with identical bytes.
+    """
+    extension = _upload_extension(uploaded_file.name)
+    sha256 = getattr(uploaded_file, 'sha256', None)
+    temporary_path = getattr(uploaded_file, 'temporary_file_path', None)
+
+    if sha256 and temporary_path:
+        path = content_path(sha256, category, extension)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _link_atomically(temporary_path(), path)
+        return path, sha256
+
+    staging_dir = os.path.join(upload_storage_dir(), category)
+    os.makedirs(staging_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=staging_dir, suffix='.part', delete=False) as staged:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+            staged.write(chunk)
+
+    sha256 = digest.hexdigest()
+    return _store_file(staged.name, sha256, category, extension), sha256
+
+
+# Resumable uploads: an UploadSession receives numbered chunks, each saved as
+# its own file, then assemble_chunks() concatenates them into storage.
+
+def session_dir(session):
+    return os.path.join(upload_storage_dir(), 'sessions', str(session.id))
+
+
+def chunk_path(session, index):
+    return os.path.join(session_dir(session), f'{index:06d}.part')
+
+
+def received_chunks(session):
+    """Sorted indexes of the chunks stored for ``session``"""
+    try:
+        names = os.listdir(session_dir(session))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-len('.part')]) for name in names if name.endswith('.part'))
+
+
+def write_chunk(session, index, stream, sha256):
+    """Save chunk ``index`` of ``session`` from a file-like ``stream``.
+
+    The body is read in small pieces straight to a temporary file, and kept
+    only if its length matches the chunk and its SHA-256 matches ``sha256``.
+    Re-sending a chunk replaces it, so interrupted chunks can be retried.
+    """
+    if not 0 <= index < session.total_chunks:
+        raise UploadSessionError(f"Chunk index must be between 0 and {session.total_chunks - 1}")
+    if not sha256:
+        raise UploadSessionError("X-Chunk-SHA256 header is required")
+
+    expected_size = session.chunk_length(index)
+    directory = session_dir(session)
+    os.makedirs(directory, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as staged:
+        while stream is not None and size <= expected_size:
+            data = stream.read(_STREAM_READ_SIZE)
+            if not data:
+                break
+            digest.update(data)
+            staged.write(data)
+            size += len(data)
+
+    if size != expected_size:
+        os.remove(staged.name)
+        raise UploadSessionError(f"Chunk {index} must be {expected_size} bytes, received {size}")
+    if digest.hexdigest() != sha256.lower():
+        os.remove(staged.name)
+        raise UploadSessionError(f"Checksum mismatch for chunk {index}")
+
+    os.replace(staged.name, chunk_path(session, index))
+    return size
+
+
+def assemble_chunks(session, category='batches'):
+    """Concatenate the chunks of a complete session into storage; returns (path, sha256).
+
+    Chunks are copied piece by piece, never loaded whole, while the archive
+    hash is computed. The chunk files are removed afterwards.
+    """
+    missing = sorted(set(range(session.total_chunks)) - set(received_chunks(session)))
+    if missing:
+        raise UploadSessionError(f"{len(missing)} chunk(s) missing, first missing chunk is {missing[0]}")
+
+    staging_dir = os.path.join(upload_storage_dir(), category)
+    os.makedirs(staging_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=staging_dir, suffix='.part', delete=False) as staged:
+        for index in range(session.total_chunks):
+            with open(chunk_path(session, index), 'rb') as chunk:
+                for data in iter(lambda: chunk.read(_HASH_CHUNK_SIZE), b''):
+                    digest.update(data)
+                    staged.write(data)
+
+    sha256 = digest.hexdigest()
+    if session.sha256 and sha256 != session.sha256.lower():
+        os.remove(staged.name)
+        raise UploadSessionError("Checksum mismatch for the assembled archive")
+
+    path = _store_file(staged.name, sha256, category, _upload_extension(session.file_name))
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+    return path, sha256
+
+
+def expire_upload_sessions():
+    """Delete unfinished sessions idle for UPLOAD_SESSION_MAX_AGE seconds, with their chunks"""
+    max_age = getattr(settings, 'UPLOAD_SESSION_MAX_AGE', DEFAULT_UPLOAD_SESSION_MAX_AGE)
+    stale = UploadSession.objects.exclude(status=UploadSession.STATUS_COMPLETE).filter(
+        updated_at__lt=timezone.now() - timedelta(seconds=max_age)
+    )
+    expired = 0
+    for session in stale:
+        shutil.rmtree(session_dir(session), ignore_errors=True)
+        session.delete()
+        expired += 1
+    return expired
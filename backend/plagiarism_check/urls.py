@@ -3,7 +3,15 @@ from . import views
 
 urlpatterns = [
     path('batch-check/', views.batch_plagiarism_check, name='batch-plagiarism-check'),
+    path('upload-sessions/', views.create_upload_session, name='create-upload-session'),
+    path('upload-sessions/<uuid:session_id>/', views.get_upload_session, name='get-upload-session'),
+    path('upload-sessions/<uuid:session_id>/chunks/<int:index>/', views.upload_session_chunk, name='upload-session-chunk'),
+    path('upload-sessions/<uuid:session_id>/finalize/', views.finalize_upload_session, name='finalize-upload-session'),
     path('batch/<int:batch_id>/', views.get_batch_results, name='get-batch-results'),
+    path('batch/<int:batch_id>/status/', views.get_batch_status, name='get-batch-status'),
+    path('results/<int:result_id>/label/', views.label_plagiarism_result, name='label-plagiarism-result'),
+    path('snippet-search/', views.snippet_search, name='snippet-search'),
+    path('starter-code/', views.starter_code, name='starter-code'),
     path('batches/', views.get_faculty_batches, name='get-faculty-batches'),
     path('batches/recent/', views.get_recent_batches, name='get-recent-batches'),
 ]
@@ -7,8 +7,27 @@ import ast
 import difflib
 import numpy as np
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from .fingerprint import fingerprint_source
+
+
+# Weights for the overall similarity score (shared with batch_similarity)
+SIMILARITY_WEIGHTS = {
+    'hash': 0.50,        # HIGHEST weight for exact file matches
+    'tfidf': 0.20,       # Content similarity
+    'function': 0.15,    # Function names
+    'import': 0.10,      # Imports
+    'variable': 0.03,    # Variables
+    'length': 0.02       # Structure
+}
+
+# Share of identical files above which a pair is forced to 100% similarity
+EXACT_MATCH_THRESHOLD = 0.8
+
+CODE_EXTENSIONS = {'.py', '.js', '.jsx', '.html', '.css', '.php', '.java', '.cpp', '.c', '.ts', '.tsx'}
+
+# Common non-project directories skipped during feature extraction
+SKIP_DIRS = {'.git', '__pycache__', 'node_modules', '.vscode', '.idea'}
 
 
 def extract_batch_zip_file(zip_path, extract_to):
@@ -75,12 +94,10 @@ def extract_batch_zip_file(zip_path, extract_to):
 
 def has_project_files(directory):
     """Check if directory contains project files"""
-    code_extensions = {'.py', '.js', '.jsx', '.html', '.css', '.php', '.java', '.cpp', '.c', '.ts', '.tsx'}
-    
     try:
         for root, dirs, files in os.walk(directory):
             for file in files:
-                if any(file.lower().endswith(ext) for ext in code_extensions):
+                if is_code_file(file):
                     return True
     except Exception:
         pass
@@ -88,11 +105,9 @@ def has_project_files(directory):
     return False
 
 
-def extract_code_features_enhanced(project_path):
-    """Enhanced feature extraction with AST analysis and better parsing"""
-    print(f"🔍 Extracting features from: {project_path}")
-    
-    features = {
+def new_feature_dict():
+    """Empty feature dict filled in by extract_code_features_from_files"""
+    return {
         'total_files': 0,
         'python_files': 0,
         'js_files': 0,
@@ -107,6 +122,7 @@ def extract_code_features_enhanced(project_path):
         'imports': [],
         'keywords': [],
         'file_hashes': [],
+        'file_paths': {},  # file hash -> paths with that content
         'ast_structures': [],
         'text_content': '',
         'function_names': [],
@@ -114,77 +130,124 @@ def extract_code_features_enhanced(project_path):
         'comments': [],
         'string_literals': [],
         'control_flow_patterns': [],
-        'code_tokens': []  # Add this for TF-IDF
+        'code_tokens': [],  # Add this for TF-IDF
+        'fingerprints': []  # (file path, winnowed k-gram fingerprints)
     }
-    
-    code_extensions = {'.py', '.js', '.jsx', '.html', '.css', '.php', '.java', '.cpp', '.c', '.ts', '.tsx'}
-    
+
+
+def decode_source(data):
+    """Decode raw file bytes the same way open(..., 'r', errors='ignore') would"""
+    content = data.decode('utf-8', errors='ignore')
+    # Text-mode reads translate newlines, keep hashes identical for ZIP members
+    return content.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def is_code_file(file_name):
+    """Check if a file name has one of the analysed code extensions"""
+    return os.path.splitext(file_name)[1].lower() in CODE_EXTENSIONS
+
+
+def iter_project_files(project_path):
+    """Yield (file_path, content) for a project directory; content is None for non-code files"""
+    for root, dirs, files in os.walk(project_path):
+        # Skip common non-project directories
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+
+        for file in files:
+            file_path = os.path.join(root, file)
+            if not is_code_file(file):
+                yield file_path, None
+                continue
+
+            try:
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    yield file_path, f.read()
+            except Exception as e:
+                print(f"  ⚠️ Error processing {file_path}: {e}")
+                yield file_path, None
+
+
+def extract_code_features_enhanced(project_path):
+    """Enhanced feature extraction with AST analysis and better parsing"""
+    print(f"🔍 Extracting features from: {project_path}")
+
     try:
-        for root, dirs, files in os.walk(project_path):
-            # Skip common non-project directories
-            dirs[:] = [d for d in dirs if d not in {'.git', '__pycache__', 'node_modules', '.vscode', '.idea'}]
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_ext = os.path.splitext(file)[1].lower()
-                
-                features['total_files'] += 1
-                
-                if file_ext in code_extensions:
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            features['text_content'] += content + '\n'
-                            
-                            # Tokenize content for TF-IDF
-                            tokens = re.findall(r'\b\w+\b', content.lower())
-                            features['code_tokens'].extend(tokens)
-                            
-                            lines = content.split('\n')
-                            features['total_lines'] += len(lines)
-                            
-                            # Analyze lines
-                            for line in lines:
-                                stripped = line.strip()
-                                if not stripped:
-                                    features['blank_lines'] += 1
-                                elif stripped.startswith(('#', '//', '/*')) or '/*' in stripped:
-                                    features['comment_lines'] += 1
-                                    features['comments'].append(stripped[:100])  # Limit length
-                                else:
-                                    features['code_lines'] += 1
-                            
-                            # File-specific analysis
-                            if file_ext == '.py':
-                                features['python_files'] += 1
-                                py_features = extract_python_features_enhanced(content)
-                                merge_features(features, py_features)
-                                        
-                            elif file_ext in {'.js', '.jsx', '.ts', '.tsx'}:
-                                features['js_files'] += 1
-                                js_features = extract_js_features_enhanced(content)
-                                merge_features(features, js_features)
-                                        
-                            elif file_ext == '.html':
-                                features['html_files'] += 1
-                            elif file_ext == '.css':
-                                features['css_files'] += 1
-                            
-                            # Calculate file hash for exact duplicate detection
-                            file_hash = hashlib.md5(content.encode()).hexdigest()
-                            features['file_hashes'].append(file_hash)
-                            
-                    except Exception as e:
-                        print(f"  ⚠️ Error processing {file_path}: {e}")
-                        continue
-    
+        features = extract_code_features_from_files(iter_project_files(project_path))
     except Exception as e:
         print(f"❌ Error extracting features from {project_path}: {e}")
-    
+        features = new_feature_dict()
+
     print(f"  📊 Extracted: {features['total_files']} files, {features['code_lines']} code lines, {len(features['file_hashes'])} hashes")
     return features
 
 
+def extract_code_features_from_files(files):
+    """Extract features from an iterable of (file_path, content) pairs.
+
+    ``content`` is the decoded source of a code file, or None for files that
+    are only counted. Used for both extracted directories and ZIP streams.
+    """
+    features = new_feature_dict()
+
+    for file_path, content in files:
+        features['total_files'] += 1
+
+        if content is None:
+            continue
+
+        file_ext = os.path.splitext(file_path)[1].lower()
+        try:
+            features['text_content'] += content + '\n'
+
+            # Tokenize content for TF-IDF
+            tokens = re.findall(r'\b\w+\b', content.lower())
+            features['code_tokens'].extend(tokens)
+
+            lines = content.split('\n')
+            features['total_lines'] += len(lines)
+
+            # Analyze lines
+            for line in lines:
+                stripped = line.strip()
+                if not stripped:
+                    features['blank_lines'] += 1
+                elif stripped.startswith(('#', '//', '/*')) or '/*' in stripped:
+                    features['comment_lines'] += 1
+                    features['comments'].append(stripped[:100])  # Limit length
+                else:
+                    features['code_lines'] += 1
+
+            # File-specific analysis
+            if file_ext == '.py':
+                features['python_files'] += 1
+                py_features = extract_python_features_enhanced(content)
+                merge_features(features, py_features)
+
+            elif file_ext in {'.js', '.jsx', '.ts', '.tsx'}:
+                features['js_files'] += 1
+                js_features = extract_js_features_enhanced(content)
+                merge_features(features, js_features)
+
+            elif file_ext == '.html':
+                features['html_files'] += 1
+            elif file_ext == '.css':
+                features['css_files'] += 1
+
+            # Calculate file hash for exact duplicate detection
+            file_hash = hashlib.md5(content.encode()).hexdigest()
+            features['file_hashes'].append(file_hash)
+            features['file_paths'].setdefault(file_hash, []).append(file_path)
+
+            # Positional fingerprints for local (function-level) matches
+            features['fingerprints'].append((file_path, fingerprint_source(content, file_ext)))
+
+        except Exception as e:
+            print(f"  ⚠️ Error processing {file_path}: {e}")
+            continue
+
+    return features
+
+
 def merge_features(target_features, source_features):
     """Merge source features into target features"""
     for key, value in source_features.items():
@@ -365,99 +428,60 @@ def extract_js_features_enhanced(code):
 
 
 def calculate_similarity_features_enhanced(features1, features2):
-    """Calculate enhanced similarity features between two projects with debugging"""
+    """Calculate enhanced similarity features between two projects with debugging.
+
+    Works on compact feature sketches only; raw feature dicts (or serialized
+    sketches) are converted with FeatureSketch.coerce first.
+    """
+    from .sketch import FeatureSketch, jaccard_sorted, tfidf_cosine
+
+    sketch1 = FeatureSketch.coerce(features1)
+    sketch2 = FeatureSketch.coerce(features2)
+
     print(f"\n🔍 Comparing projects:")
-    print(f"  Project 1: {len(features1.get('code_tokens', []))} tokens, {features1.get('total_lines', 0)} lines, {len(features1.get('file_hashes', []))} files")
-    print(f"  Project 2: {len(features2.get('code_tokens', []))} tokens, {features2.get('total_lines', 0)} lines, {len(features2.get('file_hashes', []))} files")
-    
-    def jaccard_similarity(list1, list2):
-        """Calculate Jaccard similarity between two lists"""
-        set1, set2 = set(list1), set(list2)
-        intersection = len(set1.intersection(set2))
-        union = len(set1.union(set2))
-        return intersection / union if union != 0 else 0
+    print(f"  Project 1: {len(sketch1.token_ids)} distinct tokens, {sketch1.scalars['total_lines']} lines, {len(sketch1.file_hashes)} files")
+    print(f"  Project 2: {len(sketch2.token_ids)} distinct tokens, {sketch2.scalars['total_lines']} lines, {len(sketch2.file_hashes)} files")
 
     # File hash similarity (exact matches) - MOST IMPORTANT FOR IDENTICAL FILES
-    hashes1 = set(features1.get('file_hashes', []))
-    hashes2 = set(features2.get('file_hashes', []))
-    
-    if hashes1 and hashes2:
-        hash_intersection = len(hashes1.intersection(hashes2))
-        hash_union = len(hashes1.union(hashes2))
-        hash_similarity = hash_intersection / hash_union if hash_union > 0 else 0
-        print(f"  🔗 Hash similarity: {hash_similarity:.3f} ({hash_intersection}/{hash_union} exact file matches)")
+    if len(sketch1.file_hashes) and len(sketch2.file_hashes):
+        hash_similarity = jaccard_sorted(sketch1.file_hashes, sketch2.file_hashes)
+        print(f"  🔗 Hash similarity: {hash_similarity:.3f}")
     else:
         hash_similarity = 0
 
     # TF-IDF similarity on code tokens
     try:
-        tokens1 = features1.get('code_tokens', [])
-        tokens2 = features2.get('code_tokens', [])
-        
-        if tokens1 and tokens2:
-            # Create corpus from tokens
-            text1 = ' '.join(tokens1)
-            text2 = ' '.join(tokens2)
-            corpus = [text1, text2]
-            
-            vectorizer = TfidfVectorizer(max_features=1000, min_df=1)
-            tfidf_matrix = vectorizer.fit_transform(corpus)
-            tfidf_similarity = cosine_similarity(tfidf_matrix[0], tfidf_matrix[1])
-            print(f"  📝 TF-IDF similarity: {tfidf_similarity:.3f}")
-        else:
-            tfidf_similarity = 0
+        tfidf_similarity = tfidf_cosine(sketch1, sketch2)
+        print(f"  📝 TF-IDF similarity: {tfidf_similarity:.3f}")
     except Exception as e:
         print(f"  ❌ TF-IDF error: {e}")
         tfidf_similarity = 0
-    
+
     # Function name similarity
-    funcs1 = set(features1.get('function_names', []))
-    funcs2 = set(features2.get('function_names', []))
-    if funcs1 or funcs2:
-        func_intersection = len(funcs1.intersection(funcs2))
-        func_union = len(funcs1.union(funcs2))
-        function_similarity = func_intersection / func_union if func_union > 0 else 0
-        print(f"  🔧 Function similarity: {function_similarity:.3f} ({func_intersection}/{func_union})")
-    else:
-        function_similarity = 0
-    
-    # Import similarity  
-    imports1 = set(features1.get('imports', []))
-    imports2 = set(features2.get('imports', []))
-    if imports1 or imports2:
-        import_intersection = len(imports1.intersection(imports2))
-        import_union = len(imports1.union(imports2))
-        import_similarity = import_intersection / import_union if import_union > 0 else 0
-        print(f"  📦 Import similarity: {import_similarity:.3f} ({import_intersection}/{import_union})")
-    else:
-        import_similarity = 0
-    
+    function_similarity = jaccard_sorted(sketch1.function_names, sketch2.function_names)
+    print(f"  🔧 Function similarity: {function_similarity:.3f}")
+
+    # Import similarity
+    import_similarity = jaccard_sorted(sketch1.imports, sketch2.imports)
+    print(f"  📦 Import similarity: {import_similarity:.3f}")
+
     # Variable name similarity
-    vars1 = set(features1.get('variable_names', []))
-    vars2 = set(features2.get('variable_names', []))
-    variable_similarity = jaccard_similarity(list(vars1), list(vars2))
-    
+    variable_similarity = jaccard_sorted(sketch1.variable_names, sketch2.variable_names)
+
     # Structure similarity (file counts, line counts)
-    length1 = features1.get('total_lines', 0)
-    length2 = features2.get('total_lines', 0)
+    length1 = sketch1.scalars['total_lines']
+    length2 = sketch2.scalars['total_lines']
     if max(length1, length2) > 0:
         length_similarity = 1 - abs(length1 - length2) / max(length1, length2)
     else:
         length_similarity = 0
-    
+
     # Keywords and control flow
-    keyword_similarity = jaccard_similarity(features1.get('keywords', []), features2.get('keywords', []))
-    
+    keyword_similarity = jaccard_sorted(sketch1.keywords, sketch2.keywords)
+
     # Calculate weighted overall similarity with emphasis on exact matches
-    weights = {
-        'hash': 0.50,        # HIGHEST weight for exact file matches
-        'tfidf': 0.20,       # Content similarity
-        'function': 0.15,    # Function names
-        'import': 0.10,      # Imports
-        'variable': 0.03,    # Variables
-        'length': 0.02       # Structure
-    }
-    
+    weights = SIMILARITY_WEIGHTS
+
     overall_similarity = (
         hash_similarity * weights['hash'] +
         tfidf_similarity * weights['tfidf'] +
@@ -466,7 +490,7 @@ def calculate_similarity_features_enhanced(features1, features2):
         variable_similarity * weights['variable'] +
         length_similarity * weights['length']
     )
-    
+
     print(f"  🎯 Overall similarity: {overall_similarity:.3f}")
 
     # After calculating all similarity_features
@@ -481,14 +505,14 @@ def calculate_similarity_features_enhanced(features1, features2):
         'overall_similarity': overall_similarity,
         'structure_difference': 1 - length_similarity
     }
-    
+
     # 🔥 FIX: Force 100% similarity for exact file matches
-    if hash_similarity >= 0.8:  # If 80% or more files are identical
+    if hash_similarity >= EXACT_MATCH_THRESHOLD:  # If 80% or more files are identical
         print(f"  🚨 EXACT MATCH DETECTED: Setting overall similarity to 1.0")
         similarity_features['overall_similarity'] = 1.0
-    
+
     print(f"  🎯 Final Overall similarity: {similarity_features['overall_similarity']:.3f}")
-    
+
     return similarity_features
 
 
@@ -504,6 +528,43 @@ def calculate_similarity_features(features1, features2):
 
 
 # Keep your existing recursive functions for nested ZIP support
-def extract_batch_zip_file_recursive(zip_path, extract_to):
-    """Use the standard function for now - recursive version can be added later"""
-    return extract_batch_zip_file(zip_path, extract_to), {}
+def extract_batch_zip_file_recursive(zip_path, extract_to, max_depth=None):
+    """Extract every student project from a (nested) batch ZIP into extract_to.
+
+    Inner archives are opened from memory and each project is written once
+    to ``extract_to/<project name>``. Returns ``(project_names, nested_structure)``
+    where the structure maps project names (and section archive paths) to
+    their ``type``, ``parent``, ``level`` and ``original_zip_path``.
+    """
+    from .zip_ingest import BatchArchiveReader
+
+    extracted_projects = []
+    nested_structure = {}
+
+    try:
+        reader = BatchArchiveReader(zip_path, max_depth=max_depth, raw=True)
+        for project in reader:
+            project_dir = os.path.realpath(os.path.join(extract_to, project['name']))
+            for file_path, data in project['files']:
+                target = os.path.realpath(os.path.join(project_dir, file_path))
+                # Never write outside the project directory (zip-slip)
+                if not target.startswith(project_dir + os.sep):
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(data)
+
+            extracted_projects.append(project['name'])
+            nested_structure[project['name']] = project['nested_info']
+
+        nested_structure.update(reader.sections)
+
+    except zipfile.BadZipFile:
+        print(f"❌ Error: {zip_path} is not a valid ZIP file")
+        return [], {}
+    except Exception as e:
+        print(f"❌ Error extracting ZIP file: {e}")
+        return [], {}
+
+    print(f"✅ Successfully extracted {len(extracted_projects)} projects: {extracted_projects}")
+    return extracted_projects, nested_structure
@@ -1,19 +1,25 @@
 import os
-import tempfile
-import shutil
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
-from .models import BatchUpload, ProjectSubmission, PlagiarismResult
+from django.utils import timezone
+from .models import BatchUpload, ProjectSubmission, PlagiarismResult, StarterCode, UploadSession
 # from .utils import extract_batch_zip_file, extract_code_features, calculate_similarity_features,calculate_similarity_features_enhanced,extract_code_features_enhanced
 from .ml_models import predict_plagiarism
 import numpy as np
 from django.db import models
 # from django.db import models
 # from .models import BatchUpload, ProjectSubmission, PlagiarismResult
-from .utils import extract_batch_zip_file_recursive, extract_code_features_enhanced, calculate_similarity_features_enhanced
+from .pipeline import run_batch_check, store_batch_summary, BatchCheckError
+from .uploads import (
+    DEFAULT_UPLOAD_CHUNK_SIZE, DEFAULT_UPLOAD_SESSION_MAX_SIZE, UploadSessionError,
+    assemble_chunks, expire_upload_sessions, received_chunks, store_upload, write_chunk
+)
+from .snippet_search import SnippetSearchError, search_snippet
+from .corpus import historical_match_report
+from .starter_code import StarterCodeError, resolve_starter_code, store_starter_code
 
 
 
@@ -27,176 +33,275 @@ def batch_plagiarism_check(request):
 
     zip_file = request.FILES.get('zip_file')
     batch_name = request.data.get('batch_name', 'Untitled Batch')
-    topic = request.data.get('topic', 'Unknown Topic')
+    topic = request.data.get('topic', BatchUpload.DEFAULT_TOPIC)
 
     if not zip_file:
         return Response({'error': 'ZIP file is required'},
                        status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        # Save uploaded file
-        upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', 'batches')
-        os.makedirs(upload_dir, exist_ok=True)
-        zip_path = os.path.join(upload_dir, zip_file.name)
-        
-        with open(zip_path, 'wb+') as destination:
-            for chunk in zip_file.chunks():
-                destination.write(chunk)
-
-        # Create batch record
-        batch = BatchUpload.objects.create(
-            faculty=request.user,
-            batch_name=batch_name,
-            topic=topic,
-            file_path=zip_path
-        )
+        # Starter code for this batch only: an uploaded ZIP or one stored earlier
+        starter_code = None
+        if request.FILES.get('starter_zip'):
+            starter_code = store_starter_code(request.user, request.FILES['starter_zip'])
+        elif request.data.get('starter_code_id'):
+            starter_code = StarterCode.objects.filter(id=request.data['starter_code_id'], faculty=request.user).first()
+            if starter_code is None:
+                return Response({'error': 'Starter code not found'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Move the streamed upload into content-addressed storage
+        zip_path, archive_sha256 = store_upload(zip_file, 'batches')
+        return start_batch_check(request.user, batch_name, topic, zip_path, archive_sha256, starter_code)
+
+    except StarterCodeError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        print(f"Processing failed: {str(e)}")
+        return Response({'error': f'Processing failed: {str(e)}'},
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Enhanced extraction with nested ZIP support
-        temp_dir = tempfile.mkdtemp()
-        try:
-            print(f"Using temporary directory: {temp_dir}")
-            extracted_projects, nested_structure = extract_batch_zip_file_recursive(zip_path, temp_dir)
-            
-            if not extracted_projects:
-                return Response({
-                    'error': 'No valid projects found in the ZIP file.'
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            # Update batch with nested structure info
-            batch.nested_zip_structure = nested_structure
-            batch.total_nested_zips = len([p for p in nested_structure.values() if p['type'] == 'nested_zip'])
-            batch.save()
-
-            project_features = {}
-            
-            # Extract features from each project
-            for project_name in extracted_projects:
-                project_path = os.path.join(temp_dir, project_name)
-                if os.path.exists(project_path):
-                    print(f"Extracting features from: {project_name}")
-                    features = extract_code_features_enhanced(project_path)
-                    
-                    # Get nested ZIP info
-                    zip_info = nested_structure.get(project_name, {})
-                    
-                    # Save project submission with nested info
-                    submission = ProjectSubmission.objects.create(
-                        batch=batch,
-                        student_id=project_name,
-                        project_name=project_name,
-                        file_path=project_path,
-                        features=features,
-                        parent_zip_name=zip_info.get('parent', 'root'),
-                        extraction_level=zip_info.get('level', 0),
-                        original_zip_path=zip_info.get('original_zip_path', '')
-                    )
-                    
-                    project_features[submission.id] = {
-                        'submission': submission,
-                        'features': features,
-                        'nested_info': zip_info
-                    }
-
-            # Continue with existing plagiarism detection logic...
-            # [Rest of the plagiarism detection code remains the same]
-
-            # Generate plagiarism report (add this before your return statement)
-            report = []
-            results = []
-
-            # Get all project_features keys (these are submission IDs)
-            project_ids = list(project_features.keys())
-
-            print(f"Generating plagiarism report for {len(project_ids)} projects...")
-
-            # Compare all pairs of projects
-            for i in range(len(project_ids)):
-                for j in range(i + 1, len(project_ids)):
-                    id1 = project_ids[i]
-                    id2 = project_ids[j]
-                    
-                    # Fetch the actual ProjectSubmission objects from database
-                    try:
-                        obj1 = ProjectSubmission.objects.get(id=id1)
-                        obj2 = ProjectSubmission.objects.get(id=id2)
-                    except ProjectSubmission.DoesNotExist:
-                        print(f"ProjectSubmission not found for IDs: {id1}, {id2}")
-                        continue
-                    
-                    features1 = project_features[id1]['features']
-                    features2 = project_features[id2]['features']
-                    
-                    # Calculate similarity using your enhanced function
-                    try:
-                        similarity_metrics = calculate_similarity_features_enhanced(features1, features2)
-                        similarity_score = similarity_metrics.get('overall_similarity', 0)
-                        
-                        # Determine if plagiarized (threshold = 0.7 or 70%)
-                        is_plagiarized = similarity_score > 0.7
-                        
-                        # Create PlagiarismResult database entry
-                        plagiarism_result = PlagiarismResult.objects.create(
-                            batch=batch,
-                            project1=obj1,
-                            project2=obj2,
-                            similarity_score=similarity_score,
-                            is_plagiarized=is_plagiarized,
-                            comparison_details=similarity_metrics
-                        )
-                        
-                        # Add to report for frontend (now using obj1.student_id instead of id1.student_id)
-                        report.append({
-                            'student_id_1': obj1.student_id,
-                            'student_id_2': obj2.student_id,
-                            'similarity_percentage': round(similarity_score * 100, 2),
-                            'plagiarized_status': 'Yes' if is_plagiarized else 'No'
-                        })
-                        
-                        # Add to results for detailed analysis
-                        results.append({
-                            'project1_id': obj1.id,
-                            'project2_id': obj2.id,
-                            'similarity_score': similarity_score,
-                            'is_plagiarized': is_plagiarized,
-                            'features': similarity_metrics
-                        })
-                        
-                    except Exception as e:
-                        print(f"Error comparing {obj1.student_id} and {obj2.student_id}: {e}")
-                        # Add failed comparison to report
-                        report.append({
-                            'student_id_1': obj1.student_id,
-                            'student_id_2': obj2.student_id,
-                            'similarity_percentage': 0,
-                            'plagiarized_status': 'Error'
-                        })
-
-            print(f"Plagiarism detection complete. Generated report for {len(project_ids)} students.")
-
-
-            
-            # Enhanced response with nested structure
-            # Enhanced response with nested structure
+
+def start_batch_check(faculty, batch_name, topic, zip_path, archive_sha256, starter_code=None):
+    """Queue (or, with BATCH_CHECK_ASYNC off, run) the check of a stored batch archive"""
+    # The starter code is fixed at upload time (the explicit one, else the
+    # topic's latest), so a later topic starter does not match older batches
+    starter_code = resolve_starter_code(faculty, topic, starter_code)
+
+    # An identical archive already checked for the same topic and starter code
+    # is not processed again (another topic needs its own batch and history)
+    if getattr(settings, 'BATCH_DEDUPLICATE_UPLOADS', True):
+        existing = BatchUpload.objects.filter(
+            faculty=faculty, topic=topic, archive_sha256=archive_sha256, starter_code=starter_code
+        ).exclude(job_status=BatchUpload.JOB_FAILED).order_by('-uploaded_at').first()
+        if existing is not None:
+            print(f"Batch archive {archive_sha256[:12]} already uploaded as batch {existing.id}")
             return Response({
-                'batch_id': batch.id,
-                'batch_name': batch_name,
-                'topic': topic,
-                'total_projects': len(project_features),
-                'nested_structure': nested_structure,
-                'total_nested_zips': batch.total_nested_zips,
-                'plagiarism_report': report,  # This was undefined before
-                'detailed_comparisons': results
+                'batch_id': existing.id,
+                'batch_name': existing.batch_name,
+                'topic': existing.topic,
+                'status': existing.job_status,
+                'status_url': f'/api/plagiarism/batch/{existing.id}/status/',
+                'duplicate': True
             }, status=status.HTTP_200_OK)
 
-            
-        finally:
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            
+    # Create batch record (queued for run_batch_worker)
+    batch = BatchUpload.objects.create(
+        faculty=faculty,
+        batch_name=batch_name,
+        topic=topic,
+        file_path=zip_path,
+        archive_sha256=archive_sha256,
+        starter_code=starter_code,
+        job_status=BatchUpload.JOB_QUEUED
+    )
+
+    if getattr(settings, 'BATCH_CHECK_ASYNC', True):
+        return Response({
+            'batch_id': batch.id,
+            'batch_name': batch_name,
+            'topic': topic,
+            'status': batch.job_status,
+            'status_url': f'/api/plagiarism/batch/{batch.id}/status/'
+        }, status=status.HTTP_202_ACCEPTED)
+
+    # Synchronous mode: run the pipeline inside the request
+    BatchUpload.objects.filter(pk=batch.pk).update(job_status=BatchUpload.JOB_RUNNING, job_started_at=timezone.now())
+    try:
+        report_data = run_batch_check(batch)
+    except BatchCheckError as e:
+        BatchUpload.objects.filter(pk=batch.pk).update(
+            job_status=BatchUpload.JOB_FAILED, job_error=str(e), job_finished_at=timezone.now()
+        )
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    BatchUpload.objects.filter(pk=batch.pk).update(
+        job_status=BatchUpload.JOB_DONE, job_stage='done', job_progress=1.0, job_finished_at=timezone.now()
+    )
+
+    # Enhanced response with nested structure
+    return Response({
+        'batch_id': batch.id,
+        'batch_name': batch_name,
+        'topic': topic,
+        'status': BatchUpload.JOB_DONE,
+        **report_data
+    }, status=status.HTTP_200_OK)
+
+
+def upload_session_status(session):
+    """Progress of a resumable upload: which chunks arrived and which are missing"""
+    received = received_chunks(session) if session.status != UploadSession.STATUS_COMPLETE else list(range(session.total_chunks))
+    missing = sorted(set(range(session.total_chunks)) - set(received))
+    return {
+        'session_id': str(session.id),
+        'status': session.status,
+        'file_name': session.file_name,
+        'total_size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'total_chunks': session.total_chunks,
+        'received_chunks': len(received),
+        'missing_chunks': missing,
+        'batch_id': session.batch_id
+    }
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload_session(request):
+    """Start a resumable upload of a large batch ZIP (sent as numbered chunks)"""
+    if request.user.role != 'faculty':
+        return Response({'error': 'Only faculty can perform batch checks'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    file_name = request.data.get('file_name') or 'batch.zip'
+    try:
+        total_size = int(request.data.get('total_size'))
+    except (TypeError, ValueError):
+        return Response({'error': 'total_size is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    max_size = getattr(settings, 'UPLOAD_SESSION_MAX_SIZE', DEFAULT_UPLOAD_SESSION_MAX_SIZE)
+    if not 0 < total_size <= max_size:
+        return Response({'error': f'total_size must be between 1 and {max_size} bytes'},
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    expire_upload_sessions()
+    session = UploadSession.objects.create(
+        faculty=request.user,
+        batch_name=request.data.get('batch_name', 'Untitled Batch'),
+        topic=request.data.get('topic', BatchUpload.DEFAULT_TOPIC),
+        file_name=os.path.basename(file_name),
+        total_size=total_size,
+        chunk_size=getattr(settings, 'UPLOAD_CHUNK_SIZE', DEFAULT_UPLOAD_CHUNK_SIZE),
+        sha256=(request.data.get('sha256') or '').lower()
+    )
+    return Response(upload_session_status(session), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_upload_session(request, session_id):
+    """Received and missing chunks of an upload session, for resuming it"""
+    try:
+        session = UploadSession.objects.get(id=session_id, faculty=request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(upload_session_status(session), status=status.HTTP_200_OK)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def upload_session_chunk(request, session_id, index):
+    """Store one chunk; the raw request body is the chunk, X-Chunk-SHA256 its checksum"""
+    try:
+        session = UploadSession.objects.get(id=session_id, faculty=request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if session.status != UploadSession.STATUS_OPEN:
+        return Response({'error': f'Upload session is {session.status}'}, status=status.HTTP_409_CONFLICT)
+
+    try:
+        size = write_chunk(session, index, request.stream, request.headers.get('X-Chunk-SHA256'))
+    except UploadSessionError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Keeps the session from expiring while chunks keep arriving
+    UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now())
+    return Response({'index': index, 'size': size}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def finalize_upload_session(request, session_id):
+    """Assemble the chunks into the stored archive and start the batch check"""
+    try:
+        session = UploadSession.objects.get(id=session_id, faculty=request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if session.status == UploadSession.STATUS_COMPLETE and session.batch_id:
+        return Response({
+            'batch_id': session.batch_id,
+            'status_url': f'/api/plagiarism/batch/{session.batch_id}/status/',
+            'duplicate': True
+        }, status=status.HTTP_200_OK)
+
+    starter_code = None
+    if request.data.get('starter_code_id'):
+        starter_code = StarterCode.objects.filter(id=request.data['starter_code_id'], faculty=request.user).first()
+        if starter_code is None:
+            return Response({'error': 'Starter code not found'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Only one finalize request assembles the chunks
+    claimed = UploadSession.objects.filter(
+        pk=session.pk, status=UploadSession.STATUS_OPEN
+    ).update(status=UploadSession.STATUS_FINALIZING)
+    if not claimed:
+        return Response({'error': f'Upload session is {session.status}'}, status=status.HTTP_409_CONFLICT)
+
+    try:
+        zip_path, archive_sha256 = assemble_chunks(session, 'batches')
+    except UploadSessionError as e:
+        UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.STATUS_OPEN)
+        return Response({'error': str(e), **upload_session_status(session)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        print(f"Processing failed: {str(e)}")
+        UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.STATUS_OPEN)
+        print(f"Assembling upload session {session.id} failed: {str(e)}")
         return Response({'error': f'Processing failed: {str(e)}'},
                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    try:
+        response = start_batch_check(
+            session.faculty, session.batch_name, session.topic, zip_path, archive_sha256, starter_code
+        )
+    except Exception as e:
+        print(f"Processing failed: {str(e)}")
+        response = Response({'error': f'Processing failed: {str(e)}'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    # The archive is stored either way; a failed start can be retried as a normal batch upload
+    UploadSession.objects.filter(pk=session.pk).update(
+        status=UploadSession.STATUS_COMPLETE, batch_id=response.data.get('batch_id')
+    )
+    return response
+
+
+def batch_job_status(batch):
+    """Job status payload with stage, percentage done and ETA"""
+    progress = batch.job_progress or 0.0
+    eta_seconds = None
+    elapsed_seconds = None
+
+    if batch.job_started_at:
+        end = batch.job_finished_at or timezone.now()
+        elapsed_seconds = round((end - batch.job_started_at).total_seconds(), 1)
+        if batch.job_status == BatchUpload.JOB_RUNNING and progress > 0:
+            eta_seconds = round(elapsed_seconds * (1 - progress) / progress, 1)
+
+    return {
+        'batch_id': batch.id,
+        'status': batch.job_status,
+        'stage': batch.job_stage,
+        'progress_percentage': round(progress * 100, 1),
+        'eta_seconds': eta_seconds,
+        'elapsed_seconds': elapsed_seconds,
+        'started_at': batch.job_started_at,
+        'finished_at': batch.job_finished_at,
+        'error': batch.job_error or None
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_batch_status(request, batch_id):
+    """Poll the background job of a batch upload"""
+    try:
+        batch = BatchUpload.objects.get(id=batch_id, faculty=request.user)
+    except BatchUpload.DoesNotExist:
+        return Response({'error': 'Batch not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(batch_job_status(batch), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -205,116 +310,205 @@ def get_batch_results(request, batch_id):
     """Enhanced batch results with correct plagiarism rate calculation"""
     try:
         batch = BatchUpload.objects.get(id=batch_id, faculty=request.user)
-        results = PlagiarismResult.objects.filter(batch=batch)
-        submissions = batch.submissions.all()
+        if batch.job_status != BatchUpload.JOB_DONE:
+            # Job still queued/running (or failed): report its status instead
+            return Response(batch_job_status(batch), status=status.HTTP_202_ACCEPTED)
+
+        # Per-student and batch totals are precomputed when the job finishes;
+        # batches processed before that are summarised once on first view
+        summary = batch.result_summary or store_batch_summary(batch)
+        student_summaries = batch.student_summaries.all()
+
+        total_projects = summary['total_projects']
+        flagged_projects = summary['flagged_projects']
+        plagiarism_percentage = summary['plagiarism_percentage']
 
-        # 🔥 FIX: Correct plagiarism counting
-        total_projects = submissions.count()
-        flagged_student_ids = set()
-        
-        # Count unique students involved in plagiarism
-        for result in results:
-            if result.is_plagiarized:
-                flagged_student_ids.add(result.project1.student_id)
-                flagged_student_ids.add(result.project2.student_id)
-        
-        flagged_projects = len(flagged_student_ids)
-        clean_projects = total_projects - flagged_projects
-        
-        # Calculate correct plagiarism rate
-        plagiarism_percentage = round((flagged_projects / total_projects * 100) if total_projects > 0 else 0, 1)
-        
         print(f"🔍 Plagiarism Summary: {flagged_projects}/{total_projects} projects flagged = {plagiarism_percentage}%")
 
-        # Build detailed comparisons for frontend
+        # Build detailed comparisons for frontend (one query, no per-row lookups)
+        results = PlagiarismResult.objects.filter(batch=batch).order_by('id').values(
+            'id', 'similarity_score', 'is_plagiarized', 'confidence', 'faculty_label', 'created_at',
+            'project1__student_id', 'project2__student_id',
+            'project1__features', 'project2__features',
+            'comparison_details__fingerprint_similarity', 'comparison_details__matched_regions'
+        )
         detailed_results = []
         for result in results:
             detailed_results.append({
-                'id': result.id,
-                'student_id_1': result.project1.student_id,
-                'student_id_2': result.project2.student_id,
-                'similarity_percentage': round(result.similarity_score * 100, 2),
-                'plagiarized_status': 'Yes' if result.is_plagiarized else 'No',
+                'id': result['id'],
+                'student_id_1': result['project1__student_id'],
+                'student_id_2': result['project2__student_id'],
+                'similarity_percentage': round(result['similarity_score'] * 100, 2),
+                'plagiarized_status': 'Yes' if result['is_plagiarized'] else 'No',
+                'confidence': result['confidence'],
+                'faculty_label': result['faculty_label'],
                 'comparison_details': {
-                    'project1_files': len(result.project1.features.get('file_hashes', [])),
-                    'project2_files': len(result.project2.features.get('file_hashes', [])),
-                    'created_at': result.created_at
+                    'project1_files': result['project1__features'].get('code_files', len(result['project1__features'].get('file_hashes', []))),
+                    'project2_files': result['project2__features'].get('code_files', len(result['project2__features'].get('file_hashes', []))),
+                    'fingerprint_similarity': result['comparison_details__fingerprint_similarity'],
+                    'matched_regions': result['comparison_details__matched_regions'] or [],
+                    'created_at': result['created_at']
                 }
             })
 
-        # Student summary
+        # Student summary and projects for hierarchical display
         student_summary = []
-        for submission in submissions:
-            student_plagiarism = results.filter(
-                models.Q(project1=submission) | models.Q(project2=submission),
-                is_plagiarized=True
-            ).count()
-            
+        student_projects = []
+        for student in student_summaries:
+            plagiarism_detected = student.plagiarism_count > 0
             student_summary.append({
-                'student_id': submission.student_id,
-                'project_name': submission.project_name,
-                'total_files': submission.features.get('total_files', 0),
-                'code_lines': submission.features.get('code_lines', 0),
-                'plagiarism_detected': student_plagiarism > 0,
-                'plagiarism_count': student_plagiarism
+                'student_id': student.student_id,
+                'project_name': student.project_name,
+                'total_files': student.total_files,
+                'code_lines': student.code_lines,
+                'plagiarism_detected': plagiarism_detected,
+                'plagiarism_count': student.plagiarism_count
+            })
+            student_projects.append({
+                'student_id': student.student_id,
+                'project_name': student.project_name,
+                'similarity_percentage': round(student.max_similarity * 100, 2),
+                'plagiarism_detected': plagiarism_detected,
+                'similar_to': student.similar_to,
+                'total_files': student.total_files,
+                'code_lines': student.code_lines,
+                'status': 'Flagged' if plagiarism_detected else 'Clean'
             })
 
-                # Build student projects for hierarchical display
-            student_projects = []
-            for submission in submissions:
-                # Find highest similarity for this student
-                max_similarity = 0
-                similar_to = None
-                plagiarism_detected = False
-                
-                for result in results:
-                    if result.project1 == submission or result.project2 == submission:
-                        if result.similarity_score > max_similarity:
-                            max_similarity = result.similarity_score
-                            plagiarism_detected = result.is_plagiarized
-                            # Get the other student's name
-                            similar_to = result.project2.student_id if result.project1 == submission else result.project1.student_id
-                
-                student_projects.append({
-                    'student_id': submission.student_id,
-                    'project_name': submission.project_name,
-                    'similarity_percentage': round(max_similarity * 100, 2),
-                    'plagiarism_detected': plagiarism_detected,
-                    'similar_to': similar_to,
-                    'total_files': submission.features.get('total_files', 0),
-                    'code_lines': submission.features.get('code_lines', 0),
-                    'status': 'Flagged' if plagiarism_detected else 'Clean'
-                })
-
-            # Create hierarchical structure (group by parent - for now all under 'root')
-            hierarchical_projects = {
-                'root': student_projects
-            }
+        # Create hierarchical structure (group by parent - for now all under 'root')
+        hierarchical_projects = {
+            'root': student_projects
+        }
 
-            return Response({
-                'batch': {
-                    'id': batch.id,
-                    'batch_name': batch.batch_name,
-                    'topic': batch.topic,
-                    'uploaded_at': batch.uploaded_at,
-                    'total_projects': total_projects
-                },
-                'summary': {
-                    'total_comparisons': len(detailed_results),
-                    'plagiarized_comparisons': len([r for r in results if r.is_plagiarized]),
-                    'plagiarism_percentage': plagiarism_percentage,
-                    'clean_projects': clean_projects,
-                    'flagged_projects': flagged_projects
-                },
-                'detailed_results': detailed_results,
-                'student_summary': student_summary,
-                'hierarchical_projects': hierarchical_projects  # 🔥 ADD THIS
-            }, status=status.HTTP_200_OK)
+        return Response({
+            'batch': {
+                'id': batch.id,
+                'batch_name': batch.batch_name,
+                'topic': batch.topic,
+                'uploaded_at': batch.uploaded_at,
+                'total_projects': total_projects,
+                'starter_code': batch.starter_code.file_name if batch.starter_code_id else None
+            },
+            'summary': {
+                'total_comparisons': summary['total_comparisons'],
+                'plagiarized_comparisons': summary['plagiarized_comparisons'],
+                'plagiarism_percentage': plagiarism_percentage,
+                'clean_projects': summary['clean_projects'],
+                'flagged_projects': flagged_projects
+            },
+            'detailed_results': detailed_results,
+            'student_summary': student_summary,
+            'hierarchical_projects': hierarchical_projects,  # 🔥 ADD THIS
+            'exact_duplicates': batch.duplicate_report,
+            'historical_matches': historical_match_report(batch)
+        }, status=status.HTTP_200_OK)
 
     except BatchUpload.DoesNotExist:
         return Response({'error': 'Batch not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def label_plagiarism_result(request, result_id):
+    """Confirm or dismiss a flagged pair; labels become model training data"""
+    if request.user.role != 'faculty':
+        return Response({'error': 'Only faculty can label results'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        result = PlagiarismResult.objects.get(id=result_id, batch__faculty=request.user)
+    except PlagiarismResult.DoesNotExist:
+        return Response({'error': 'Result not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    label = request.data.get('label')
+    valid_labels = [choice for choice, _ in PlagiarismResult.LABEL_CHOICES]
+    if label not in valid_labels and label is not None:
+        return Response({'error': f"label must be one of {valid_labels} or null"},
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    result.faculty_label = label
+    result.labeled_by = request.user if label else None
+    result.labeled_at = timezone.now() if label else None
+    result.save(update_fields=['faculty_label', 'labeled_by', 'labeled_at'])
+
+    return Response({
+        'id': result.id,
+        'faculty_label': result.faculty_label,
+        'labeled_at': result.labeled_at
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def snippet_search(request):
+    """Find submissions in any of the user's batches that contain a code snippet, with matching line ranges"""
+    if request.user.role != 'faculty':
+        return Response({'error': 'Only faculty can search submissions'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    snippet = request.data.get('snippet') or ''
+    if not snippet.strip():
+        return Response({'error': 'snippet is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = int(request.data['limit']) if request.data.get('limit') else None
+    except (TypeError, ValueError):
+        return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Only the comment syntax depends on the language ('#' comments in Python)
+    file_ext = '.py' if str(request.data.get('language', '')).lower() in ('python', 'py', '.py') else ''
+    try:
+        results = search_snippet(
+            snippet, request.user, file_ext=file_ext, topic=request.data.get('topic') or None, limit=limit
+        )
+    except SnippetSearchError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(results, status=status.HTTP_200_OK)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def starter_code(request):
+    """List or upload instructor starter code, ignored when comparing submissions.
+
+    POST takes ``zip_file`` and an optional ``topic``: with a topic it applies
+    to every later batch of that topic, without one it is attached to
+    batches by ``starter_code_id``. The archive is fingerprinted once here.
+    """
+    if request.user.role != 'faculty':
+        return Response({'error': 'Only faculty can manage starter code'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    if request.method == 'POST':
+        zip_file = request.FILES.get('zip_file')
+        if not zip_file:
+            return Response({'error': 'ZIP file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            starter = store_starter_code(request.user, zip_file, request.data.get('topic', '').strip())
+        except StarterCodeError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        starter_codes = [starter]
+    else:
+        starter_codes = StarterCode.objects.filter(faculty=request.user).order_by('-uploaded_at')
+        if request.query_params.get('topic'):
+            starter_codes = starter_codes.filter(topic=request.query_params['topic'])
+
+    data = [
+        {
+            'id': starter.id,
+            'file_name': starter.file_name,
+            'topic': starter.topic,
+            'uploaded_at': starter.uploaded_at,
+            'summary': starter.summary
+        }
+        for starter in starter_codes
+    ]
+    if request.method == 'POST':
+        return Response(data[0], status=status.HTTP_201_CREATED)
+    return Response({'starter_codes': data}, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_faculty_batches(request):
@@ -345,7 +539,8 @@ def get_faculty_batches(request):
             'total_projects': total_projects,
             'plagiarism_cases': plagiarism_cases,
             'plagiarism_percentage': round((plagiarism_cases / total_projects * 100) if total_projects > 0 else 0, 1),
-            'status': 'Completed'
+            'status': batch.get_job_status_display(),
+            'progress_percentage': round(batch.job_progress * 100, 1)
         }
         batch_list.append(batch_data)
 
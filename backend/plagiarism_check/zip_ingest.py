@@ -0,0 +1,338 @@
+import io
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .utils import SKIP_DIRS, decode_source, is_code_file
+
+
+# Nested archives up to this size are read into memory, bigger ones are
+# opened as seekable streams on top of the parent archive
+DEFAULT_NESTED_ZIP_MEMORY_LIMIT = 64 * 1024 * 1024
+
+
+# How many archive levels below the uploaded ZIP are opened (course -> section -> student)
+DEFAULT_NESTED_ZIP_MAX_DEPTH = 3
+
+# Threads used to read top-level nested archives in parallel (zlib releases the GIL)
+DEFAULT_ZIP_SECTION_WORKERS = 4
+
+
+def _nested_zip_memory_limit():
+    return getattr(settings, 'NESTED_ZIP_MEMORY_LIMIT', DEFAULT_NESTED_ZIP_MEMORY_LIMIT)
+
+
+def _is_zip_member(info):
+    return info.filename.lower().endswith('.zip')
+
+
+def is_ignored_member(member_name):
+    """Skip OS metadata and common non-project directories inside archives"""
+    parts = member_name.split('/')
+    if parts[0] == '__MACOSX' or parts[-1].startswith('._'):
+        return True
+    return any(part in SKIP_DIRS for part in parts[:-1])
+
+
+def open_nested_zip(parent_zip, info):
+    """Open a ZIP member as a ZipFile without writing it to disk"""
+    if info.file_size <= _nested_zip_memory_limit():
+        return zipfile.ZipFile(io.BytesIO(parent_zip.read(info)))
+    # ZipExtFile is seekable when the parent archive is, so zipfile can
+    # read the inner central directory straight from the stream
+    return zipfile.ZipFile(parent_zip.open(info))
+
+
+def archive_stem(path):
+    """Student/project name for an archive path (file name without .zip)"""
+    return os.path.splitext(os.path.basename(path.rstrip('/')))[0]
+
+
+def list_members(zip_ref):
+    """Regular file members of an archive, without directories or ignored entries"""
+    return [
+        info for info in zip_ref.infolist()
+        if not info.is_dir() and not is_ignored_member(info.filename)
+    ]
+
+
+def build_manifest(members, prefix=''):
+    """Per-file manifest (path, size, CRC32) taken from the ZIP central directory"""
+    return [
+        {
+            'path': info.filename[len(prefix):],
+            'size': info.file_size,
+            'crc': info.CRC
+        }
+        for info in members
+    ]
+
+
+def read_project_files(zip_ref, members, prefix='', raw=False):
+    """Read project members into (path, content) pairs.
+
+    Code files are decoded to text and other files give None. With
+    ``raw=True`` every member is returned as bytes instead.
+    """
+    files = []
+    for info in members:
+        path = info.filename[len(prefix):]
+        if not raw and not is_code_file(path):
+            files.append((path, None))
+            continue
+
+        try:
+            data = zip_ref.read(info)
+            files.append((path, data if raw else decode_source(data)))
+        except Exception as e:
+            print(f"  ⚠️ Error reading {info.filename}: {e}")
+            if not raw:
+                files.append((path, None))
+    return files
+
+
+def find_project_root(members):
+    """Skip single wrapper folders (``Batch/``) in a list of archive members.
+
+    Returns ``(prefix, sub_dirs, direct_code)`` for the first level that holds
+    more than one folder or any entry of its own.
+    """
+    prefix = ''
+    while True:
+        sub_dirs = set()
+        has_direct_entries = False
+        for info in members:
+            rest = info.filename[len(prefix):]
+            if '/' in rest:
+                sub_dirs.add(rest.split('/', 1)[0])
+            else:
+                has_direct_entries = True
+
+        if len(sub_dirs) == 1 and not has_direct_entries:
+            prefix += sub_dirs.pop() + '/'
+            continue
+        break
+
+    direct_code = any(
+        '/' not in info.filename[len(prefix):] and is_code_file(info.filename)
+        for info in members
+    )
+    return prefix, sorted(sub_dirs), direct_code
+
+
+def group_folder_projects(members, default_name):
+    """Group loose archive members into (project_name, prefix, members) tuples.
+
+    If the project root holds code files directly, the whole tree is one
+    project; otherwise every sub-folder with code files is a separate
+    student project. Nested ZIP members are left out.
+    """
+    prefix, sub_dirs, direct_code = find_project_root(members)
+    loose = [info for info in members if not _is_zip_member(info)]
+
+    if direct_code:
+        name = prefix.split('/', 1)[0] if prefix else default_name
+        return [(name, prefix, loose)]
+
+    groups = []
+    for dir_name in sub_dirs:
+        dir_prefix = f"{prefix}{dir_name}/"
+        dir_members = [info for info in loose if info.filename.startswith(dir_prefix)]
+        if any(is_code_file(info.filename) for info in dir_members):
+            groups.append((dir_name, dir_prefix, dir_members))
+    return groups
+
+
+def is_container_archive(members):
+    """A nested archive is a section/container if it holds further ZIPs and no code of its own.
+
+    Any code file outside the nested ZIPs, at any depth, makes it a student
+    project that merely carries archives (e.g. ``alice/data.zip``).
+    """
+    has_zip = False
+    for info in members:
+        if _is_zip_member(info):
+            has_zip = True
+        elif is_code_file(info.filename):
+            return False
+    return has_zip
+
+
+class BatchArchiveReader:
+    """Recursive reader for batch archives (course -> section -> student).
+
+    Nested ZIPs are opened from memory up to ``max_depth`` levels below the
+    uploaded archive. Archives that only hold further ZIPs are sections and
+    are followed recursively; everything else becomes a student project.
+    Top-level nested archives are read in parallel threads. Section entries
+    found along the way are collected in ``self.sections``. With
+    ``manifest_only=True`` projects carry only their central-directory
+    manifest (``files`` is empty); project members are not read, but nested
+    archives are still opened, which decompresses them.
+    """
+
+    def __init__(self, zip_path, max_depth=None, workers=None, raw=False, manifest_only=False):
+        self.zip_path = zip_path
+        self.max_depth = max_depth or getattr(settings, 'NESTED_ZIP_MAX_DEPTH', DEFAULT_NESTED_ZIP_MAX_DEPTH)
+        self.workers = workers or getattr(settings, 'ZIP_SECTION_WORKERS', DEFAULT_ZIP_SECTION_WORKERS)
+        self.raw = raw
+        self.manifest_only = manifest_only
+        self.sections = {}
+        self._seen_names = set()
+
+    def _unique_name(self, name):
+        candidate = name
+        counter = 2
+        while candidate in self._seen_names:
+            candidate = f"{name}_{counter}"
+            counter += 1
+        self._seen_names.add(candidate)
+        return candidate
+
+    def _read_files(self, zip_ref, members, prefix=''):
+        return [] if self.manifest_only else read_project_files(zip_ref, members, prefix, raw=self.raw)
+
+    def _project(self, name, files, members, prefix, source, nested_info):
+        nested_info['file_count'] = len(members)
+        return {
+            'name': name,
+            'files': files,
+            'manifest': build_manifest(members, prefix),
+            'source': source,
+            'nested_info': nested_info
+        }
+
+    def _read_nested(self, zip_ref, info, parent, zip_chain, level):
+        """Open one nested ZIP (at nesting ``level``) and return (projects, section_entries)"""
+        member_chain = f"{zip_chain}!{info.filename}" if zip_chain else info.filename
+        try:
+            inner = open_nested_zip(zip_ref, info)
+        except (zipfile.BadZipFile, zipfile.LargeZipFile) as e:
+            print(f"    ❌ Error reading {member_chain}: {e}")
+            return [], {}
+
+        with inner:
+            inner_members = list_members(inner)
+
+            if level < self.max_depth and is_container_archive(inner_members):
+                print(f"  🗂️ Reading section: {member_chain}")
+                projects, sections = self._read_archive(inner, inner_members, archive_stem(info.filename), member_chain, level)
+                sections[member_chain] = {
+                    'type': 'section',
+                    'parent': parent,
+                    'level': level,
+                    'original_zip_path': member_chain,
+                    'projects': len(projects)
+                }
+                return projects, sections
+
+            print(f"  👨‍🎓 Reading student project: {member_chain}")
+            project = self._project(
+                archive_stem(info.filename),
+                self._read_files(inner, inner_members),
+                inner_members,
+                '',
+                f"{self.zip_path}!{member_chain}",
+                {
+                    'type': 'nested_zip',
+                    'parent': parent,
+                    'level': level,
+                    'original_zip_path': member_chain
+                }
+            )
+            return [project], {}
+
+    def _read_folders(self, zip_ref, members, archive_name, zip_chain, level):
+        """Student folders stored directly in an archive (instead of nested ZIPs)"""
+        parent = archive_name if zip_chain else 'root'
+        chain_prefix = f"{zip_chain}!" if zip_chain else ''
+        projects = []
+
+        for folder_name, prefix, folder_members in group_folder_projects(members, archive_name):
+            print(f"  📁 Found direct folder: {chain_prefix}{prefix or folder_name}")
+            projects.append(self._project(
+                folder_name,
+                self._read_files(zip_ref, folder_members, prefix),
+                folder_members,
+                prefix,
+                f"{self.zip_path}!{chain_prefix}{prefix}",
+                {
+                    'type': 'folder',
+                    'parent': parent,
+                    'level': level,
+                    'original_zip_path': f"{chain_prefix}{prefix}"
+                }
+            ))
+        return projects
+
+    def _read_archive(self, zip_ref, members, archive_name, zip_chain, level):
+        """Collect every project inside a nested archive, depth first"""
+        projects = []
+        sections = {}
+
+        for info in members:
+            if _is_zip_member(info):
+                nested_projects, nested_sections = self._read_nested(zip_ref, info, archive_name, zip_chain, level + 1)
+                projects.extend(nested_projects)
+                sections.update(nested_sections)
+
+        projects.extend(self._read_folders(zip_ref, members, archive_name, zip_chain, level))
+        return projects, sections
+
+    def estimate_project_count(self):
+        """Cheap project count from the outer central directory (sections count once)"""
+        with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
+            members = list_members(zip_ref)
+        nested = sum(1 for info in members if _is_zip_member(info))
+        return nested + len(group_folder_projects(members, archive_stem(self.zip_path)))
+
+    def __iter__(self):
+        print(f"📦 Reading batch ZIP: {self.zip_path} (max depth {self.max_depth})")
+
+        with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
+            members = list_members(zip_ref)
+            nested_zips = iter([info for info in members if _is_zip_member(info)])
+
+            # Top-level archives (sections or students) are independent: read
+            # them side by side, keeping a bounded window so memory stays flat
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                pending = deque()
+
+                def submit_next():
+                    info = next(nested_zips, None)
+                    if info is not None:
+                        pending.append(executor.submit(self._read_nested, zip_ref, info, 'root', '', 1))
+
+                for _ in range(self.workers * 2):
+                    submit_next()
+
+                while pending:
+                    nested_projects, nested_sections = pending.popleft().result()
+                    submit_next()
+                    self.sections.update(nested_sections)
+                    for project in nested_projects:
+                        project['name'] = self._unique_name(project['name'])
+                        yield project
+
+            for project in self._read_folders(zip_ref, members, archive_stem(self.zip_path), '', 0):
+                project['name'] = self._unique_name(project['name'])
+                yield project
+
+
+def iter_batch_projects(zip_path, max_depth=None, raw=False):
+    """Stream student projects out of a batch ZIP without extracting it.
+
+    Nested student ZIPs are opened in memory (or as seekable streams),
+    section archives are followed recursively up to ``max_depth`` levels,
+    and folders are grouped per student. Yields one dict per project::
+
+        {'name', 'files', 'manifest', 'source', 'nested_info'}
+
+    where ``files`` is a list of ``(path, content)`` pairs ready for
+    ``extract_code_features_from_files``. Raises ``zipfile.BadZipFile`` for
+    invalid archives.
+    """
+    return iter(BatchArchiveReader(zip_path, max_depth=max_depth, raw=raw))
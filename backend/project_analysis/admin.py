@@ -1,9 +1,9 @@
 from django.contrib import admin
-from .models import StudentProject, ProjectSummary
+from .models import StudentProject, ProjectSummary, AnalysisCacheEntry, FileAnalysis
 
 @admin.register(StudentProject)
 class StudentProjectAdmin(admin.ModelAdmin):
-    list_display = ['project_name', 'student', 'uploaded_at']
+    list_display = ['project_name', 'version', 'student', 'uploaded_at']
     list_filter = ['uploaded_at', 'student__role']
     search_fields = ['project_name', 'student__username', 'student__email']
     readonly_fields = ['uploaded_at']
@@ -32,3 +32,19 @@ class ProjectSummaryAdmin(admin.ModelAdmin):
     def features_count(self, obj):
         return len(obj.features)
     features_count.short_description = 'Features Count'
+
+@admin.register(AnalysisCacheEntry)
+class AnalysisCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['digest', 'analyzer_version', 'hits', 'created_at', 'last_used_at']
+    list_filter = ['analyzer_version']
+    search_fields = ['digest']
+    readonly_fields = ['created_at', 'last_used_at']
+    ordering = ['-last_used_at']
+
+@admin.register(FileAnalysis)
+class FileAnalysisAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'kind', 'analyzer_version', 'created_at', 'last_used_at']
+    list_filter = ['analyzer_version']
+    search_fields = ['content_hash']
+    readonly_fields = ['created_at', 'last_used_at']
+    ordering = ['-created_at']
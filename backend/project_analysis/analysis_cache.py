@@ -0,0 +1,142 @@
+import hashlib
+import json
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .file_index import INDEX_SKIP_DIRS
+from .incremental import save_project_version
+from .models import AnalysisCacheEntry
+from .utils import ANALYZER_VERSION
+
+
+DEFAULT_ANALYSIS_CACHE_MAX_ENTRIES = 5000
+DEFAULT_ANALYSIS_CACHE_MAX_AGE = 30 * 24 * 3600  # seconds
+
+# analyze_student_project() fields kept in the cache (not the per-upload project and version fields)
+CACHED_FIELDS = (
+    'tech_stack', 'tech_stack_confidence', 'libraries', 'features', 'file_stats', 'analysis_details',
+    'file_manifest'
+)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def analysis_cache_enabled():
+    return getattr(settings, 'ANALYSIS_CACHE_ENABLED', True)
+
+
+def _manifest_path(name):
+    """Member path with '/' separators and no leading './' or '/', or None if analyzers never see it"""
+    path = name.replace('\\', '/').lstrip('/')
+    while path.startswith('./'):
+        path = path[2:]
+    parts = path.split('/')
+    if not path or any(part in INDEX_SKIP_DIRS for part in parts[:-1]):
+        return None
+    return path
+
+
+def manifest_digest(zip_path):
+    """SHA-256 over the sorted (path, size, content SHA-256) manifest of an uploaded project ZIP.
+
+    Members are hashed straight from the archive, without extracting it.
+    Directory entries and files inside ``INDEX_SKIP_DIRS`` are left out,
+    since the analyzers never read them. Returns None for unreadable ZIPs.
+    """
+    manifest = []
+    try:
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            for info in zip_ref.infolist():
+                path = None if info.is_dir() else _manifest_path(info.filename)
+                if path is None:
+                    continue
+                content_hash = hashlib.sha256()
+                with zip_ref.open(info) as member:
+                    for chunk in iter(lambda: member.read(_HASH_CHUNK_SIZE), b''):
+                        content_hash.update(chunk)
+                manifest.append((path, info.file_size, content_hash.hexdigest()))
+    except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+        print(f"Could not compute manifest digest for {zip_path}: {e}")
+        return None
+
+    digest = hashlib.sha256()
+    for path, size, content_hash in sorted(manifest):
+        digest.update(f"{path}\0{size}\0{content_hash}\n".encode('utf-8', errors='surrogateescape'))
+    return digest.hexdigest()
+
+
+def get_cached_analysis(digest):
+    """Cached analysis fields for ``digest`` from the current analyzer version, or None"""
+    if not digest or not analysis_cache_enabled():
+        return None
+
+    max_age = getattr(settings, 'ANALYSIS_CACHE_MAX_AGE', DEFAULT_ANALYSIS_CACHE_MAX_AGE)
+    entry = AnalysisCacheEntry.objects.filter(
+        digest=digest,
+        analyzer_version=ANALYZER_VERSION,
+        created_at__gte=timezone.now() - timedelta(seconds=max_age)
+    ).only('id', 'result').first()
+    if entry is None:
+        return None
+
+    AnalysisCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    return entry.result
+
+
+def store_analysis(digest, analysis):
+    """Cache the fields of an ``analyze_student_project`` result under ``digest``"""
+    if not digest or not analysis_cache_enabled():
+        return
+
+    # Sets from the analyzers become sorted lists so the result is valid JSON
+    result = json.loads(json.dumps({field: analysis.get(field) for field in CACHED_FIELDS}, default=sorted))
+    AnalysisCacheEntry.objects.update_or_create(
+        digest=digest,
+        defaults={
+            'analyzer_version': ANALYZER_VERSION,
+            'result': result,
+            'hits': 0,
+            'created_at': timezone.now(),
+            'last_used_at': timezone.now()
+        }
+    )
+    evict_analysis_cache()
+
+
+def evict_analysis_cache():
+    """Drop entries from other analyzer versions or older than ANALYSIS_CACHE_MAX_AGE,
+    then the least recently used beyond ANALYSIS_CACHE_MAX_ENTRIES; returns the number deleted
+
+    Per-file results are evicted separately (``incremental.evict_file_analyses``).
+    """
+    max_age = getattr(settings, 'ANALYSIS_CACHE_MAX_AGE', DEFAULT_ANALYSIS_CACHE_MAX_AGE)
+    max_entries = getattr(settings, 'ANALYSIS_CACHE_MAX_ENTRIES', DEFAULT_ANALYSIS_CACHE_MAX_ENTRIES)
+
+    deleted, _ = AnalysisCacheEntry.objects.exclude(analyzer_version=ANALYZER_VERSION).delete()
+    expired, _ = AnalysisCacheEntry.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=max_age)
+    ).delete()
+    deleted += expired
+
+    stale_ids = list(
+        AnalysisCacheEntry.objects.order_by('-last_used_at', '-id').values_list('id', flat=True)[max_entries:]
+    )
+    if stale_ids:
+        overflow, _ = AnalysisCacheEntry.objects.filter(id__in=stale_ids).delete()
+        deleted += overflow
+    return deleted
+
+
+def save_cached_analysis(result, student, project_name, file_path):
+    """Save a cached result as the next version of the student's project; returns the analysis dict"""
+    project, version_diff = save_project_version(student, project_name, file_path, result)
+    return {
+        'project_id': project.id,
+        **result,
+        'version': project.version,
+        'version_diff': version_diff
+    }
@@ -0,0 +1,136 @@
+import hashlib
+import os
+
+
+# Directories no analyzer looks into
+INDEX_SKIP_DIRS = {'.git', '__pycache__', 'node_modules'}
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class IndexedFile:
+    """One file of a project: name, paths, lowercase extension and size"""
+
+    __slots__ = ('name', 'path', 'rel_path', 'dir_parts', 'ext', 'size')
+
+    def __init__(self, name, path, rel_path, dir_parts, size):
+        self.name = name
+        self.path = path
+        self.rel_path = rel_path
+        self.dir_parts = dir_parts
+        self.ext = os.path.splitext(name)[1].lower()
+        self.size = size
+
+    @property
+    def is_hidden(self):
+        """True for dotfiles and files below a hidden directory"""
+        return self.name.startswith('.') or any(part.startswith('.') for part in self.dir_parts)
+
+    def __repr__(self):
+        return f"IndexedFile({self.rel_path!r}, {self.size} bytes)"
+
+
+class ProjectFileIndex:
+    """Every file of an extracted project, found with a single ``os.scandir`` walk.
+
+    Files are listed top-down (a directory's files before its
+    subdirectories), skipping ``INDEX_SKIP_DIRS``. Decoded contents are read
+    on first access and cached, so each file is opened at most once however
+    many analyzers look at it. ``analyses`` holds each file's per-file
+    analysis results by relative path (see ``utils.file_analysis``).
+    """
+
+    def __init__(self, root):
+        self.root = str(root)
+        self.files = []
+        self._contents = {}
+        self._hashes = {}
+        self.analyses = {}
+        if os.path.isdir(self.root):
+            self._scan(self.root, ())
+
+    @classmethod
+    def ensure(cls, project):
+        """``project`` itself if it is already an index, else an index of that path"""
+        return project if isinstance(project, cls) else cls(project)
+
+    def _scan(self, directory, dir_parts):
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in INDEX_SKIP_DIRS:
+                                subdirectories.append(entry)
+                        elif entry.is_file():
+                            rel_path = '/'.join((*dir_parts, entry.name))
+                            self.files.append(IndexedFile(
+                                entry.name, entry.path, rel_path, dir_parts, entry.stat().st_size
+                            ))
+                    except OSError as e:
+                        print(f"Error accessing file {entry.path}: {e}")
+        except OSError as e:
+            print(f"Error scanning directory {directory}: {e}")
+            return
+
+        for subdirectory in subdirectories:
+            self._scan(subdirectory.path, (*dir_parts, subdirectory.name))
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def iter_files(self, extensions=None, skip_dirs=(), skip_hidden=False):
+        """Files filtered by extension, excluded directory names and hidden paths"""
+        for indexed_file in self.files:
+            if extensions is not None and indexed_file.ext not in extensions:
+                continue
+            if skip_dirs and any(part in skip_dirs for part in indexed_file.dir_parts):
+                continue
+            if skip_hidden and indexed_file.is_hidden:
+                continue
+            yield indexed_file
+
+    def named(self, name):
+        """Files called exactly ``name`` (e.g. ``package.json``), shallowest first"""
+        matches = [indexed_file for indexed_file in self.files if indexed_file.name == name]
+        return sorted(matches, key=lambda indexed_file: len(indexed_file.dir_parts))
+
+    def read_text(self, indexed_file):
+        """Decoded content (UTF-8, undecodable bytes dropped), cached; None if unreadable"""
+        path = indexed_file.path
+        if path not in self._contents:
+            try:
+                with open(path, 'rb') as f:
+                    self._contents[path] = f.read().decode('utf-8', errors='ignore')
+            except OSError as e:
+                print(f"Error reading file {path}: {e}")
+                self._contents[path] = None
+        return self._contents[path]
+
+    def content_hash(self, indexed_file, keep_text=False):
+        """SHA-256 of the raw bytes, cached; None if unreadable.
+
+        With ``keep_text`` the same read also fills the ``read_text`` cache,
+        so files that are about to be analyzed are still opened only once.
+        """
+        path = indexed_file.path
+        if path not in self._hashes:
+            digest = hashlib.sha256()
+            try:
+                with open(path, 'rb') as f:
+                    if keep_text and path not in self._contents:
+                        data = f.read()
+                        digest.update(data)
+                        self._contents[path] = data.decode('utf-8', errors='ignore')
+                    else:
+                        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                            digest.update(chunk)
+                self._hashes[path] = digest.hexdigest()
+            except OSError as e:
+                print(f"Error hashing file {path}: {e}")
+                self._hashes[path] = None
+        return self._hashes[path]
@@ -0,0 +1,189 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import FileAnalysis, ProjectSummary, StudentProject
+from .utils import ANALYZER_VERSION, analyze_file, file_analysis_kind
+
+
+DEFAULT_FILE_ANALYSIS_MAX_ENTRIES = 200000
+DEFAULT_FILE_ANALYSIS_MAX_AGE = 90 * 24 * 3600  # seconds since last use
+
+# Content hashes per lookup query (SQLite caps the number of query parameters)
+_LOOKUP_BATCH_SIZE = 500
+
+
+def hash_project_files(index):
+    """{relative path: content SHA-256} for every readable file of ``index``
+
+    Files that will be analyzed keep their decoded text from the same read.
+    """
+    manifest = {}
+    for indexed_file in index:
+        content_hash = index.content_hash(indexed_file, keep_text=bool(file_analysis_kind(indexed_file)))
+        if content_hash:
+            manifest[indexed_file.rel_path] = content_hash
+    return manifest
+
+
+def load_file_analyses(index, manifest):
+    """Fill ``index.analyses`` with stored per-file results for known contents,
+    analyze and store the rest; returns (reused, analyzed) file counts.
+
+    Results are keyed by content hash, analysis kind and ANALYZER_VERSION,
+    so a new version of a project (or any project sharing files with an
+    earlier upload) only analyzes the files whose content is new. Reused
+    rows are marked as used; storing new ones evicts stale rows.
+    """
+    wanted = {}
+    for indexed_file in index:
+        kind = file_analysis_kind(indexed_file)
+        content_hash = manifest.get(indexed_file.rel_path)
+        if kind and content_hash:
+            wanted.setdefault((content_hash, kind), []).append(indexed_file)
+
+    stored = {}
+    now = timezone.now()
+    hashes = sorted({content_hash for content_hash, _ in wanted})
+    for start in range(0, len(hashes), _LOOKUP_BATCH_SIZE):
+        rows = FileAnalysis.objects.filter(
+            analyzer_version=ANALYZER_VERSION,
+            content_hash__in=hashes[start:start + _LOOKUP_BATCH_SIZE]
+        )
+        found = len(stored)
+        for content_hash, kind, result in rows.values_list('content_hash', 'kind', 'result'):
+            stored[(content_hash, kind)] = result
+        if len(stored) > found:
+            rows.update(last_used_at=now)
+
+    reused = analyzed = 0
+    new_rows = []
+    for (content_hash, kind), files in wanted.items():
+        result = stored.get((content_hash, kind))
+        if result is None:
+            result = analyze_file(kind, index.read_text(files[0]))
+            new_rows.append(FileAnalysis(
+                content_hash=content_hash,
+                kind=kind,
+                analyzer_version=ANALYZER_VERSION,
+                result=result
+            ))
+            analyzed += 1
+            reused += len(files) - 1
+        else:
+            reused += len(files)
+        for indexed_file in files:
+            index.analyses[indexed_file.rel_path] = result
+
+    # Concurrent uploads may store the same content first; either row is correct
+    FileAnalysis.objects.bulk_create(new_rows, batch_size=_LOOKUP_BATCH_SIZE, ignore_conflicts=True)
+    if new_rows:
+        evict_file_analyses()
+    print(f"Per-file analyses: {reused} reused, {analyzed} analyzed")
+    return reused, analyzed
+
+
+def evict_file_analyses():
+    """Drop per-file results of other analyzer versions or unused for FILE_ANALYSIS_MAX_AGE,
+    then the least recently used beyond FILE_ANALYSIS_MAX_ENTRIES; returns the number deleted
+    """
+    max_age = getattr(settings, 'FILE_ANALYSIS_MAX_AGE', DEFAULT_FILE_ANALYSIS_MAX_AGE)
+    max_entries = getattr(settings, 'FILE_ANALYSIS_MAX_ENTRIES', DEFAULT_FILE_ANALYSIS_MAX_ENTRIES)
+
+    deleted, _ = FileAnalysis.objects.exclude(analyzer_version=ANALYZER_VERSION).delete()
+    expired, _ = FileAnalysis.objects.filter(
+        last_used_at__lt=timezone.now() - timedelta(seconds=max_age)
+    ).delete()
+    deleted += expired
+
+    stale_ids = list(
+        FileAnalysis.objects.order_by('-last_used_at', '-id').values_list('id', flat=True)[max_entries:]
+    )
+    for start in range(0, len(stale_ids), _LOOKUP_BATCH_SIZE):
+        overflow, _ = FileAnalysis.objects.filter(id__in=stale_ids[start:start + _LOOKUP_BATCH_SIZE]).delete()
+        deleted += overflow
+    return deleted
+
+
+def latest_project_version(student, project_name):
+    """The student's most recent upload named ``project_name``, or None"""
+    return StudentProject.objects.filter(
+        student=student, project_name=project_name
+    ).order_by('-version', '-uploaded_at').first()
+
+
+def _list_changes(old, new):
+    old, new = set(old or []), set(new or [])
+    return {'added': sorted(new - old), 'removed': sorted(old - new)}
+
+
+def diff_project_versions(previous_summary, analysis):
+    """Changes from ``previous_summary`` (a ProjectSummary) to a new analysis dict
+
+    File changes need a manifest on both sides; summaries saved before
+    manifests were recorded report ``files`` as None.
+    """
+    old_files = previous_summary.file_manifest or {}
+    new_files = analysis.get('file_manifest') or {}
+    files = None
+    if old_files and new_files:
+        modified = sorted(path for path in new_files.keys() & old_files.keys() if new_files[path] != old_files[path])
+        files = {
+            'added': sorted(new_files.keys() - old_files.keys()),
+            'removed': sorted(old_files.keys() - new_files.keys()),
+            'modified': modified,
+            'unchanged': len(new_files.keys() & old_files.keys()) - len(modified)
+        }
+
+    old_stats = previous_summary.file_stats or {}
+    new_stats = analysis.get('file_stats') or {}
+    return {
+        'files': files,
+        'tech_stack': _list_changes(previous_summary.tech_stack, analysis.get('tech_stack')),
+        'libraries': _list_changes(previous_summary.libraries, analysis.get('libraries')),
+        'features': _list_changes(previous_summary.features, analysis.get('features')),
+        'file_stats': {
+            key: round(new_stats.get(key, 0) - old_stats.get(key, 0), 2)
+            for key in ('total_files', 'code_files', 'total_size_mb')
+        }
+    }
+
+
+def save_project_version(student, project_name, file_path, analysis):
+    """Store ``analysis`` as the next version of the student's project
+
+    Returns the new project and the diff against the previous version
+    (None for a first upload).
+    """
+    previous = latest_project_version(student, project_name)
+    version_diff = None
+    if previous is not None:
+        try:
+            previous_summary = previous.summary
+        except ProjectSummary.DoesNotExist:
+            previous_summary = None
+        if previous_summary is not None:
+            version_diff = {
+                'previous_project_id': previous.id,
+                'previous_version': previous.version,
+                **diff_project_versions(previous_summary, analysis)
+            }
+
+    project = StudentProject.objects.create(
+        student=student,
+        project_name=project_name,
+        file_path=file_path,
+        version=previous.version + 1 if previous is not None else 1,
+        previous_version=previous
+    )
+    ProjectSummary.objects.create(
+        project=project,
+        tech_stack=analysis.get('tech_stack', []),
+        libraries=analysis.get('libraries', []),
+        features=analysis.get('features', []),
+        file_stats=analysis.get('file_stats', {}),
+        file_manifest=analysis.get('file_manifest', {}),
+        version_diff=version_diff
+    )
+    return project, version_diff
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_analysis', '0002_analysiscacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentproject',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='studentproject',
+            name='previous_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='next_versions', to='project_analysis.studentproject'),
+        ),
+        migrations.AddField(
+            model_name='projectsummary',
+            name='file_manifest',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name='projectsummary',
+            name='version_diff',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='FileAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('kind', models.CharField(max_length=100)),
+                ('analyzer_version', models.CharField(max_length=20)),
+                ('result', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('content_hash', 'kind', 'analyzer_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_analysis', '0003_incremental_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileanalysis',
+            name='last_used_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
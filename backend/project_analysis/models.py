@@ -8,6 +8,11 @@ class StudentProject(models.Model):
     project_name = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     file_path = models.CharField(max_length=500)
+    # Re-uploads under the same project name are numbered versions of one project
+    version = models.IntegerField(default=1)
+    previous_version = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.SET_NULL, related_name='next_versions'
+    )
     
     def __str__(self):
         return f"{self.student.username} - {self.project_name}"
@@ -18,7 +23,39 @@ class ProjectSummary(models.Model):
     libraries = models.JSONField(default=list)
     features = models.JSONField(default=list)
     file_stats = models.JSONField(default=dict)
+    # {relative path: content SHA-256} of the analyzed files, and the changes since the previous version
+    file_manifest = models.JSONField(default=dict)
+    version_diff = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"Summary for {self.project.project_name}"
+
+
+class AnalysisCacheEntry(models.Model):
+    """Analysis result for one project content digest (see analysis_cache.py)"""
+    digest = models.CharField(max_length=64, unique=True)
+    analyzer_version = models.CharField(max_length=20)
+    result = models.JSONField(default=dict)
+    hits = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.digest[:12]} (v{self.analyzer_version}, {self.hits} hits)"
+
+
+class FileAnalysis(models.Model):
+    """Per-file analysis result for one file content (see incremental.py)"""
+    content_hash = models.CharField(max_length=64)
+    kind = models.CharField(max_length=100)
+    analyzer_version = models.CharField(max_length=20)
+    result = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ['content_hash', 'kind', 'analyzer_version']
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} {self.kind} (v{self.analyzer_version})"
@@ -0,0 +1,188 @@
+import re
+from collections import defaultdict
+
+
+# Regex characters that end the literal prefix of a pattern
+_META_CHARS = set('.^$*+?{}[]()|\\')
+_QUANTIFIERS = set('*+?{')
+
+
+def _leading_literal(pattern):
+    """Literal text every match of ``pattern`` starts with, lowercased, and whether that is the whole pattern"""
+    literal = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            char, width = pattern[i + 1], 2
+        elif char in _META_CHARS:
+            break
+        else:
+            width = 1
+        # A quantified character is optional or repeated, so it is not part of the prefix
+        if i + width < len(pattern) and pattern[i + width] in _QUANTIFIERS:
+            break
+        literal.append(char.lower())
+        i += width
+    return ''.join(literal), i == len(pattern)
+
+
+def _trie_regex(words):
+    """Regex for a set of words factored as a prefix trie; matches the longest word at a position"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = None
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word ending here makes the rest optional (greedy, so longer words win)
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(trie)
+
+
+class PatternDetector:
+    """Many labeled regexes found with one keyword-automaton scan per text.
+
+    ``patterns`` maps a label (a feature or framework name) to regexes,
+    matched case-insensitively. Each regex must start with a literal
+    character. The literal prefixes are compiled into a single trie-shaped
+    regex, run once over each lowercased text; where a prefix occurs, the
+    regexes starting with it (or with a shorter prefix of it) are checked
+    with an anchored match, and each regex only until it is first found.
+    Overlapping matches are all seen (``sql`` inside ``mysql``), and texts
+    are never concatenated. Keep regex tails free of nested or unbounded
+    ``.*`` so the scan stays linear.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = {label: list(pattern_list) for label, pattern_list in patterns.items()}
+
+        self._pattern_labels = defaultdict(list)
+        prefixes = {}
+        self._compiled = {}
+        for label, pattern_list in self.patterns.items():
+            for pattern in pattern_list:
+                self._pattern_labels[pattern].append(label)
+                if pattern in prefixes:
+                    continue
+                prefix, is_literal = _leading_literal(pattern)
+                if not prefix:
+                    raise ValueError(f"Pattern {pattern!r} must start with a literal character")
+                prefixes[pattern] = prefix
+                if not is_literal:
+                    self._compiled[pattern] = re.compile(pattern, re.IGNORECASE)
+
+        # For each prefix the trie can report, every regex whose prefix it starts with
+        self._candidates = {
+            prefix: [pattern for pattern, other in prefixes.items() if prefix.startswith(other)]
+            for prefix in set(prefixes.values())
+        }
+        self._regex = re.compile('(?=(' + _trie_regex(self._candidates) + '))')
+
+    def scan(self, texts):
+        """Matched regexes per label across ``texts`` (an iterable of strings)"""
+        found = set()
+        total = len(self._pattern_labels)
+        for text in texts:
+            if not text:
+                continue
+            lowered = text.lower()
+            for match in self._regex.finditer(lowered):
+                for pattern in self._candidates[match.group(1)]:
+                    if pattern in found:
+                        continue
+                    compiled = self._compiled.get(pattern)
+                    if compiled is None or compiled.match(lowered, match.start()):
+                        found.add(pattern)
+                if len(found) == total:
+                    break
+            if len(found) == total:
+                break
+
+        matches = defaultdict(set)
+        for pattern in found:
+            for label in self._pattern_labels[pattern]:
+                matches[label].add(pattern)
+        return dict(matches)
+
+    def detect(self, texts, min_matches=1):
+        """Labels with at least ``min_matches`` distinct matching regexes, sorted"""
+        return sorted(label for label, found in self.scan(texts).items() if len(found) >= min_matches)
+
+
+# Framework usage in source files; one match is enough
+FRAMEWORK_PATTERNS = {
+    'React': [r'import\s+React', r'from\s+[\'"]react[\'"]', r'useState', r'useEffect'],
+    'Vue.js': [r'new\s+Vue\(', r'<template>', r'\{\{[^{}\n]*\}\}', r'@click'],
+    'Angular': [r'@Component', r'@Injectable', r'ngOnInit'],
+    'jQuery': [r'\$\(', r'jQuery\('],
+    'Bootstrap': [r'class=[\'"][^\'"\n]*btn', r'container-fluid'],
+    'Tailwind CSS': [r'class=[\'"][^\'"\n]*flex', r'bg-\w+', r'text-\w+'],
+    'Django': [r'from\s+django', r'models\.Model', r'render\(request'],
+    'Flask': [r'from\s+flask', r'@app\.route', r'Flask\(__name__\)'],
+    'Express.js': [r'express\(\)', r'app\.get\(', r'app\.listen\('],
+}
+
+# Project features; a feature needs FEATURE_MIN_MATCHES distinct keywords
+FEATURE_PATTERNS = {
+    'User Authentication': [
+        r'login', r'register', r'signin', r'signup', r'auth', r'password',
+        r'jwt', r'session', r'cookie', r'token', r'bcrypt'
+    ],
+    'Database Integration': [
+        r'database', r'db', r'sql', r'mysql', r'postgresql', r'sqlite',
+        r'mongodb', r'orm', r'model', r'schema', r'query'
+    ],
+    'REST API': [
+        r'api', r'rest', r'endpoint', r'json', r'ajax', r'fetch',
+        r'axios', r'request', r'response', r'http'
+    ],
+    'Real-time Features': [
+        r'websocket', r'socket\.io', r'realtime', r'live', r'streaming',
+        r'notification', r'push'
+    ],
+    'File Upload/Download': [
+        r'upload', r'download', r'file', r'multipart', r'storage',
+        r'attachment', r'media'
+    ],
+    'Search & Filtering': [
+        r'search', r'filter', r'query', r'pagination', r'sort',
+        r'elastic', r'lucene'
+    ],
+    'Admin Dashboard': [
+        r'admin', r'dashboard', r'management', r'panel', r'control',
+        r'statistics', r'analytics'
+    ],
+    'E-commerce Features': [
+        r'cart', r'shopping', r'payment', r'order', r'product',
+        r'checkout', r'stripe', r'paypal'
+    ],
+    'Social Features': [
+        r'comment', r'like', r'follow', r'friend', r'share',
+        r'social', r'profile', r'feed'
+    ],
+    'Email Integration': [
+        r'email', r'mail', r'smtp', r'sendgrid', r'mailgun',
+        r'newsletter', r'notification'
+    ],
+    'Security Features': [
+        r'csrf', r'xss', r'security', r'encryption', r'hash',
+        r'sanitize', r'validate', r'firewall'
+    ],
+    'Responsive Design': [
+        r'responsive', r'mobile', r'media\s*query', r'bootstrap',
+        r'flexbox', r'grid', r'tailwind'
+    ]
+}
+
+FEATURE_MIN_MATCHES = 2
+
+FRAMEWORK_DETECTOR = PatternDetector(FRAMEWORK_PATTERNS)
+FEATURE_DETECTOR = PatternDetector(FEATURE_PATTERNS)
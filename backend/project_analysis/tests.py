@@ -1,3 +1,218 @@
-from django.test import TestCase
+import os
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .analysis_cache import evict_analysis_cache, get_cached_analysis, manifest_digest, store_analysis
+from .file_index import ProjectFileIndex
+from .incremental import evict_file_analyses, hash_project_files, load_file_analyses, save_project_version
+from .models import AnalysisCacheEntry, FileAnalysis
+from .patterns import FEATURE_DETECTOR, FRAMEWORK_DETECTOR, PatternDetector
+from .utils import detect_project_features_enhanced, detect_tech_stack_enhanced, get_file_statistics
+
+
+class ProjectFileIndexTests(SimpleTestCase):
+    """One directory walk and one read per file, shared by every analyzer"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        files = {
+            'package.json': '{"dependencies": {"react": "^18.0.0"}}',
+            'src/App.jsx': 'import React, { useState } from "react"\nfetch("/api/login")\n',
+            'backend/models.py': 'from django.db import models\n# password session database query\n',
+            'node_modules/react/index.js': 'module.exports = {}',
+            '.env': 'SECRET=1',
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.root, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_index_skips_ignored_directories(self):
+        index = ProjectFileIndex(self.root)
+        self.assertEqual(
+            sorted(f.rel_path for f in index),
+            ['.env', 'backend/models.py', 'package.json', 'src/App.jsx']
+        )
+        self.assertEqual(index.named('package.json')[0].ext, '.json')
+        self.assertEqual([f.name for f in index.iter_files(skip_hidden=True)].count('.env'), 0)
+
+    def test_each_file_is_read_once(self):
+        index = ProjectFileIndex(self.root)
+        with mock.patch('builtins.open', wraps=open) as opened:
+            tech_stack = detect_tech_stack_enhanced(index)
+            features = detect_project_features_enhanced(index)
+            stats = get_file_statistics(index)
+
+        read_paths = [call.args[0] for call in opened.call_args_list]
+        self.assertEqual(len(read_paths), len(set(read_paths)))
+        self.assertIn('React', tech_stack['tech_stack'])
+        self.assertIn('Django', tech_stack['tech_stack'])
+        self.assertIn('User Authentication', features)
+        self.assertEqual(stats['total_files'], 3)
+
+
+class PatternDetectorTests(SimpleTestCase):
+    """The combined detector must report every pattern a separate re.search would"""
+
+    def test_overlapping_and_prefix_matches(self):
+        detector = PatternDetector({'Database': [r'sql', r'mysql'], 'Email': [r'mail', r'mailgun'],
+                                    'Responsive': [r'media\s*query'], 'Files': [r'media']})
+        found = detector.scan(['Uses MySQL and Mailgun', 'a @media query'])
+        self.assertEqual(found['Database'], {r'sql', r'mysql'})
+        self.assertEqual(found['Email'], {r'mail', r'mailgun'})
+        self.assertIn('Responsive', found)
+        self.assertIn('Files', found)
+
+    def test_frameworks_in_separate_files(self):
+        frameworks = FRAMEWORK_DETECTOR.detect([
+            '<button class="btn flex">{{ label }}</button>',
+            'from django.db import models',
+        ])
+        self.assertEqual(frameworks, ['Bootstrap', 'Django', 'Tailwind CSS', 'Vue.js'])
+
+    def test_feature_needs_two_keywords(self):
+        self.assertEqual(FEATURE_DETECTOR.detect(['login form'], min_matches=2), [])
+        self.assertIn('User Authentication', FEATURE_DETECTOR.detect(['login', 'password'], min_matches=2))
+
+    def test_long_minified_line(self):
+        line = '<div class="' + 'a ' * 200000 + '{{' * 50000
+        self.assertEqual(FRAMEWORK_DETECTOR.detect([line]), [])
+
+
+class AnalysisCacheTests(TestCase):
+    """Re-uploads of the same files are served from the digest cache"""
+
+    def make_zip(self, files):
+        handle, path = tempfile.mkstemp(suffix='.zip')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with zipfile.ZipFile(path, 'w') as zip_ref:
+            for name, content in files.items():
+                zip_ref.writestr(name, content)
+        return path
+
+    def test_digest_ignores_order_and_skipped_directories(self):
+        first = self.make_zip({'app.py': 'print(1)', 'src/a.js': 'x'})
+        second = self.make_zip({'src/a.js': 'x', 'node_modules/lib/index.js': 'y', 'app.py': 'print(1)'})
+        changed = self.make_zip({'app.py': 'print(2)', 'src/a.js': 'x'})
+
+        self.assertEqual(manifest_digest(first), manifest_digest(second))
+        self.assertNotEqual(manifest_digest(first), manifest_digest(changed))
+
+    def test_store_and_reuse(self):
+        store_analysis('a' * 64, {'project_id': 1, 'tech_stack': ['Python'], 'analysis_details': {'x': {'React'}}})
+        cached = get_cached_analysis('a' * 64)
+
+        self.assertEqual(cached['tech_stack'], ['Python'])
+        self.assertEqual(cached['analysis_details'], {'x': ['React']})
+        self.assertNotIn('project_id', cached)
+        self.assertEqual(AnalysisCacheEntry.objects.get().hits, 1)
+
+    def test_other_analyzer_version_is_a_miss(self):
+        store_analysis('b' * 64, {'tech_stack': ['Python']})
+        AnalysisCacheEntry.objects.update(analyzer_version='old')
+
+        self.assertIsNone(get_cached_analysis('b' * 64))
+        evict_analysis_cache()
+        self.assertFalse(AnalysisCacheEntry.objects.exists())
+
+    @override_settings(ANALYSIS_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_are_evicted(self):
+        for digest in ('c', 'd'):
+            store_analysis(digest * 64, {'tech_stack': []})
+        get_cached_analysis('c' * 64)
+        store_analysis('e' * 64, {'tech_stack': []})
+
+        self.assertEqual(
+            sorted(AnalysisCacheEntry.objects.values_list('digest', flat=True)),
+            ['c' * 64, 'e' * 64]
+        )
+
+
+class IncrementalAnalysisTests(TestCase):
+    """A new project version only analyzes files whose content changed"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.root = self.tmp_dir.name
+        self.write('app.py', 'from flask import Flask\napp = Flask(__name__)\n')
+        self.write('static/main.js', 'import axios from "axios"\n')
+        self.write('README.md', 'login and password')
+
+    def write(self, rel_path, content):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def load(self):
+        index = ProjectFileIndex(self.root)
+        manifest = hash_project_files(index)
+        return index, manifest, load_file_analyses(index, manifest)
+
+    def test_unchanged_files_are_not_reanalyzed(self):
+        _, _, counts = self.load()
+        self.assertEqual(counts, (0, 3))
+
+        self.write('app.py', 'from django.db import models\n')
+        index, _, counts = self.load()
+        self.assertEqual(counts, (2, 1))
+        self.assertEqual(FileAnalysis.objects.count(), 4)
+        self.assertIn('Django', detect_tech_stack_enhanced(index)['tech_stack'])
+        self.assertIn('User Authentication', detect_project_features_enhanced(index))
+
+    @override_settings(FILE_ANALYSIS_MAX_ENTRIES=3)
+    def test_least_recently_used_files_are_evicted(self):
+        self.load()
+        self.write('app.py', 'from django.db import models\n')
+        self.load()
+
+        self.assertEqual(FileAnalysis.objects.count(), 3)
+        _, manifest, _ = self.load()
+        self.assertEqual(
+            sorted(FileAnalysis.objects.values_list('content_hash', flat=True)), sorted(manifest.values())
+        )
+
+    def test_old_analyzer_versions_are_evicted(self):
+        self.load()
+        FileAnalysis.objects.update(analyzer_version='old')
+        self.assertEqual(evict_file_analyses(), 3)
+
+    def test_stored_results_match_a_fresh_analysis(self):
+        self.load()
+        index, _, _ = self.load()
+        fresh = ProjectFileIndex(self.root)
+
+        self.assertEqual(detect_tech_stack_enhanced(index)['tech_stack'], detect_tech_stack_enhanced(fresh)['tech_stack'])
+        self.assertEqual(detect_project_features_enhanced(index), detect_project_features_enhanced(fresh))
+
+    def test_new_version_reports_diff(self):
+        student = get_user_model().objects.create_user(username='student', password='x')
+        first, diff = save_project_version(student, 'Shop', '/tmp/a.zip', {
+            'tech_stack': ['Python'], 'libraries': ['flask'], 'features': [],
+            'file_stats': {'total_files': 2, 'code_files': 2, 'total_size_mb': 0.1},
+            'file_manifest': {'app.py': 'a', 'util.py': 'b'}
+        })
+        self.assertIsNone(diff)
+
+        second, diff = save_project_version(student, 'Shop', '/tmp/b.zip', {
+            'tech_stack': ['Python', 'React'], 'libraries': ['flask'], 'features': [],
+            'file_stats': {'total_files': 2, 'code_files': 2, 'total_size_mb': 0.1},
+            'file_manifest': {'app.py': 'c', 'src/App.jsx': 'd'}
+        })
+        self.assertEqual((second.version, second.previous_version), (2, first))
+        self.assertEqual(diff['previous_project_id'], first.id)
+        self.assertEqual(diff['files'], {'added': ['src/App.jsx'], 'removed': ['util.py'],
+                                         'modified': ['app.py'], 'unchanged': 0})
+        self.assertEqual(diff['tech_stack'], {'added': ['React'], 'removed': []})
+        self.assertEqual(second.summary.version_diff, diff)
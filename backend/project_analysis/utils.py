@@ -408,11 +408,90 @@ import zipfile
 import shutil
 from pathlib import Path
 from collections import Counter, defaultdict
+from .file_index import ProjectFileIndex
+from .patterns import FEATURE_DETECTOR, FEATURE_MIN_MATCHES, FRAMEWORK_DETECTOR
 from .models import StudentProject, ProjectSummary
 
+# Bump whenever analyzer output changes; cached analyses of other versions are discarded
+ANALYZER_VERSION = '2'
+
+# Files whose content the per-file analyses look at
+DEPENDENCY_FILES = ('package.json', 'requirements.txt', 'pom.xml', 'composer.json')
+CODE_FILE_SUFFIXES = ('.py', '.js', '.jsx', '.ts', '.tsx', '.vue', '.html', '.css')
+FEATURE_EXTENSIONS = {'.py', '.js', '.jsx', '.html', '.css', '.md', '.txt', '.vue', '.ts'}
+JS_EXTENSIONS = {'.js', '.jsx', '.ts', '.tsx'}
+
+JS_IMPORT_PATTERNS = [
+    re.compile(r'import\s+.*\s+from\s+[\'"]([^\'"]+)[\'"]'),  # import ... from 'lib'
+    re.compile(r'import\s+[\'"]([^\'"]+)[\'"]'),              # import 'lib'
+    re.compile(r'require\([\'"]([^\'"]+)[\'"]\)'),           # require('lib')
+]
+PY_IMPORT_PATTERNS = [
+    re.compile(r'import\s+(\w+)'),                           # import lib
+    re.compile(r'from\s+(\w+)\s+import'),                    # from lib import ...
+]
+
+
+def file_analysis_kind(indexed_file):
+    """Which per-file analyses apply to ``indexed_file``, as a short key ('' if none do)
+
+    The key depends only on the file name, so two files with the same
+    content and the same kind always get the same result.
+    """
+    parts = []
+    if indexed_file.name in DEPENDENCY_FILES:
+        parts.append(f'dependencies:{indexed_file.name}')
+    if indexed_file.name.endswith(CODE_FILE_SUFFIXES):
+        parts.append('frameworks')
+    if indexed_file.ext in FEATURE_EXTENSIONS:
+        parts.append('features')
+    if indexed_file.ext in JS_EXTENSIONS:
+        parts.append('imports:js')
+    elif indexed_file.ext == '.py':
+        parts.append('imports:py')
+    return '+'.join(parts)
+
+
+def analyze_file(kind, text):
+    """JSON-ready results of the analyses in ``kind`` for one file's text"""
+    result = {}
+    if not kind or text is None:
+        return result
+    
+    for part in kind.split('+'):
+        if part == 'frameworks':
+            result['frameworks'] = FRAMEWORK_DETECTOR.detect([text])
+        elif part == 'features':
+            result['features'] = {
+                label: sorted(found) for label, found in FEATURE_DETECTOR.scan([text]).items()
+            }
+        elif part.startswith('imports:'):
+            result['imports'] = sorted(extract_imports(part.split(':', 1)[1], text))
+        elif part.startswith('dependencies:'):
+            result['dependencies'] = parse_dependency_file(part.split(':', 1)[1], text)
+    return result
+
+
+def file_analysis(index, indexed_file):
+    """Per-file results for ``indexed_file``, analyzed on first use and kept on the index
+
+    ``incremental.load_file_analyses`` pre-fills them from stored results
+    so unchanged files of a new project version are not analyzed again.
+    """
+    result = index.analyses.get(indexed_file.rel_path)
+    if result is None:
+        kind = file_analysis_kind(indexed_file)
+        result = analyze_file(kind, index.read_text(indexed_file)) if kind else {}
+        index.analyses[indexed_file.rel_path] = result
+    return result
+
 # Enhanced tech stack detection
 def detect_tech_stack_enhanced(project_path):
-    """Enhanced tech stack detection with dependency file analysis"""
+    """Enhanced tech stack detection with dependency file analysis
+
+    ``project_path`` may be a directory or a ``ProjectFileIndex`` of it.
+    """
+    index = ProjectFileIndex.ensure(project_path)
     tech_stack = set()
     confidence_scores = defaultdict(int)
     
@@ -451,30 +530,26 @@ def detect_tech_stack_enhanced(project_path):
         'ASP.NET': ['*.csproj', 'appsettings.json'],
     }
     
-    # Scan all files
-    all_files = []
-    for root, dirs, files in os.walk(project_path):
-        dirs[:] = [d for d in dirs if d not in {'.git', '__pycache__', 'node_modules', '.vscode', 'build', 'dist'}]
-        for file in files:
-            file_path = os.path.join(root, file)
-            all_files.append((file, file_path))
+    all_files = list(index.iter_files(skip_dirs={'.vscode', 'build', 'dist'}))
+    file_names = {f.name for f in all_files}
+    file_extensions = Counter(f.ext for f in all_files)
     
     # Basic file extension analysis
-    for file, file_path in all_files:
-        for tech, extensions in file_indicators.items():
-            if any(file.lower().endswith(ext) for ext in extensions):
-                tech_stack.add(tech)
-                confidence_scores[tech] += 1
+    for tech, extensions in file_indicators.items():
+        count = sum(file_extensions[ext] for ext in extensions)
+        if count:
+            tech_stack.add(tech)
+            confidence_scores[tech] += count
     
     # Framework detection by specific files
     for framework, indicators in framework_files.items():
         found_indicators = 0
         for indicator in indicators:
             if indicator.startswith('.'):  # Extension
-                if any(f[0].endswith(indicator) for f in all_files):
+                if file_extensions[indicator]:
                     found_indicators += 1
             else:  # Specific file
-                if any(indicator in f for f in all_files):
+                if indicator in file_names:
                     found_indicators += 1
         
         if found_indicators >= 2:  # Need at least 2 indicators
@@ -482,11 +557,11 @@ def detect_tech_stack_enhanced(project_path):
             confidence_scores[framework] += found_indicators * 2
     
     # Dependency file analysis
-    dependency_analysis = analyze_dependency_files(project_path, all_files)
+    dependency_analysis = analyze_dependency_files(index, all_files)
     tech_stack.update(dependency_analysis['frameworks'])
     
     # Content-based detection
-    content_analysis = analyze_file_contents(all_files)
+    content_analysis = analyze_file_contents(index, all_files)
     tech_stack.update(content_analysis['frameworks'])
     
     return {
@@ -498,147 +573,141 @@ def detect_tech_stack_enhanced(project_path):
         }
     }
 
-def analyze_dependency_files(project_path, all_files):
-    """Analyze dependency files for accurate tech stack detection"""
+def analyze_dependency_files(index, all_files):
+    """Analyze dependency files for accurate tech stack detection
+
+    ``all_files`` are ``IndexedFile`` entries of ``index``; each dependency
+    file is parsed once by ``parse_dependency_file`` (see ``file_analysis``).
+    """
     frameworks = set()
     libraries = []
     
-    # package.json analysis
-    for file, file_path in all_files:
-        if file == 'package.json':
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    package_data = json.load(f)
-                    
-                    # Extract dependencies
-                    all_deps = {}
-                    all_deps.update(package_data.get('dependencies', {}))
-                    all_deps.update(package_data.get('devDependencies', {}))
-                    
-                    libraries.extend(all_deps.keys())
-                    
-                    # Framework detection from dependencies
-                    if 'react' in all_deps:
-                        frameworks.add('React')
-                    if 'vue' in all_deps:
-                        frameworks.add('Vue.js')
-                    if '@angular/core' in all_deps:
-                        frameworks.add('Angular')
-                    if 'express' in all_deps:
-                        frameworks.add('Express.js')
-                    if 'next' in all_deps:
-                        frameworks.add('Next.js')
-                    if 'nuxt' in all_deps:
-                        frameworks.add('Nuxt.js')
-                    if 'svelte' in all_deps:
-                        frameworks.add('Svelte')
-                        
-            except Exception as e:
-                print(f"Error parsing package.json: {e}")
+    for indexed_file in all_files:
+        if indexed_file.name in DEPENDENCY_FILES:
+            dependencies = file_analysis(index, indexed_file).get('dependencies')
+            if dependencies:
+                frameworks.update(dependencies['frameworks'])
+                libraries.extend(dependencies['libraries'])
     
-    # requirements.txt analysis
-    for file, file_path in all_files:
-        if file == 'requirements.txt':
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            lib_name = re.split(r'[>=<]', line)[0].strip()
-                            libraries.append(lib_name)
-                            
-                            # Framework detection from requirements
-                            if lib_name.lower() in ['django']:
-                                frameworks.add('Django')
-                            elif lib_name.lower() in ['flask']:
-                                frameworks.add('Flask')
-                            elif lib_name.lower() in ['fastapi']:
-                                frameworks.add('FastAPI')
-                            elif lib_name.lower() in ['tornado']:
-                                frameworks.add('Tornado')
-                                
-            except Exception as e:
-                print(f"Error parsing requirements.txt: {e}")
+    return {
+        'frameworks': frameworks,
+        'libraries': list(set(libraries))
+    }
+
+def parse_dependency_file(name, text):
+    """Frameworks and libraries declared in one dependency file called ``name``"""
+    frameworks = set()
+    libraries = []
     
-    # pom.xml analysis (Maven)
-    for file, file_path in all_files:
-        if file == 'pom.xml':
-            try:
-                tree = ET.parse(file_path)
-                root = tree.getroot()
+    # package.json analysis
+    if name == 'package.json':
+        try:
+            package_data = json.loads(text)
+            
+            # Extract dependencies
+            all_deps = {}
+            all_deps.update(package_data.get('dependencies', {}))
+            all_deps.update(package_data.get('devDependencies', {}))
+            
+            libraries.extend(all_deps.keys())
+            
+            # Framework detection from dependencies
+            if 'react' in all_deps:
+                frameworks.add('React')
+            if 'vue' in all_deps:
+                frameworks.add('Vue.js')
+            if '@angular/core' in all_deps:
+                frameworks.add('Angular')
+            if 'express' in all_deps:
+                frameworks.add('Express.js')
+            if 'next' in all_deps:
+                frameworks.add('Next.js')
+            if 'nuxt' in all_deps:
+                frameworks.add('Nuxt.js')
+            if 'svelte' in all_deps:
+                frameworks.add('Svelte')
                 
-                # Extract dependencies
-                for dependency in root.findall('.//{http://maven.apache.org/POM/4.0.0}dependency'):
-                    artifact_id = dependency.find('{http://maven.apache.org/POM/4.0.0}artifactId')
-                    if artifact_id is not None:
-                        lib_name = artifact_id.text
-                        libraries.append(lib_name)
-                        
-                        # Framework detection
-                        if 'spring-boot' in lib_name:
-                            frameworks.add('Spring Boot')
-                        elif 'spring' in lib_name:
-                            frameworks.add('Spring Framework')
-                            
-            except Exception as e:
-                print(f"Error parsing pom.xml: {e}")
+        except Exception as e:
+            print(f"Error parsing package.json: {e}")
     
-    # Composer.json analysis (PHP)
-    for file, file_path in all_files:
-        if file == 'composer.json':
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    composer_data = json.load(f)
-                    
-                    require = composer_data.get('require', {})
-                    require_dev = composer_data.get('require-dev', {})
+    # requirements.txt analysis
+    elif name == 'requirements.txt':
+        try:
+            for line in text.splitlines():
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    lib_name = re.split(r'[>=<]', line)[0].strip()
+                    libraries.append(lib_name)
                     
-                    all_deps = {**require, **require_dev}
-                    libraries.extend(all_deps.keys())
+                    # Framework detection from requirements
+                    if lib_name.lower() in ['django']:
+                        frameworks.add('Django')
+                    elif lib_name.lower() in ['flask']:
+                        frameworks.add('Flask')
+                    elif lib_name.lower() in ['fastapi']:
+                        frameworks.add('FastAPI')
+                    elif lib_name.lower() in ['tornado']:
+                        frameworks.add('Tornado')
+                        
+        except Exception as e:
+            print(f"Error parsing requirements.txt: {e}")
+    
+    # pom.xml analysis (Maven)
+    elif name == 'pom.xml':
+        try:
+            root = ET.fromstring(text)
+            
+            # Extract dependencies
+            for dependency in root.findall('.//{http://maven.apache.org/POM/4.0.0}dependency'):
+                artifact_id = dependency.find('{http://maven.apache.org/POM/4.0.0}artifactId')
+                if artifact_id is not None:
+                    lib_name = artifact_id.text
+                    libraries.append(lib_name)
                     
                     # Framework detection
-                    if 'laravel/framework' in all_deps:
-                        frameworks.add('Laravel')
-                    elif 'symfony/framework-bundle' in all_deps:
-                        frameworks.add('Symfony')
+                    if 'spring-boot' in lib_name:
+                        frameworks.add('Spring Boot')
+                    elif 'spring' in lib_name:
+                        frameworks.add('Spring Framework')
                         
-            except Exception as e:
-                print(f"Error parsing composer.json: {e}")
+        except Exception as e:
+            print(f"Error parsing pom.xml: {e}")
+    
+    # Composer.json analysis (PHP)
+    elif name == 'composer.json':
+        try:
+            composer_data = json.loads(text)
+            
+            require = composer_data.get('require', {})
+            require_dev = composer_data.get('require-dev', {})
+            
+            all_deps = {**require, **require_dev}
+            libraries.extend(all_deps.keys())
+            
+            # Framework detection
+            if 'laravel/framework' in all_deps:
+                frameworks.add('Laravel')
+            elif 'symfony/framework-bundle' in all_deps:
+                frameworks.add('Symfony')
+                
+        except Exception as e:
+            print(f"Error parsing composer.json: {e}")
     
     return {
-        'frameworks': frameworks,
-        'libraries': list(set(libraries))
+        'frameworks': sorted(frameworks),
+        'libraries': libraries
     }
 
-def analyze_file_contents(all_files):
-    """Analyze file contents for framework-specific patterns"""
+def analyze_file_contents(index, all_files):
+    """Analyze file contents for framework-specific patterns
+
+    Each code file is scanned once by the combined ``FRAMEWORK_DETECTOR``
+    (see ``file_analysis``) and the frameworks of all files are merged.
+    """
     frameworks = set()
-    patterns = {
-        'React': [r'import\s+React', r'from\s+[\'"]react[\'"]', r'useState', r'useEffect'],
-        'Vue.js': [r'new\s+Vue\(', r'<template>', r'{{.*}}', r'@click'],
-        'Angular': [r'@Component', r'@Injectable', r'ngOnInit'],
-        'jQuery': [r'\$\(', r'jQuery\('],
-        'Bootstrap': [r'class=[\'"].*btn.*[\'"]', r'container-fluid'],
-        'Tailwind CSS': [r'class=[\'"].*flex.*[\'"]', r'bg-\w+', r'text-\w+'],
-        'Django': [r'from\s+django', r'models\.Model', r'render\(request'],
-        'Flask': [r'from\s+flask', r'@app\.route', r'Flask\(__name__\)'],
-        'Express.js': [r'express\(\)', r'app\.get\(', r'app\.listen\('],
-    }
-    
-    for file, file_path in all_files:
-        if any(file.endswith(ext) for ext in ['.py', '.js', '.jsx', '.ts', '.tsx', '.vue', '.html', '.css']):
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    
-                    for framework, pattern_list in patterns.items():
-                        for pattern in pattern_list:
-                            if re.search(pattern, content, re.IGNORECASE):
-                                frameworks.add(framework)
-                                break
-                                
-            except Exception as e:
-                continue
+    for indexed_file in all_files:
+        if indexed_file.name.endswith(CODE_FILE_SUFFIXES):
+            frameworks.update(file_analysis(index, indexed_file).get('frameworks', []))
     
     return {'frameworks': frameworks}
 
@@ -667,57 +736,29 @@ def analyze_file_contents(all_files):
 
 def extract_libraries_enhanced(project_path):
     """Enhanced library extraction from multiple sources"""
+    index = ProjectFileIndex.ensure(project_path)
     libraries = set()
     
-    print(f"Extracting libraries from: {project_path}")
+    print(f"Extracting libraries from: {index.root}")
     
     try:
         # Method 1: From package.json
-        for root, dirs, files in os.walk(project_path):
-            dirs[:] = [d for d in dirs if d not in {'.git', '__pycache__', 'node_modules'}]
+        for indexed_file in index.named('package.json'):
+            print(f"Found package.json at: {indexed_file.path}")
             
-            if 'package.json' in files:
-                package_json_path = os.path.join(root, 'package.json')
-                print(f"Found package.json at: {package_json_path}")
-                
-                try:
-                    with open(package_json_path, 'r', encoding='utf-8') as f:
-                        package_data = json.load(f)
-                        
-                        # Extract dependencies
-                        deps = package_data.get('dependencies', {})
-                        dev_deps = package_data.get('devDependencies', {})
-                        
-                        for lib in deps.keys():
-                            libraries.add(lib)
-                        for lib in dev_deps.keys():
-                            libraries.add(lib)
-                        
-                        print(f"Found {len(deps)} dependencies and {len(dev_deps)} devDependencies")
-                        
-                except Exception as e:
-                    print(f"Error reading package.json: {e}")
+            dependencies = file_analysis(index, indexed_file).get('dependencies', {})
+            libraries.update(dependencies.get('libraries', []))
+            print(f"Found {len(dependencies.get('libraries', []))} dependencies and devDependencies")
         
         # Method 2: From requirements.txt
-        for root, dirs, files in os.walk(project_path):
-            if 'requirements.txt' in files:
-                req_path = os.path.join(root, 'requirements.txt')
-                print(f"Found requirements.txt at: {req_path}")
-                
-                try:
-                    with open(req_path, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            line = line.strip()
-                            if line and not line.startswith('#'):
-                                # Extract package name (before version specifiers)
-                                lib_name = re.split(r'[>=<]', line)[0].strip()
-                                libraries.add(lib_name)
-                                
-                except Exception as e:
-                    print(f"Error reading requirements.txt: {e}")
+        for indexed_file in index.named('requirements.txt'):
+            print(f"Found requirements.txt at: {indexed_file.path}")
+            
+            dependencies = file_analysis(index, indexed_file).get('dependencies', {})
+            libraries.update(dependencies.get('libraries', []))
         
         # Method 3: Scan code files for imports
-        code_libs = extract_libraries_from_imports(project_path)
+        code_libs = extract_libraries_from_imports(index)
         libraries.update(code_libs)
         
         print(f"Total libraries found: {len(libraries)}")
@@ -729,58 +770,38 @@ def extract_libraries_enhanced(project_path):
 
 def extract_libraries_from_imports(project_path):
     """Extract libraries from import statements in code files"""
+    index = ProjectFileIndex.ensure(project_path)
     libraries = set()
     
-    # JavaScript/TypeScript import patterns
-    js_patterns = [
-        r'import\s+.*\s+from\s+[\'"]([^\'"]+)[\'"]',  # import ... from 'lib'
-        r'import\s+[\'"]([^\'"]+)[\'"]',              # import 'lib'
-        r'require\([\'"]([^\'"]+)[\'"]\)',           # require('lib')
-    ]
-    
-    # Python import patterns  
-    py_patterns = [
-        r'import\s+(\w+)',                           # import lib
-        r'from\s+(\w+)\s+import',                    # from lib import ...
-    ]
-    
     try:
-        for root, dirs, files in os.walk(project_path):
-            dirs[:] = [d for d in dirs if d not in {'.git', '__pycache__', 'node_modules'}]
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_ext = os.path.splitext(file)[1].lower()
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        
-                        if file_ext in {'.js', '.jsx', '.ts', '.tsx'}:
-                            # Process JavaScript/TypeScript files
-                            for pattern in js_patterns:
-                                matches = re.findall(pattern, content)
-                                for match in matches:
-                                    # Extract package name (before first '/')
-                                    package = match.split('/')[0]
-                                    if not package.startswith('.'):  # Skip relative imports
-                                        libraries.add(package)
-                        
-                        elif file_ext == '.py':
-                            # Process Python files
-                            for pattern in py_patterns:
-                                matches = re.findall(pattern, content)
-                                for match in matches:
-                                    libraries.add(match)
-                                    
-                except Exception:
-                    continue
+        for indexed_file in index.iter_files(extensions=JS_EXTENSIONS | {'.py'}):
+            libraries.update(file_analysis(index, indexed_file).get('imports', []))
     
     except Exception as e:
         print(f"Error scanning imports: {e}")
     
     return libraries
 
+def extract_imports(language, content):
+    """Top-level packages imported by one 'js' or 'py' source text"""
+    libraries = set()
+    
+    if language == 'js':
+        # Process JavaScript/TypeScript files
+        for pattern in JS_IMPORT_PATTERNS:
+            for match in pattern.findall(content):
+                # Extract package name (before first '/')
+                package = match.split('/')[0]
+                if not package.startswith('.'):  # Skip relative imports
+                    libraries.add(package)
+    
+    else:
+        # Process Python files
+        for pattern in PY_IMPORT_PATTERNS:
+            libraries.update(pattern.findall(content))
+    
+    return libraries
+
 
 def extract_python_imports(file_path):
     """Extract Python imports using AST"""
@@ -833,86 +854,20 @@ def extract_js_imports(file_path):
     return imports
 
 def detect_project_features_enhanced(project_path):
-    """Enhanced feature detection with better pattern matching"""
-    features = set()
-    
-    # Define comprehensive feature patterns
-    feature_patterns = {
-        'User Authentication': [
-            r'login', r'register', r'signin', r'signup', r'auth', r'password',
-            r'jwt', r'session', r'cookie', r'token', r'bcrypt'
-        ],
-        'Database Integration': [
-            r'database', r'db', r'sql', r'mysql', r'postgresql', r'sqlite',
-            r'mongodb', r'orm', r'model', r'schema', r'query'
-        ],
-        'REST API': [
-            r'api', r'rest', r'endpoint', r'json', r'ajax', r'fetch',
-            r'axios', r'request', r'response', r'http'
-        ],
-        'Real-time Features': [
-            r'websocket', r'socket\.io', r'realtime', r'live', r'streaming',
-            r'notification', r'push'
-        ],
-        'File Upload/Download': [
-            r'upload', r'download', r'file', r'multipart', r'storage',
-            r'attachment', r'media'
-        ],
-        'Search & Filtering': [
-            r'search', r'filter', r'query', r'pagination', r'sort',
-            r'elastic', r'lucene'
-        ],
-        'Admin Dashboard': [
-            r'admin', r'dashboard', r'management', r'panel', r'control',
-            r'statistics', r'analytics'
-        ],
-        'E-commerce Features': [
-            r'cart', r'shopping', r'payment', r'order', r'product',
-            r'checkout', r'stripe', r'paypal'
-        ],
-        'Social Features': [
-            r'comment', r'like', r'follow', r'friend', r'share',
-            r'social', r'profile', r'feed'
-        ],
-        'Email Integration': [
-            r'email', r'mail', r'smtp', r'sendgrid', r'mailgun',
-            r'newsletter', r'notification'
-        ],
-        'Security Features': [
-            r'csrf', r'xss', r'security', r'encryption', r'hash',
-            r'sanitize', r'validate', r'firewall'
-        ],
-        'Responsive Design': [
-            r'responsive', r'mobile', r'media\s*query', r'bootstrap',
-            r'flexbox', r'grid', r'tailwind'
-        ]
-    }
-    
-    # Collect all content
-    all_content = ""
-    for root, dirs, files in os.walk(project_path):
-        dirs[:] = [d for d in dirs if d not in {'.git', '__pycache__', 'node_modules'}]
-        for file in files:
-            if any(file.lower().endswith(ext) for ext in ['.py', '.js', '.jsx', '.html', '.css', '.md', '.txt', '.vue', '.ts']):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        all_content += f.read().lower() + " "
-                except:
-                    continue
-    
-    # Check for features
-    for feature, patterns in feature_patterns.items():
-        matches = 0
-        for pattern in patterns:
-            if re.search(pattern, all_content, re.IGNORECASE):
-                matches += 1
-        
-        # Require at least 2 pattern matches for confidence
-        if matches >= 2:
-            features.add(feature)
-    
-    return sorted(list(features))
+    """Enhanced feature detection with better pattern matching
+
+    Files are scanned one at a time by the combined ``FEATURE_DETECTOR``
+    (see ``file_analysis``); a feature needs at least FEATURE_MIN_MATCHES
+    of its keywords across all files.
+    """
+    index = ProjectFileIndex.ensure(project_path)
+    
+    found = defaultdict(set)
+    for indexed_file in index.iter_files(extensions=FEATURE_EXTENSIONS):
+        for label, patterns in file_analysis(index, indexed_file).get('features', {}).items():
+            found[label].update(patterns)
+    
+    return sorted(label for label, patterns in found.items() if len(patterns) >= FEATURE_MIN_MATCHES)
 
 # def get_file_statistics(project_path):
 #     """Get detailed file statistics"""
@@ -967,41 +922,25 @@ def get_file_statistics(project_path):
     file_sizes = []
     total_size_bytes = 0
     
-    print(f"Calculating file statistics for: {project_path}")
-    
     try:
-        if not os.path.exists(project_path):
-            print(f"Project path does not exist: {project_path}")
+        index = ProjectFileIndex.ensure(project_path)
+        print(f"Calculating file statistics for: {index.root}")
+        
+        if not os.path.exists(index.root):
+            print(f"Project path does not exist: {index.root}")
             return stats
+        
+        # Hidden files and directories are not counted
+        for indexed_file in index.iter_files(skip_hidden=True):
+            stats['total_files'] += 1
+            total_size_bytes += indexed_file.size
             
-        for root, dirs, files in os.walk(project_path):
-            # Skip hidden directories
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in {'__pycache__', 'node_modules'}]
+            # Count code files
+            if indexed_file.ext in code_extensions:
+                stats['code_files'] += 1
             
-            for file in files:
-                if file.startswith('.'):  # Skip hidden files
-                    continue
-                    
-                file_path = os.path.join(root, file)
-                
-                try:
-                    if os.path.isfile(file_path):
-                        file_size = os.path.getsize(file_path)
-                        file_ext = os.path.splitext(file)[1].lower()
-                        
-                        stats['total_files'] += 1
-                        total_size_bytes += file_size
-                        
-                        # Count code files
-                        if file_ext in code_extensions:
-                            stats['code_files'] += 1
-                        
-                        # Store file sizes for largest files calculation
-                        file_sizes.append((file, file_size))
-                        
-                except (OSError, IOError) as e:
-                    print(f"Error accessing file {file_path}: {e}")
-                    continue
+            # Store file sizes for largest files calculation
+            file_sizes.append((indexed_file.name, indexed_file.size))
         
         # Convert to MB
         stats['total_size_mb'] = round(total_size_bytes / (1024 * 1024), 2)
@@ -1176,51 +1115,61 @@ def find_project_with_code(temp_extract, final_extract_to):
 
 # Temporary
 def analyze_student_project(project_path, student, project_name):
-    """Complete enhanced analysis of a student project - DEBUG VERSION"""
+    """Complete enhanced analysis of a student project - DEBUG VERSION
+
+    The project directory is walked once into a ``ProjectFileIndex`` that
+    every analyzer shares, so each file is listed and read a single time.
+    Per-file results stored for unchanged file contents are reused, and a
+    re-upload under the same project name is saved as its next version
+    with a diff against the previous one.
+    """
+    from .incremental import hash_project_files, load_file_analyses, save_project_version
+    
     print(f"=== STARTING ANALYSIS FOR: {project_name} ===")
     print(f"Project path: {project_path}")
+    index = ProjectFileIndex(project_path)
+    print(f"Indexed {len(index)} files")
     
-    project = StudentProject.objects.create(
-        student=student,
-        project_name=project_name,
-        file_path=project_path
-    )
+    file_manifest = hash_project_files(index)
+    reused_files, analyzed_files = load_file_analyses(index, file_manifest)
     
     # Enhanced analysis with debug
     print("=== DETECTING TECH STACK ===")
-    tech_stack_result = detect_tech_stack_enhanced(project_path)
+    tech_stack_result = detect_tech_stack_enhanced(index)
     print(f"Tech stack found: {tech_stack_result['tech_stack']}")
     
     print("=== EXTRACTING LIBRARIES ===")
-    libraries = extract_libraries_debug(project_path)  # Use debug version
+    libraries = extract_libraries_debug(index)  # Use debug version
     
     print("=== DETECTING FEATURES ===")
-    features = detect_project_features_enhanced(project_path)
+    features = detect_project_features_enhanced(index)
     print(f"Features found: {features}")
     
     print("=== CALCULATING FILE STATISTICS ===")
-    file_stats = get_file_statistics(project_path)
+    file_stats = get_file_statistics(index)
     print(f"File stats: {file_stats}")
     
-    # Create summary
-    summary = ProjectSummary.objects.create(
-        project=project,
-        tech_stack=tech_stack_result['tech_stack'],
-        libraries=libraries,
-        features=features,
-        file_stats=file_stats
-    )
-    
-    print("=== ANALYSIS COMPLETE ===")
-    
-    return {
-        'project_id': project.id,
+    analysis = {
         'tech_stack': tech_stack_result['tech_stack'],
         'tech_stack_confidence': tech_stack_result['confidence_scores'],
         'libraries': libraries,
         'features': features,
         'file_stats': file_stats,
-        'analysis_details': tech_stack_result['details']
+        'analysis_details': tech_stack_result['details'],
+        'file_manifest': file_manifest
+    }
+    
+    # Create project version and summary
+    project, version_diff = save_project_version(student, project_name, project_path, analysis)
+    
+    print("=== ANALYSIS COMPLETE ===")
+    
+    return {
+        'project_id': project.id,
+        **analysis,
+        'version': project.version,
+        'version_diff': version_diff,
+        'incremental': {'reused_files': reused_files, 'analyzed_files': analyzed_files}
     }
 
 
@@ -1228,73 +1177,41 @@ def extract_libraries_debug(project_path):
     """Debug version with detailed logging"""
     libraries = set()
     
-    print(f"DEBUG: Starting library extraction from: {project_path}")
-    
     try:
+        index = ProjectFileIndex.ensure(project_path)
+        print(f"DEBUG: Starting library extraction from: {index.root}")
+        
         # Check if directory exists
-        if not os.path.exists(project_path):
-            print(f"DEBUG: Project path does not exist: {project_path}")
+        if not os.path.exists(index.root):
+            print(f"DEBUG: Project path does not exist: {index.root}")
             return []
         
-        # List all files in project
-        all_files = []
-        for root, dirs, files in os.walk(project_path):
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            for file in files:
-                all_files.append(os.path.join(root, file))
-        
-        print(f"DEBUG: Found {len(all_files)} files in project")
+        print(f"DEBUG: Found {len(index)} files in project")
         
         # Look for package.json
         package_json_found = False
-        for file_path in all_files:
-            if file_path.endswith('package.json'):
-                package_json_found = True
-                print(f"DEBUG: Found package.json at: {file_path}")
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        deps = data.get('dependencies', {})
-                        dev_deps = data.get('devDependencies', {})
-                        
-                        print(f"DEBUG: Found {len(deps)} dependencies: {list(deps.keys())}")
-                        print(f"DEBUG: Found {len(dev_deps)} devDependencies: {list(dev_deps.keys())}")
-                        
-                        for lib in deps.keys():
-                            libraries.add(lib)
-                        for lib in dev_deps.keys():
-                            libraries.add(lib)
-                            
-                except Exception as e:
-                    print(f"DEBUG: Error parsing package.json: {e}")
-                break
+        for indexed_file in index.named('package.json'):
+            package_json_found = True
+            print(f"DEBUG: Found package.json at: {indexed_file.path}")
+            
+            package_libs = file_analysis(index, indexed_file).get('dependencies', {}).get('libraries', [])
+            print(f"DEBUG: Found {len(package_libs)} dependencies and devDependencies: {package_libs}")
+            libraries.update(package_libs)
+            break
         
         if not package_json_found:
             print("DEBUG: No package.json found in project")
         
         # Look for requirements.txt
         requirements_found = False
-        for file_path in all_files:
-            if file_path.endswith('requirements.txt'):
-                requirements_found = True
-                print(f"DEBUG: Found requirements.txt at: {file_path}")
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        lines = f.readlines()
-                        print(f"DEBUG: requirements.txt has {len(lines)} lines")
-                        
-                        for line in lines:
-                            line = line.strip()
-                            if line and not line.startswith('#'):
-                                lib_name = re.split(r'[>=<]', line)[0].strip()
-                                libraries.add(lib_name)
-                                print(f"DEBUG: Added library: {lib_name}")
-                                
-                except Exception as e:
-                    print(f"DEBUG: Error parsing requirements.txt: {e}")
-                break
+        for indexed_file in index.named('requirements.txt'):
+            requirements_found = True
+            print(f"DEBUG: Found requirements.txt at: {indexed_file.path}")
+            
+            requirement_libs = file_analysis(index, indexed_file).get('dependencies', {}).get('libraries', [])
+            print(f"DEBUG: Found {len(requirement_libs)} requirements: {requirement_libs}")
+            libraries.update(requirement_libs)
+            break
         
         if not requirements_found:
             print("DEBUG: No requirements.txt found in project")
@@ -1303,7 +1220,7 @@ def extract_libraries_debug(project_path):
         if not libraries:
             print("DEBUG: No dependency files found, scanning import statements...")
             
-            import_libs = extract_libraries_from_imports(project_path)
+            import_libs = extract_libraries_from_imports(index)
             libraries.update(import_libs)
             print(f"DEBUG: Found {len(import_libs)} libraries from imports")
         
@@ -8,6 +8,7 @@ from rest_framework import status
 from django.conf import settings
 from .models import StudentProject, ProjectSummary
 from .utils import analyze_student_project, extract_student_project_zip
+from .analysis_cache import get_cached_analysis, manifest_digest, save_cached_analysis, store_analysis
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -37,6 +38,21 @@ def analyze_project(request):
             
             print(f"Saved student ZIP to: {zip_path}")
             
+            # Re-uploads of identical content reuse the stored analysis
+            digest = manifest_digest(zip_path)
+            cached_result = get_cached_analysis(digest)
+            if cached_result is not None:
+                print(f"Analysis cache hit for {digest[:12]}")
+                analysis_result = save_cached_analysis(cached_result, request.user, project_name, zip_path)
+                analysis_result.pop('file_manifest', None)
+                return Response({
+                    'message': 'Project analyzed successfully',
+                    'project_name': project_name,
+                    'project_id': analysis_result['project_id'],
+                    'analysis': analysis_result,
+                    'cached': True
+                }, status=status.HTTP_200_OK)
+            
             # Extract ZIP file (for single student project)
             extracted_project = extract_student_project_zip(zip_path, temp_dir)
             
@@ -56,12 +72,16 @@ def analyze_project(request):
                 request.user, 
                 project_name
             )
+            store_analysis(digest, analysis_result)
+            # The per-file hashes stay server-side; version_diff lists what changed
+            analysis_result.pop('file_manifest', None)
 
             return Response({
                 'message': 'Project analyzed successfully',
                 'project_name': project_name,
                 'project_id': analysis_result['project_id'],
-                'analysis': analysis_result
+                'analysis': analysis_result,
+                'cached': False
             }, status=status.HTTP_200_OK)
 
         
@@ -137,7 +157,10 @@ def get_project_details(request, project_id):
                 'tech_stack': summary.tech_stack,
                 'libraries': summary.libraries,
                 'features': summary.features,
-                'file_stats': summary.file_stats
+                'file_stats': summary.file_stats,
+                'version': project.version,
+                'previous_project_id': project.previous_version_id,
+                'version_diff': summary.version_diff
             }
         }, status=status.HTTP_200_OK)
     
@@ -28,15 +28,44 @@ const BatchResultPage = () => {
     const [sortBy, setSortBy] = useState('similarity_desc');
     const [activeTab, setActiveTab] = useState('overview');
     const [expandedParents, setExpandedParents] = useState(new Set(['root']));
+    const [jobStatus, setJobStatus] = useState(null);
 
     useEffect(() => {
         fetchBatchResults();
     }, [batchId]);
 
+    // Poll the background job until it finishes, then load the results
+    useEffect(() => {
+        if (!jobStatus || !['queued', 'running'].includes(jobStatus.status)) return;
+        const timer = setTimeout(async () => {
+            try {
+                const response = await plagiarismAPI.getBatchStatus(batchId);
+                if (response.data.status === 'done') {
+                    setJobStatus(null);
+                    fetchBatchResults();
+                } else {
+                    setJobStatus(response.data);
+                }
+            } catch (err) {
+                setError(err.response?.data?.error || 'Failed to load batch status');
+            }
+        }, 2000);
+        return () => clearTimeout(timer);
+    }, [jobStatus, batchId]);
+
     const fetchBatchResults = async () => {
         try {
             setLoading(true);
             const response = await plagiarismAPI.getBatchResults(batchId);
+            if (response.status === 202) {
+                // Batch check still queued/running (or failed)
+                if (response.data.status === 'failed') {
+                    setError(response.data.error || 'Batch processing failed');
+                } else {
+                    setJobStatus(response.data);
+                }
+                return;
+            }
             console.log('🔍 Batch Data:', response.data); // Debug log
             console.log('📊 Hierarchical Projects:', response.data?.hierarchical_projects); // Debug log
             console.log('👥 Student Summary:', response.data?.student_summary); // Debug log
@@ -200,12 +229,15 @@ const BatchResultPage = () => {
         );
     };
 
-    if (loading) {
+    if (loading || jobStatus) {
+        const eta = jobStatus?.eta_seconds != null ? ` · about ${Math.ceil(jobStatus.eta_seconds)}s left` : '';
         return (
             <div className="min-h-screen bg-gradient-to-br from-slate-900 via-purple-900 to-slate-900">
                 <div className="max-w-7xl mx-auto p-6">
                     <div className="flex justify-center items-center min-h-96">
-                        <Loading />
+                        <Loading
+                            text={jobStatus ? `${jobStatus.status === 'queued' ? 'Queued' : jobStatus.stage} — ${jobStatus.progress_percentage}%${eta}` : ''}
+                        />
                     </div>
                 </div>
             </div>
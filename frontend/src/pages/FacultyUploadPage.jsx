@@ -3,10 +3,13 @@ import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { Upload, FileText, ArrowRight, Calendar, Users, AlertTriangle, Eye, Cloud, Zap, Shield } from 'lucide-react';
-import { plagiarismAPI } from '../services/api';
+import { plagiarismAPI, uploadBatchInChunks } from '../services/api';
 import Alert from '../components/Alert';
 import Loading from '../components/Loading';
 
+// Archives larger than this are sent as a resumable chunked upload
+const CHUNKED_UPLOAD_THRESHOLD = 100 * 1024 * 1024;
+
 const FacultyUploadPage = () => {
   const [uploadForm, setUploadForm] = useState({
     batch_name: '',
@@ -54,7 +57,12 @@ const FacultyUploadPage = () => {
     formData.append('topic', uploadForm.topic);
 
     try {
-      const response = await plagiarismAPI.batchCheck(formData);
+      const response = uploadForm.zip_file.size > CHUNKED_UPLOAD_THRESHOLD
+        ? await uploadBatchInChunks(uploadForm.zip_file, {
+            batchName: uploadForm.batch_name,
+            topic: uploadForm.topic,
+          })
+        : await plagiarismAPI.batchCheck(formData);
       setSuccess('Batch processed successfully!');
       const batchId = response.data.batch_id;
       navigate(`/faculty/results/${batchId}`);
@@ -129,6 +129,57 @@ export const plagiarismAPI = {
   getBatches: (page = 1) => api.get(`/plagiarism/batches/?page=${page}`),
   getRecentBatches: () => api.get('/plagiarism/batches/recent/'),
   getBatchResults: (batchId) => api.get(`/plagiarism/batch/${batchId}/`),
+  getBatchStatus: (batchId) => api.get(`/plagiarism/batch/${batchId}/status/`),
+  labelResult: (resultId, label) => api.post(`/plagiarism/results/${resultId}/label/`, { label }),
+  searchSnippet: (snippet, { language, topic, limit } = {}) =>
+    api.post('/plagiarism/snippet-search/', { snippet, language, topic, limit }),
+  getStarterCodes: (topic) => api.get('/plagiarism/starter-code/', { params: topic ? { topic } : {} }),
+  uploadStarterCode: (formData) =>
+    api.post('/plagiarism/starter-code/', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    }),
+  createUploadSession: (data) => api.post('/plagiarism/upload-sessions/', data),
+  getUploadSession: (sessionId) => api.get(`/plagiarism/upload-sessions/${sessionId}/`),
+  uploadChunk: (sessionId, index, blob, sha256) =>
+    api.put(`/plagiarism/upload-sessions/${sessionId}/chunks/${index}/`, blob, {
+      headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-SHA256': sha256 },
+    }),
+  finalizeUploadSession: (sessionId) => api.post(`/plagiarism/upload-sessions/${sessionId}/finalize/`),
+};
+
+const sha256Hex = async (blob) => {
+  const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('');
+};
+
+// Upload a large batch ZIP in checksummed chunks. Failed chunks are retried,
+// and passing the sessionId of an interrupted upload resumes it: only the
+// chunks the server is missing are sent.
+export const uploadBatchInChunks = async (file, { batchName, topic, sessionId, onProgress, retries = 3 } = {}) => {
+  const session = sessionId
+    ? (await plagiarismAPI.getUploadSession(sessionId)).data
+    : (await plagiarismAPI.createUploadSession({
+        file_name: file.name, total_size: file.size, batch_name: batchName, topic,
+      })).data;
+
+  const missing = session.missing_chunks;
+  let done = session.total_chunks - missing.length;
+  for (const index of missing) {
+    const blob = file.slice(index * session.chunk_size, (index + 1) * session.chunk_size);
+    const checksum = await sha256Hex(blob);
+    for (let attempt = 0; ; attempt++) {
+      try {
+        await plagiarismAPI.uploadChunk(session.session_id, index, blob, checksum);
+        break;
+      } catch (err) {
+        if (attempt >= retries || err.response?.status === 404) throw err;
+      }
+    }
+    done += 1;
+    onProgress?.({ sessionId: session.session_id, done, total: session.total_chunks });
+  }
+
+  return plagiarismAPI.finalizeUploadSession(session.session_id);
 };
 
 